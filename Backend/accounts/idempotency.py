@@ -0,0 +1,100 @@
+"""
+Idempotency-Key support for money-moving POST endpoints.
+
+The first request with a key inserts an IdempotencyKey row and runs the view in
+the same transaction, then stores the response on the row. A retry with the
+same key gets the stored response from one unique-index lookup. A concurrent
+duplicate blocks on the unique key until the first request commits (or rolls
+back), so the work is never done twice. Only successful responses are stored;
+after an error the client can retry with the same key.
+"""
+import functools
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL = 60 * 60 * 24
+
+
+def ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL))
+
+
+def fingerprint(request):
+    digest = hashlib.sha256()
+    for part in (request.method.encode(), request.path.encode(), request.body):
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def replay(record, request_fingerprint):
+    if record.fingerprint != request_fingerprint:
+        return Response(
+            {'error': f'{HEADER} was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(record.response, status=record.status_code, headers={REPLAYED_HEADER: 'true'})
+
+
+def purge_expired():
+    """Delete keys older than the TTL, returns how many were deleted"""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - ttl()).delete()
+    return deleted
+
+
+def idempotent(view):
+    """
+    Honour an Idempotency-Key header on a function view.
+    Put it below @api_view/@permission_classes so the user is authenticated.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return view(request, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        request_fingerprint = fingerprint(request)
+        with transaction.atomic():
+            record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+            if record is not None:
+                if record.created_at >= timezone.now() - ttl():
+                    return replay(record, request_fingerprint)
+                record.delete()
+
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user, key=key, fingerprint=request_fingerprint
+                    )
+            except IntegrityError:
+                # A concurrent duplicate held the key; we waited for it to commit
+                return replay(IdempotencyKey.objects.get(user=request.user, key=key), request_fingerprint)
+
+            response = view(request, *args, **kwargs)
+            if not status.is_success(response.status_code):
+                # Release the key (and anything the view wrote) so the client can retry
+                transaction.set_rollback(True)
+                return response
+
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=['status_code', 'response'])
+            return response
+    return wrapper
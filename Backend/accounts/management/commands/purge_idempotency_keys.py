@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from accounts.idempotency import purge_expired
+
+class Command(BaseCommand):
+    help = 'Deletes stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL'
+
+    def handle(self, *args, **kwargs):
+        deleted = purge_expired()
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {deleted} expired idempotency key(s)')
+        )
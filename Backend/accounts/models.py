@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 
 
 # Custom User Manager
@@ -59,6 +62,9 @@ class User(AbstractUser):
     # Keep username field but make it case-insensitive
     username = models.CharField(max_length=150, unique=True)
     
+    # Order detail ETags embed the buyer/seller profile, so they need a change stamp
+    updated_at = models.DateTimeField(auto_now=True)
+    
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
@@ -132,4 +138,43 @@ class SellerProfile(models.Model):
     
     def increment_order_count(self):
         self.total_orders_fulfilled += 1
-        self.save()
\ No newline at end of file
+        self.save()
+    
+    @classmethod
+    def credit_fulfilled_orders(cls, user_id, amount, count=1):
+        """Add earnings and fulfilled orders with one UPDATE (no read, no lost updates)"""
+        return cls.objects.filter(user_id=user_id).update(
+            wallet_balance=F('wallet_balance') + amount,
+            total_earnings=F('total_earnings') + amount,
+            total_orders_fulfilled=F('total_orders_fulfilled') + count,
+            updated_at=timezone.now()
+        )
+
+
+class IdempotencyKey(models.Model):
+    """Stored result of a request sent with an Idempotency-Key header (see accounts/idempotency.py)"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys'
+    )
+    key = models.CharField(max_length=255)
+    # sha256 of method, path and body, a key can't be reused for another request
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+        indexes = [
+            # purge_idempotency_keys deletes by age
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.key}"
@@ -1,3 +1,98 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from credits import ledger
+from credits.models import CreditAccount, CreditTransaction
+from orders.models import Cart, CartItem, Order
+from shop.models import Product
+from .idempotency import MAX_KEY_LENGTH, REPLAYED_HEADER
+from .models import IdempotencyKey, User
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        seller = User.objects.create_user('seller', 'seller@example.com', role='SELLER')
+        self.product = Product.objects.create(
+            seller=seller, name='Jollof Rice', description='Test product', price=100,
+            stock_quantity=10, main_image='https://example.com/product.png'
+        )
+        self.buyer = User.objects.create_user('buyer', 'buyer@example.com', role='BUYER')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def fill_cart(self):
+        CartItem.objects.create(cart=Cart.objects.get(user=self.buyer), product=self.product, quantity=2)
+
+    def checkout(self, key, **data):
+        return self.client.post('/api/orders/checkout/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_a_retried_checkout_replays_the_first_response(self):
+        self.fill_cart()
+        first = self.checkout('checkout-1')
+        self.fill_cart()
+        retry = self.checkout('checkout-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry[REPLAYED_HEADER], 'true')
+        self.assertFalse(first.has_header(REPLAYED_HEADER))
+        self.assertEqual(Order.objects.filter(buyer=self.buyer).count(), 1)
+        self.assertEqual(ledger.balances(self.buyer.credit_account.pk).balance, Decimal('49800'))
+
+    def test_a_key_cannot_be_reused_for_another_request(self):
+        self.fill_cart()
+        self.checkout('checkout-1')
+
+        response = self.checkout('checkout-1', notes='Leave at the gate')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failed_requests_release_the_key(self):
+        # Empty cart
+        self.assertEqual(self.checkout('checkout-1').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.fill_cart()
+        self.assertEqual(self.checkout('checkout-1').status_code, 201)
+
+    def test_keys_belong_to_one_user_and_expire(self):
+        self.fill_cart()
+        self.checkout('checkout-1')
+
+        other = User.objects.create_user('other', 'other@example.com', role='BUYER')
+        CartItem.objects.create(cart=Cart.objects.get(user=other), product=self.product, quantity=1)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.checkout('checkout-1').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_overlong_keys_are_rejected(self):
+        self.fill_cart()
+        self.assertEqual(self.checkout('k' * (MAX_KEY_LENGTH + 1)).status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_a_repayment_is_applied_once(self):
+        account = CreditAccount.objects.get(user=self.buyer)
+        account.deduct_credit(Decimal('5000'))
+        admin = User.objects.create_user('admin', 'admin@example.com', role='ADMIN')
+        self.client.force_authenticate(admin)
+
+        url = f'/api/credits/accounts/{self.buyer.pk}/repayment/'
+        for _ in range(2):
+            response = self.client.post(url, {'amount': '2000'}, format='json', HTTP_IDEMPOTENCY_KEY='repay-1')
+            self.assertEqual(response.status_code, 200)
 
-# Create your tests here.
+        self.assertEqual(
+            CreditTransaction.objects.filter(
+                credit_account=account, transaction_type=CreditTransaction.TransactionType.REPAYMENT
+            ).count(), 1
+        )
+        self.assertEqual(ledger.balances(account.pk).balance, Decimal('47000'))
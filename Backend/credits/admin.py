@@ -6,7 +6,9 @@ class CreditAccountAdmin(admin.ModelAdmin):
     list_display = ['user_email', 'credit_limit', 'credit_balance', 'outstanding_balance', 'loan_status']
     list_filter = ['loan_status']
     search_fields = ['user__email']
-    readonly_fields = ['total_credit_used', 'total_repaid', 'last_repayment_date']
+    # Balances come from the credit ledger (credits/ledger.py), change them through its endpoints;
+    # the columns shown here are its cache, refreshed by snapshot_credit_balances
+    readonly_fields = ['credit_limit', 'credit_balance', 'total_credit_used', 'total_repaid', 'last_repayment_date']
     
     fieldsets = (
         ('User', {
@@ -0,0 +1,276 @@
+"""
+Loan book analytics for the admin dashboard.
+
+Account, repayment and ledger columns are read in bulk with values_list: money
+is cast to float and dates are reduced to bucket numbers (age bucket, week) in
+SQL, so every row is a short tuple of plain numbers. With NumPy the columns
+become arrays and histograms, percentiles and per-week totals are array
+operations; without it the same figures are computed in pure Python, which is
+fine for small books but much slower for large ones.
+
+On large books the time goes into moving rows from the database driver to
+Python, so each query selects as few columns as it can.
+
+Account figures come from the CreditAccount balance columns, which every
+ledger write keeps current (credits/ledger.py).
+
+summary() is cached for CREDIT_ANALYTICS_CACHE_TIMEOUT seconds.
+"""
+import bisect
+import datetime
+import math
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, ExpressionWrapper, FloatField, IntegerField, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .models import CreditAccount, CreditTransaction, RepaymentHistory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_WEEKS = 12
+MAX_WEEKS = 52
+DEFAULT_TIMEOUT = 60
+CHUNK_SIZE = 10000
+PERCENTILES = (50, 75, 90, 95, 99)
+# Bucket lower edges; the last bucket is open ended
+UTILIZATION_EDGES = (0, 10, 20, 30, 40, 50, 60, 70, 80, 90)
+OUTSTANDING_EDGES = (0, 1000, 5000, 10000, 25000, 50000, 100000)
+# Days since the last repayment (or since the account opened, if never repaid)
+AGING_EDGES = (0, 31, 61, 91)
+
+
+# ==========================================
+# Column helpers (NumPy or pure Python)
+# ==========================================
+
+def load(queryset, width):
+    """
+    Rows of `width` numbers -> one float column per field. The values_list
+    SQL runs on a plain cursor: every column is already a number, and the
+    ORM's per-value converters would cost more than the fetch itself.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = chain.from_iterable(iter(lambda: cursor.fetchmany(CHUNK_SIZE), []))
+        if np is not None:
+            values = np.fromiter(chain.from_iterable(rows), dtype=np.float64)
+            return list(values.reshape(-1, width).T)
+        columns = list(zip(*rows))
+    return [list(column) for column in columns] if columns else [[] for _ in range(width)]
+
+
+def subtract(a, b):
+    if np is not None:
+        return a - b
+    return [x - y for x, y in zip(a, b)]
+
+
+def divmod_columns(values, divisor):
+    if np is not None:
+        return np.divmod(values, divisor)
+    return [value // divisor for value in values], [value % divisor for value in values]
+
+
+def total(values):
+    return float(values.sum()) if np is not None else math.fsum(values)
+
+
+def bincount(indexes, size, weights=None):
+    """Count (or sum `weights`) per bucket number 0..size-1"""
+    if np is not None:
+        counts = np.bincount(indexes.astype(np.int64), weights=weights, minlength=size)
+        return counts[:size].tolist()
+    counts = [0 if weights is None else 0.0] * size
+    for position, index in enumerate(indexes):
+        counts[int(index)] += weights[position] if weights is not None else 1
+    return counts
+
+
+def bucket(values, edges):
+    """Bucket number of each value; values below edges[0] go in the first bucket"""
+    if np is not None:
+        return np.maximum(np.searchsorted(edges, values, side='right') - 1, 0)
+    return [max(bisect.bisect_right(edges, value) - 1, 0) for value in values]
+
+
+def percentiles(values, points=PERCENTILES):
+    """Linear interpolation between closest ranks, as numpy.percentile does"""
+    if not len(values):
+        return {f'p{point}': None for point in points}
+    if np is not None:
+        results = np.percentile(values, points).tolist()
+    else:
+        ordered = sorted(values)
+        results = []
+        for point in points:
+            rank = (len(ordered) - 1) * point / 100
+            low = math.floor(rank)
+            high = min(low + 1, len(ordered) - 1)
+            results.append(ordered[low] + (ordered[high] - ordered[low]) * (rank - low))
+    return {f'p{point}': round(result, 2) for point, result in zip(points, results)}
+
+
+def histogram(values, edges):
+    counts = bincount(bucket(values, edges), len(edges))
+    return [
+        {'from': low, 'to': high, 'accounts': count}
+        for low, high, count in zip(edges, list(edges[1:]) + [None], counts)
+    ]
+
+
+def week_number(field, starts):
+    """Case expression: 0 for the current week, 1 for the week before, ..."""
+    return Case(
+        *[When(**{f'{field}__gte': start}, then=Value(number)) for number, start in enumerate(starts)],
+        default=Value(len(starts)),
+        output_field=IntegerField()
+    )
+
+
+def money(field):
+    return Cast(field, FloatField())
+
+
+# ==========================================
+# Summary
+# ==========================================
+
+def week_starts(weeks, now=None):
+    """Local midnight of the Monday of this week and the `weeks - 1` before it"""
+    today = timezone.localdate(now)
+    monday = today - datetime.timedelta(days=today.weekday())
+    return [
+        timezone.make_aware(datetime.datetime.combine(monday - datetime.timedelta(weeks=number), datetime.time.min))
+        for number in range(weeks)
+    ]
+
+
+def accounts_summary(now):
+    statuses = CreditAccount.LoanStatus.values
+    status = Case(
+        *[When(loan_status=value, then=Value(number)) for number, value in enumerate(statuses)],
+        default=Value(len(statuses)),
+        output_field=IntegerField()
+    )
+    aging = Case(
+        *[
+            When(aging_since__gt=now - datetime.timedelta(days=days), then=Value(number))
+            for number, days in enumerate(AGING_EDGES[1:])
+        ],
+        default=Value(len(AGING_EDGES) - 1),
+        output_field=IntegerField()
+    )
+    # Status and aging bucket travel as one number, status * buckets + bucket
+    queryset = CreditAccount.objects.order_by().alias(
+        aging_since=Coalesce('last_repayment_date', 'created_at')
+    ).values_list(
+        money('credit_limit'),
+        money('credit_balance'),
+        ExpressionWrapper(status * len(AGING_EDGES) + aging, output_field=IntegerField()),
+    )
+    limit, balance, code = load(queryset, 3)
+    status, aging = divmod_columns(code, len(AGING_EDGES))
+    size = len(limit)
+
+    outstanding = subtract(limit, balance)
+    if np is not None:
+        utilization = np.clip(np.divide(outstanding, limit, out=np.zeros(size), where=limit > 0) * 100, 0, None)
+        owing = outstanding > 0
+        aging_owing, outstanding_owing = aging[owing], outstanding[owing]
+    else:
+        utilization = [max(o / l * 100, 0) if l > 0 else 0.0 for o, l in zip(outstanding, limit)]
+        pairs = [(a, o) for a, o in zip(aging, outstanding) if o > 0]
+        aging_owing, outstanding_owing = [a for a, _ in pairs], [o for _, o in pairs]
+
+    status_counts = bincount(status, len(statuses) + 1)
+    aging_counts = bincount(aging_owing, len(AGING_EDGES))
+    aging_amounts = bincount(aging_owing, len(AGING_EDGES), outstanding_owing)
+    return {
+        'accounts': size,
+        'totals': {
+            'credit_limit': round(total(limit), 2),
+            'outstanding': round(total(outstanding), 2),
+            'available': round(total(balance), 2),
+        },
+        'status': dict(zip(statuses, status_counts)),
+        'utilization': {
+            'percentiles': percentiles(utilization),
+            'histogram': histogram(utilization, UTILIZATION_EDGES),
+        },
+        'outstanding': {
+            'percentiles': percentiles(outstanding_owing),
+            'histogram': histogram(outstanding, OUTSTANDING_EDGES),
+        },
+        'aging': [
+            {'from_days': low, 'to_days': high - 1 if high else None, 'accounts': count, 'outstanding': round(amount, 2)}
+            for low, high, count, amount in zip(
+                AGING_EDGES, list(AGING_EDGES[1:]) + [None], aging_counts, aging_amounts
+            )
+        ],
+    }
+
+
+def weekly_summary(starts):
+    weeks = len(starts)
+    repayments = RepaymentHistory.objects.order_by().filter(created_at__gte=starts[-1])
+    repayments = repayments.values_list(week_number('created_at', starts), money('amount'))
+    week, amount = load(repayments, 2)
+
+    # deduct_credit marks an account EXHAUSTED when a purchase takes its balance to zero
+    exhaustions = CreditTransaction.objects.order_by().filter(
+        created_at__gte=starts[-1],
+        transaction_type=CreditTransaction.TransactionType.PURCHASE,
+        balance_after__lte=0,
+    ).values_list(week_number('created_at', starts))
+    (exhausted_week,) = load(exhaustions, 1)
+
+    counts = bincount(week, weeks)
+    amounts = bincount(week, weeks, amount)
+    exhausted = bincount(exhausted_week, weeks)
+    return {
+        'repayments': {
+            'count': len(amount),
+            'amount': round(total(amount), 2),
+            'percentiles': percentiles(amount),
+        },
+        'weeks': [
+            {
+                'week_start': starts[number].date(),
+                'repayments': counts[number],
+                'repaid': round(amounts[number], 2),
+                'exhausted': exhausted[number],
+            }
+            # Oldest first, for charts
+            for number in reversed(range(weeks))
+        ],
+    }
+
+
+def compute(weeks=DEFAULT_WEEKS, now=None):
+    now = now or timezone.now()
+    return {
+        'generated_at': now,
+        'engine': 'numpy' if np is not None else 'python',
+        **accounts_summary(now),
+        **weekly_summary(week_starts(weeks, now)),
+    }
+
+
+def summary(weeks=DEFAULT_WEEKS, refresh=False):
+    """compute(), cached briefly: the figures move slowly and the scan is not free"""
+    key = f'credits:analytics:{weeks}'
+    result = None if refresh else cache.get(key)
+    if result is None:
+        result = compute(weeks)
+        timeout = getattr(settings, 'CREDIT_ANALYTICS_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+        cache.set(key, result, timeout)
+    return result
@@ -0,0 +1,55 @@
+"""Query string filters shared by the admin credit lists and exports"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def parse_moment(value, end=False):
+    """ISO datetime, or a date meaning the start (or with end=True, the end) of that day"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date '{value}', use YYYY-MM-DD or an ISO datetime")
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_list(queryset, params, amount_field, amount_param='amount', user_field='credit_account__user_id'):
+    """
+    Shared admin list filters, raises ValueError for bad input:
+    ?date_from= / ?date_to= on created_at (dates include the whole day),
+    ?min_<amount_param>= / ?max_<amount_param>= on amount_field, ?user=<user id>
+    """
+    date_from = params.get('date_from')
+    if date_from:
+        queryset = queryset.filter(created_at__gte=parse_moment(date_from))
+    date_to = params.get('date_to')
+    if date_to:
+        if parse_datetime(date_to) is None:
+            queryset = queryset.filter(created_at__lt=parse_moment(date_to, end=True))
+        else:
+            queryset = queryset.filter(created_at__lte=parse_moment(date_to))
+    
+    for bound, lookup in (('min', 'gte'), ('max', 'lte')):
+        value = params.get(f'{bound}_{amount_param}')
+        if value:
+            try:
+                amount = Decimal(value)
+            except InvalidOperation:
+                amount = None
+            # Decimal accepts NaN and Infinity, which are not amounts
+            if amount is None or not amount.is_finite():
+                raise ValueError(f"Invalid {bound}_{amount_param} '{value}'")
+            queryset = queryset.filter(**{f'{amount_field}__{lookup}': amount})
+    
+    user_id = params.get('user')
+    if user_id:
+        if not user_id.isdigit():
+            raise ValueError(f"Invalid user '{user_id}'")
+        queryset = queryset.filter(**{user_field: int(user_id)})
+    return queryset
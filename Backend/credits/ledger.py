@@ -0,0 +1,246 @@
+"""
+Credit ledger: CreditTransaction rows are the source of truth for balances.
+
+Every row carries signed deltas for the four account figures (credit_limit,
+credit_balance, total_credit_used, total_repaid) and a per-account sequence
+number. An account's figures are its latest CreditBalanceSnapshot plus the
+sum of the deltas of the transactions after it, so a balance read is one
+snapshot row and a short tail sum. Accounts saved without their opening
+snapshot (bulk_create, loaddata) start from their balance columns instead,
+until the next write gives them one (pin()). Balance reads (the account endpoints,
+can_purchase, the checks in post()) go through balances()/attach().
+
+Writes are inserts. post() reads the figures, checks them, and inserts the
+transaction with the next sequence number; the (credit_account, sequence)
+unique constraint rejects the row if a concurrent writer took that number
+first, and post() reads again and retries. A sequence number is only taken
+once every number before it is committed, so each check ran against the
+complete ledger: two checkouts cannot both spend the same balance.
+
+The balance columns on CreditAccount are a copy of the figures for list
+filters, the Django admin and the loan book analytics. post() rewrites them
+with the figures after its transaction, in the same transaction, and the
+next sequence number cannot be taken before that commits, so the last write
+wins in ledger order. `manage.py snapshot_credit_balances` (run from cron)
+writes new snapshots for accounts whose tail grew long and repairs columns
+that differ from the ledger; `manage.py verify_credit_ledger` reports them.
+"""
+from dataclasses import dataclass, replace
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CreditAccount, CreditBalanceSnapshot, CreditTransaction
+
+ZERO = Decimal('0')
+
+# Figure name -> (transaction delta field, account/snapshot field)
+FIGURES = {
+    'limit': ('limit_delta', 'credit_limit'),
+    'balance': ('balance_delta', 'credit_balance'),
+    'used': ('used_delta', 'total_credit_used'),
+    'repaid': ('repaid_delta', 'total_repaid'),
+}
+
+# A write that keeps losing its sequence number to concurrent writers gives up
+POST_ATTEMPTS = 50
+
+
+@dataclass(frozen=True)
+class Balances:
+    limit: Decimal = ZERO
+    balance: Decimal = ZERO
+    used: Decimal = ZERO
+    repaid: Decimal = ZERO
+    # Last sequence number counted, and how many of them came after the snapshot
+    sequence: int = 0
+    tail: int = 0
+    # False when there is no snapshot and the figures start from the account columns
+    snapshotted: bool = True
+
+    def apply(self, **deltas):
+        return replace(self, **{name: getattr(self, name) + delta for name, delta in deltas.items()})
+
+    def following(self, **deltas):
+        """Figures after one more transaction with these deltas"""
+        return replace(self.apply(**deltas), sequence=self.sequence + 1, tail=self.tail + 1)
+
+    def as_account_fields(self):
+        return {field: getattr(self, name) for name, (_, field) in FIGURES.items()}
+
+
+def latest_snapshots(account_ids):
+    latest = CreditBalanceSnapshot.objects.filter(
+        credit_account=OuterRef('credit_account')
+    ).order_by('-last_sequence').values('id')[:1]
+    return CreditBalanceSnapshot.objects.filter(
+        credit_account_id__in=account_ids, id=Subquery(latest)
+    )
+
+
+def tail_transactions(account_ids):
+    """Transactions after each account's latest snapshot"""
+    snapshot_end = CreditBalanceSnapshot.objects.filter(
+        credit_account=OuterRef('credit_account')
+    ).order_by('-last_sequence').values('last_sequence')[:1]
+    return CreditTransaction.objects.filter(credit_account_id__in=account_ids).alias(
+        snapshot_end=Coalesce(Subquery(snapshot_end), Value(0))
+    ).filter(sequence__gt=F('snapshot_end'))
+
+
+def balances_many(account_ids):
+    """
+    {account id: Balances} from the latest snapshots and their tails, two
+    queries, and a third for accounts that have no snapshot
+    """
+    account_ids = list(account_ids)
+    result = {}
+    for snapshot in latest_snapshots(account_ids):
+        result[snapshot.credit_account_id] = Balances(
+            sequence=snapshot.last_sequence,
+            **{name: getattr(snapshot, field) for name, (_, field) in FIGURES.items()}
+        )
+
+    missing = [account_id for account_id in account_ids if account_id not in result]
+    if missing:
+        names = list(FIGURES)
+        fields = [field for _, field in FIGURES.values()]
+        for account_id, *values in CreditAccount.objects.filter(id__in=missing).values_list('id', *fields):
+            result[account_id] = Balances(snapshotted=False, **dict(zip(names, values)))
+        for account_id in missing:
+            result.setdefault(account_id, Balances())
+
+    tails = tail_transactions(account_ids).order_by().values('credit_account_id').annotate(
+        last=Max('sequence'),
+        rows=Count('id'),
+        **{name: Sum(delta) for name, (delta, _) in FIGURES.items()}
+    )
+    for tail in tails:
+        account_id = tail['credit_account_id']
+        result[account_id] = replace(
+            result[account_id].apply(**{name: tail[name] for name in FIGURES}),
+            sequence=tail['last'],
+            tail=tail['rows']
+        )
+    return result
+
+
+def balances(account_id):
+    return balances_many([account_id])[account_id]
+
+
+def attach(accounts):
+    """Set the figures of CreditAccount instances from the ledger (see balances_many)"""
+    current = balances_many(account.id for account in accounts)
+    for account in accounts:
+        for field, value in current[account.id].as_account_fields().items():
+            setattr(account, field, value)
+    return accounts
+
+
+def entry(account_id, before, transaction_type, amount, description, reference='', **deltas):
+    """Unsaved transaction following `before`, and the figures after it"""
+    after = before.following(**deltas)
+    return CreditTransaction(
+        credit_account_id=account_id,
+        sequence=after.sequence,
+        transaction_type=transaction_type,
+        amount=amount,
+        balance_before=before.balance,
+        balance_after=after.balance,
+        description=description,
+        reference=reference,
+        **{FIGURES[name][0]: delta for name, delta in deltas.items()}
+    ), after
+
+
+def post(account, transaction_type, description, reference, change):
+    """
+    Append one transaction to the account's ledger and return it.
+
+    `change(balances, loan_status)` works out the transaction from the current
+    figures and returns (amount, deltas, fields): the deltas are keyed by
+    figure (limit, balance, used, repaid) and `fields` are account columns to
+    set (loan_status, last_repayment_date), usually none. It raises ValueError
+    to refuse the transaction.
+
+    If a concurrent writer takes the sequence number first the figures are
+    read again and `change` runs again. Updates `account` and its balance
+    columns. Call inside a transaction.
+    """
+    for attempt in range(POST_ATTEMPTS):
+        before = balances(account.id)
+        # Read after the figures: a status written by a later transaction than
+        # the ones counted means its sequence number is taken, and we retry
+        loan_status = CreditAccount.objects.values_list('loan_status', flat=True).get(id=account.id)
+        for field, value in before.as_account_fields().items():
+            setattr(account, field, value)
+        account.loan_status = loan_status
+
+        amount, deltas, fields = change(before, loan_status)
+        row, after = entry(account.id, before, transaction_type, amount, description, reference, **deltas)
+        try:
+            with transaction.atomic():
+                row.save(force_insert=True)
+        except IntegrityError:
+            if attempt + 1 == POST_ATTEMPTS:
+                raise
+            continue
+        break
+
+    pin({account.id: after})
+    CreditAccount.objects.filter(id=account.id).update(
+        updated_at=timezone.now(), **after.as_account_fields(), **fields
+    )
+    for field, value in {**after.as_account_fields(), **fields}.items():
+        setattr(account, field, value)
+    return row
+
+
+def snapshot(current, min_tail=1):
+    """
+    Snapshot the accounts in `current` ({account id: Balances}) with at least
+    `min_tail` transactions since their last snapshot. Sequence numbers
+    commit in order, so everything up to `sequence` is already in the ledger.
+    """
+    due = [
+        CreditBalanceSnapshot(
+            credit_account_id=account_id,
+            last_sequence=figures.sequence,
+            **figures.as_account_fields()
+        )
+        for account_id, figures in current.items()
+        if figures.snapshotted and figures.tail >= min_tail
+    ]
+    CreditBalanceSnapshot.objects.bulk_create(due)
+    return len(due)
+
+
+def pin(current):
+    """
+    Snapshot the accounts in `current` that have none before their balance
+    columns are rewritten: their figures start from those columns, and the
+    tail would be counted twice
+    """
+    return snapshot({
+        account_id: replace(figures, snapshotted=True)
+        for account_id, figures in current.items() if not figures.snapshotted
+    }, min_tail=0)
+
+
+def refresh_columns(current):
+    """Rewrite the balance columns that differ from `current`, returns how many accounts changed"""
+    pin(current)
+    fields = [field for _, field in FIGURES.values()]
+    stale = [
+        CreditAccount(id=account_id, **current[account_id].as_account_fields())
+        for account_id, *values in CreditAccount.objects.filter(
+            id__in=list(current)
+        ).values_list('id', *fields)
+        if dict(zip(fields, values)) != current[account_id].as_account_fields()
+    ]
+    CreditAccount.objects.bulk_update(stale, fields)
+    return len(stale)
@@ -0,0 +1,109 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Mod
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from accounts.models import User
+from credits import analytics
+from credits.models import CreditAccount, CreditTransaction, RepaymentHistory
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds synthetic credit accounts, repayments and exhausting purchases inside '
+        'a rolled-back transaction and times the loan book analytics, uncached and cached'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, default=100000)
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--weeks', type=int, default=analytics.DEFAULT_WEEKS)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['accounts'], options['weeks'])
+            # The seed queries would fill the debug query log
+            connection.queries_log.clear()
+
+            with CaptureQueriesContext(connection) as queries:
+                result = analytics.compute(options['weeks'])
+            timings = []
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                analytics.compute(options['weeks'])
+                timings.append((time.perf_counter() - start) * 1000)
+
+            analytics.summary(options['weeks'], refresh=True)
+            start = time.perf_counter()
+            analytics.summary(options['weeks'])
+            cached = (time.perf_counter() - start) * 1000
+            cache.delete(f"credits:analytics:{options['weeks']}")
+            transaction.set_rollback(True)
+
+        timings.sort()
+        self.stdout.write(
+            f"{result['accounts']} accounts, {result['repayments']['count']} repayments "
+            f"({result['engine']}): {len(queries)} queries, "
+            f"p50 {timings[len(timings) // 2]:.0f}ms, max {timings[-1]:.0f}ms, cached {cached:.2f}ms"
+        )
+        self.stdout.write(f"status {result['status']}, utilization {result['utilization']['percentiles']}")
+        self.stdout.write(self.style.SUCCESS('Loan book analytics computed'))
+
+    def seed(self, total, weeks):
+        start = time.perf_counter()
+        admin = User.objects.create_user('benchmark-admin', 'benchmark-admin@example.com', role='ADMIN')
+        password = make_password(None)
+        now = timezone.now()
+        span = weeks * 7 * 86400
+        for offset in range(0, total, BATCH_SIZE):
+            # bulk_create skips the signals, accounts are created below
+            users = User.objects.bulk_create([
+                User(username=f'benchmark-buyer-{i}', email=f'benchmark-buyer-{i}@example.com', role='BUYER',
+                     first_name='Buyer', last_name=str(i), password=password)
+                for i in range(offset, min(offset + BATCH_SIZE, total))
+            ])
+            accounts = []
+            for user in users:
+                balance = random.choice([0, random.randint(0, 50000)])
+                accounts.append(CreditAccount(
+                    user=user,
+                    credit_balance=balance,
+                    total_credit_used=50000 - balance,
+                    loan_status=CreditAccount.LoanStatus.EXHAUSTED if balance == 0 else random.choice(
+                        [CreditAccount.LoanStatus.ACTIVE, CreditAccount.LoanStatus.ACTIVE, CreditAccount.LoanStatus.SUSPENDED]
+                    ),
+                    last_repayment_date=random.choice(
+                        [None, now - datetime.timedelta(seconds=random.randint(0, span))]
+                    ),
+                ))
+            accounts = CreditAccount.objects.bulk_create(accounts)
+            RepaymentHistory.objects.bulk_create([
+                RepaymentHistory(credit_account=account, amount=random.randint(100, 20000), repaid_by=admin)
+                for account in accounts
+                for _ in range(random.randint(0, 2))
+            ])
+            CreditTransaction.objects.bulk_create([
+                CreditTransaction(
+                    credit_account=account, sequence=1, transaction_type=CreditTransaction.TransactionType.PURCHASE,
+                    amount=500, balance_before=500, balance_after=0, balance_delta=-500, used_delta=500,
+                    description='Benchmark'
+                )
+                for account in accounts
+                if account.loan_status == CreditAccount.LoanStatus.EXHAUSTED
+            ])
+        # auto_now_add stamps every row with now, spread them over the window
+        for model in (RepaymentHistory, CreditTransaction):
+            for week in range(weeks):
+                model.objects.alias(week=Mod(F('id'), weeks)).filter(week=week).update(
+                    created_at=now - datetime.timedelta(weeks=week, hours=random.randint(0, 24))
+                )
+        self.stdout.write(f'Seeded {total} credit accounts in {time.perf_counter() - start:.1f}s')
@@ -0,0 +1,116 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from accounts.models import User
+from credits.models import CreditAccount, CreditBalanceSnapshot, CreditLimitHistory, RepaymentHistory
+from credits.views import all_credit_accounts, all_credit_limit_history, all_repayment_history
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds synthetic credit accounts, repayments and limit increases inside a '
+        'rolled-back transaction and checks that the admin credit lists run a '
+        'fixed number of queries per page'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, default=20000)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            admin = self.seed(options['accounts'])
+            cases = [
+                ('all_credit_accounts, first page', all_credit_accounts, {}),
+                ('all_credit_accounts, 100 rows', all_credit_accounts, {'page_size': 100}),
+                ('all_credit_accounts, EXHAUSTED', all_credit_accounts, {'status': 'EXHAUSTED', 'page_size': 100}),
+                ('all_credit_accounts, balance range', all_credit_accounts, {'min_balance': 1000, 'max_balance': 5000}),
+                ('all_repayment_history, first page', all_repayment_history, {}),
+                ('all_repayment_history, 100 rows', all_repayment_history, {'page_size': 100}),
+                ('all_repayment_history, date and amount', all_repayment_history,
+                 {'date_from': '2000-01-01', 'min_amount': 1000, 'page_size': 100}),
+                ('all_credit_limit_history, first page', all_credit_limit_history, {}),
+                ('all_credit_limit_history, 100 rows', all_credit_limit_history, {'page_size': 100}),
+            ]
+            results = [(label, view, *self.measure(view, admin, params, options['runs'])) for label, view, params in cases]
+            transaction.set_rollback(True)
+
+        for label, _, timings, query_count in results:
+            p50 = timings[len(timings) // 2]
+            p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+            self.stdout.write(f'{label}: {query_count} queries, p50 {p50:.1f}ms, p95 {p95:.1f}ms')
+
+        # The accounts list also reads the page's figures from the credit ledger
+        counts = {}
+        for _, view, _, query_count in results:
+            counts.setdefault(view, set()).add(query_count)
+        if any(len(view_counts) > 1 for view_counts in counts.values()):
+            raise CommandError('Query count depends on the filters or page size')
+        self.stdout.write(self.style.SUCCESS('Credit lists run a fixed number of queries per page'))
+
+    def seed(self, total):
+        start = time.perf_counter()
+        admin = User.objects.create_user('benchmark-admin', 'benchmark-admin@example.com', role='ADMIN')
+        password = make_password(None)
+        # bulk_create skips the signals, accounts are created below
+        users = User.objects.bulk_create([
+            User(username=f'benchmark-buyer-{i}', email=f'benchmark-buyer-{i}@example.com', role='BUYER',
+                 first_name='Buyer', last_name=str(i), password=password)
+            for i in range(total)
+        ], batch_size=1000)
+        accounts = []
+        for user in users:
+            balance = random.choice([0, random.randint(0, 50000)])
+            accounts.append(CreditAccount(
+                user=user,
+                credit_balance=balance,
+                total_credit_used=50000 - balance,
+                loan_status=CreditAccount.LoanStatus.EXHAUSTED if balance == 0 else random.choice(
+                    [CreditAccount.LoanStatus.ACTIVE, CreditAccount.LoanStatus.ACTIVE, CreditAccount.LoanStatus.SUSPENDED]
+                ),
+            ))
+        accounts = CreditAccount.objects.bulk_create(accounts, batch_size=1000)
+        # bulk_create skips save(), which writes the opening ledger snapshot
+        CreditBalanceSnapshot.objects.bulk_create([
+            CreditBalanceSnapshot(
+                credit_account=account, credit_limit=account.credit_limit, credit_balance=account.credit_balance,
+                total_credit_used=account.total_credit_used, total_repaid=account.total_repaid
+            )
+            for account in accounts
+        ], batch_size=2000)
+        RepaymentHistory.objects.bulk_create([
+            RepaymentHistory(credit_account=account, amount=random.randint(100, 20000), repaid_by=admin)
+            for account in accounts
+            for _ in range(random.randint(0, 3))
+        ], batch_size=2000)
+        CreditLimitHistory.objects.bulk_create([
+            CreditLimitHistory(credit_account=account, old_limit=50000, new_limit=random.randint(50001, 200000),
+                               increased_by=admin, reason='Benchmark')
+            for account in random.sample(accounts, len(accounts) // 5)
+        ], batch_size=2000)
+        self.stdout.write(f'Seeded {total} credit accounts in {time.perf_counter() - start:.1f}s')
+        return admin
+
+    def measure(self, view, user, params, runs):
+        factory = APIRequestFactory()
+
+        def call():
+            request = factory.get('/api/credits/', params)
+            force_authenticate(request, user=user)
+            response = view(request)
+            assert response.status_code == 200, response.data
+            return response
+
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings), len(queries)
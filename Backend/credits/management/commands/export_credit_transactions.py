@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from credits import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams credit transactions as CSV or JSONL to a file (or stdout), oldest '
+        'first, in constant memory. Filters match the admin export endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(export.FORMATS), default='csv')
+        parser.add_argument('--output', default='-', help="File to write, '-' for stdout")
+        parser.add_argument('--date-from', help='YYYY-MM-DD or ISO datetime')
+        parser.add_argument('--date-to', help='YYYY-MM-DD (whole day) or ISO datetime')
+        parser.add_argument('--type', help='Comma separated transaction types')
+        parser.add_argument('--user', help='User id')
+        parser.add_argument('--chunk-size', type=int, default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        params = {
+            key: options[option] for key, option in (
+                ('date_from', 'date_from'), ('date_to', 'date_to'), ('type', 'type'), ('user', 'user'),
+            ) if options[option]
+        }
+        try:
+            queryset = export.transactions(params)
+        except ValueError as e:
+            raise CommandError(e)
+
+        lines = export.lines(queryset, options['format'], options['chunk_size'])
+        written = -1 if options['format'] == 'csv' else 0
+        if options['output'] == '-':
+            for line in lines:
+                sys.stdout.write(line)
+                written += 1
+        else:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                for line in lines:
+                    f.write(line)
+                    written += 1
+            self.stdout.write(self.style.SUCCESS(f"Exported {written} transactions to {options['output']}"))
@@ -0,0 +1,143 @@
+import multiprocessing
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from accounts.models import User
+from credits import ledger
+from credits.models import CreditAccount, CreditTransaction
+
+# SQLite serializes writers; an operation that times out on the lock is retried
+LOCK_RETRIES = 20
+
+
+def run_worker(account_id, admin_id, operations, amount, seed, barrier, results):
+    """
+    Worker process: purchases, refunds of its own purchases and repayments on
+    the shared account. Like a second browser tab, it keeps one instance it
+    loaded before the others started writing.
+    """
+    rng = random.Random(seed)
+    account = CreditAccount.objects.get(pk=account_id)
+    admin = User.objects.get(pk=admin_id)
+    bought = 0
+    counts = {'purchased': 0, 'rejected': 0, 'refunded': 0, 'repaid': 0}
+    barrier.wait()
+    for _ in range(operations):
+        roll = rng.random()
+        for _ in range(LOCK_RETRIES):
+            try:
+                with transaction.atomic():
+                    if roll < 0.7:
+                        try:
+                            account.deduct_credit(amount, description='Stress purchase')
+                        except ValueError:
+                            counts['rejected'] += 1
+                        else:
+                            counts['purchased'] += 1
+                            bought += 1
+                    elif roll < 0.85 and bought:
+                        account.refund_credit(amount, description='Stress refund')
+                        counts['refunded'] += 1
+                        bought -= 1
+                    else:
+                        account.process_repayment(amount / 2, admin, 'Stress repayment')
+                        counts['repaid'] += 1
+                break
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                time.sleep(0.05)
+    results.put(counts)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs purchases, refunds and repayments on one credit account from many '
+        'processes at once and checks the balance never goes negative, the ledger '
+        'sequence has no gaps and the transaction chain matches the ledger balance.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent processes')
+        parser.add_argument('--operations', type=int, default=25, help='Operations per worker')
+        parser.add_argument('--amount', type=Decimal, default=Decimal('3000'), help='Purchase amount')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        buyer = User.objects.create_user(f'stress-credit-{tag}', f'stress-credit-{tag}@example.com', role='BUYER')
+        admin = User.objects.create_user(f'stress-admin-{tag}', f'stress-admin-{tag}@example.com', role='ADMIN')
+        try:
+            account = CreditAccount.objects.get(user=buyer)
+            elapsed, outcomes = self.run_workers(account.pk, admin.pk, options)
+            self.verify(account.pk, elapsed, outcomes)
+        finally:
+            buyer.delete()
+            admin.delete()
+
+    def run_workers(self, account_id, admin_id, options):
+        context = multiprocessing.get_context('fork')
+        workers = max(1, options['workers'])
+        barrier = context.Barrier(workers)
+        results = context.Queue()
+        # Children must open their own connections
+        connections.close_all()
+        processes = [
+            context.Process(
+                target=run_worker,
+                args=(account_id, admin_id, options['operations'], options['amount'], i, barrier, results)
+            )
+            for i in range(workers)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        return time.perf_counter() - start, outcomes
+
+    def verify(self, account_id, elapsed, outcomes):
+        totals = {key: sum(outcome[key] for outcome in outcomes) for key in outcomes[0]}
+        self.stdout.write(
+            f"{sum(totals.values())} operations in {elapsed:.2f}s: {totals['purchased']} purchases, "
+            f"{totals['rejected']} rejected, {totals['refunded']} refunds, {totals['repaid']} repayments"
+        )
+
+        current = ledger.balances(account_id)
+        entries = list(CreditTransaction.objects.filter(credit_account_id=account_id).order_by('sequence'))
+        purchases = sum(1 for entry in entries if entry.transaction_type == CreditTransaction.TransactionType.PURCHASE)
+        self.stdout.write(
+            f'Ledger: balance {current.balance}, used {current.used}, '
+            f'repaid {current.repaid}, {len(entries)} transactions'
+        )
+
+        problems = []
+        if purchases != totals['purchased']:
+            problems.append(f"{purchases} purchases in the ledger, workers saw {totals['purchased']}")
+        previous = None
+        for position, entry in enumerate(entries, 1):
+            if entry.sequence != position:
+                problems.append(f'transaction {entry.id} has sequence {entry.sequence}, expected {position}')
+            if entry.balance_after < 0:
+                problems.append(f'transaction {entry.id} left the balance at {entry.balance_after}')
+            if previous is not None and entry.balance_before != previous.balance_after:
+                problems.append(f'transaction {entry.id} does not follow {previous.id}')
+            previous = entry
+        if current.balance < 0:
+            problems.append('balance went negative')
+        if previous is not None and previous.balance_after != current.balance:
+            problems.append('last transaction does not match the ledger balance')
+        # Every write updated the columns as well
+        account = CreditAccount.objects.get(pk=account_id)
+        stored = {field: getattr(account, field) for field in current.as_account_fields()}
+        if stored != current.as_account_fields():
+            problems.append(f'account columns {stored} differ from the ledger {current.as_account_fields()}')
+
+        if problems:
+            raise CommandError('; '.join(problems[:10]))
+        self.stdout.write(self.style.SUCCESS('Balances exact: no overspending, ledger and transaction chain agree'))
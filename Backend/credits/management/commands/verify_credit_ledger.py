@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from credits import ledger
+from credits.models import CreditAccount
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the CreditAccount balance columns with the ledger (snapshot plus '
+        'tail); every ledger write updates them, so they only differ after writes '
+        'around the ledger. With --fix, rewrites mismatching columns from the ledger.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fields = [field for _, field in ledger.FIGURES.values()]
+        accounts = CreditAccount.objects.order_by('id').values_list('id', *fields)
+        batch, checked, mismatched = [], 0, 0
+        for row in accounts.iterator(chunk_size=options['batch_size']):
+            batch.append(row)
+            if len(batch) >= options['batch_size']:
+                mismatched += self.check_batch(batch, fields, options['fix'])
+                checked += len(batch)
+                batch = []
+        if batch:
+            mismatched += self.check_batch(batch, fields, options['fix'])
+            checked += len(batch)
+
+        self.stdout.write(f'Checked {checked} accounts, {mismatched} differ from the ledger')
+        if mismatched and not options['fix']:
+            raise CommandError('Ledger and account columns disagree, rerun with --fix to rewrite them')
+
+    def check_batch(self, rows, fields, fix):
+        mismatched = 0
+        with transaction.atomic():
+            expected = ledger.balances_many([row[0] for row in rows])
+            for account_id, *values in rows:
+                derived = expected[account_id].as_account_fields()
+                stored = dict(zip(fields, values))
+                if stored == derived:
+                    continue
+                mismatched += 1
+                self.stdout.write(f'Account {account_id}: columns {stored}, ledger {derived}')
+            if fix:
+                ledger.refresh_columns(expected)
+        return mismatched
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_ledger(apps, schema_editor):
+    """
+    Give existing transactions their deltas and every account an opening
+    snapshot of its current columns, so the ledger starts out agreeing with them.
+    """
+    CreditAccount = apps.get_model('credits', 'CreditAccount')
+    CreditTransaction = apps.get_model('credits', 'CreditTransaction')
+    CreditBalanceSnapshot = apps.get_model('credits', 'CreditBalanceSnapshot')
+
+    updated = []
+    for entry in CreditTransaction.objects.iterator(chunk_size=2000):
+        change = entry.balance_after - entry.balance_before
+        entry.balance_delta = change
+        if entry.transaction_type == 'PURCHASE':
+            entry.used_delta = entry.amount
+        elif entry.transaction_type == 'ADJUSTMENT':
+            entry.used_delta = -change
+        elif entry.transaction_type == 'REPAYMENT':
+            entry.repaid_delta = entry.amount
+        elif entry.transaction_type == 'LIMIT_INCREASE':
+            entry.limit_delta = entry.amount
+        updated.append(entry)
+        if len(updated) >= 2000:
+            CreditTransaction.objects.bulk_update(updated, ['balance_delta', 'used_delta', 'repaid_delta', 'limit_delta'])
+            updated = []
+    CreditTransaction.objects.bulk_update(updated, ['balance_delta', 'used_delta', 'repaid_delta', 'limit_delta'])
+
+    last_ids = dict(
+        CreditTransaction.objects.values('credit_account_id').annotate(last_id=Max('id'))
+        .values_list('credit_account_id', 'last_id')
+    )
+    snapshots = []
+    for account in CreditAccount.objects.iterator(chunk_size=2000):
+        snapshots.append(CreditBalanceSnapshot(
+            credit_account_id=account.id,
+            last_transaction_id=last_ids.get(account.id, 0),
+            credit_limit=account.credit_limit,
+            credit_balance=account.credit_balance,
+            total_credit_used=account.total_credit_used,
+            total_repaid=account.total_repaid,
+        ))
+    CreditBalanceSnapshot.objects.bulk_create(snapshots, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credits', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_transaction_id', models.PositiveBigIntegerField(default=0)),
+                ('credit_limit', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('credit_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('total_credit_used', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('total_repaid', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'credit_balance_snapshots',
+            },
+        ),
+        migrations.AddField(
+            model_name='credittransaction',
+            name='balance_delta',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='credittransaction',
+            name='limit_delta',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='credittransaction',
+            name='repaid_delta',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='credittransaction',
+            name='used_delta',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='credittransaction',
+            index=models.Index(fields=['credit_account', 'id'], name='credit_tran_credit__533499_idx'),
+        ),
+        migrations.AddField(
+            model_name='creditbalancesnapshot',
+            name='credit_account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='credits.creditaccount'),
+        ),
+        migrations.AddIndex(
+            model_name='creditbalancesnapshot',
+            index=models.Index(fields=['credit_account', '-last_transaction_id'], name='credit_bala_credit__3a4f8f_idx'),
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credits', '0002_credit_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='creditaccount',
+            index=models.Index(fields=['-created_at', '-id'], name='credit_acco_created_a8abfa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditaccount',
+            index=models.Index(fields=['loan_status', '-created_at', '-id'], name='credit_acco_loan_st_4c562d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditaccount',
+            index=models.Index(fields=['credit_balance'], name='credit_acco_credit__45c306_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditlimithistory',
+            index=models.Index(fields=['-created_at', '-id'], name='credit_limi_created_cfad7e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditlimithistory',
+            index=models.Index(fields=['credit_account', '-created_at'], name='credit_limi_credit__19ce95_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repaymenthistory',
+            index=models.Index(fields=['-created_at', '-id'], name='repayment_h_created_251937_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repaymenthistory',
+            index=models.Index(fields=['credit_account', '-created_at'], name='repayment_h_credit__1211a0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repaymenthistory',
+            index=models.Index(fields=['amount'], name='repayment_h_amount_a996ef_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credits', '0003_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='credittransaction',
+            index=models.Index(fields=['created_at', 'id'], name='credit_tran_created_cfc7ae_idx'),
+        ),
+    ]
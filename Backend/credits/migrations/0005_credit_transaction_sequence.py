@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def number_transactions(apps, schema_editor):
+    """Sequence 1, 2, ... per account in id order; snapshots move to the same positions"""
+    CreditTransaction = apps.get_model('credits', 'CreditTransaction')
+    CreditBalanceSnapshot = apps.get_model('credits', 'CreditBalanceSnapshot')
+
+    positions = {}
+    numbered, account_id, sequence = [], None, 0
+    rows = CreditTransaction.objects.order_by('credit_account_id', 'id').values_list('credit_account_id', 'id')
+    for row_account_id, transaction_id in rows.iterator(chunk_size=BATCH_SIZE):
+        if row_account_id != account_id:
+            account_id, sequence = row_account_id, 0
+        sequence += 1
+        positions[transaction_id] = (account_id, sequence)
+        numbered.append(CreditTransaction(id=transaction_id, sequence=sequence))
+        if len(numbered) >= BATCH_SIZE:
+            CreditTransaction.objects.bulk_update(numbered, ['sequence'])
+            numbered = []
+    CreditTransaction.objects.bulk_update(numbered, ['sequence'])
+
+    # Last sequence at or below each snapshot's transaction id
+    by_account = {}
+    for transaction_id, (account_id, sequence) in sorted(positions.items()):
+        by_account.setdefault(account_id, []).append((transaction_id, sequence))
+    snapshots = []
+    for snapshot in CreditBalanceSnapshot.objects.exclude(last_transaction_id=0).iterator(chunk_size=BATCH_SIZE):
+        counted = [sequence for transaction_id, sequence in by_account.get(snapshot.credit_account_id, [])
+                   if transaction_id <= snapshot.last_transaction_id]
+        snapshot.last_sequence = counted[-1] if counted else 0
+        snapshots.append(snapshot)
+    CreditBalanceSnapshot.objects.bulk_update(snapshots, ['last_sequence'], batch_size=BATCH_SIZE)
+
+
+def unnumber_snapshots(apps, schema_editor):
+    CreditTransaction = apps.get_model('credits', 'CreditTransaction')
+    CreditBalanceSnapshot = apps.get_model('credits', 'CreditBalanceSnapshot')
+    ids = dict(
+        ((account_id, sequence), transaction_id)
+        for account_id, sequence, transaction_id in CreditTransaction.objects.values_list('credit_account_id', 'sequence', 'id')
+    )
+    snapshots = []
+    for snapshot in CreditBalanceSnapshot.objects.exclude(last_sequence=0).iterator(chunk_size=BATCH_SIZE):
+        snapshot.last_transaction_id = ids.get((snapshot.credit_account_id, snapshot.last_sequence), 0)
+        snapshots.append(snapshot)
+    CreditBalanceSnapshot.objects.bulk_update(snapshots, ['last_transaction_id'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credits', '0004_credit_transaction_export_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='credittransaction',
+            name='sequence',
+            field=models.PositiveBigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='creditbalancesnapshot',
+            name='last_sequence',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(number_transactions, unnumber_snapshots),
+        migrations.AlterField(
+            model_name='credittransaction',
+            name='sequence',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.RemoveIndex(
+            model_name='credittransaction',
+            name='credit_tran_credit__533499_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='credittransaction',
+            constraint=models.UniqueConstraint(fields=('credit_account', 'sequence'), name='credit_transaction_sequence'),
+        ),
+        migrations.RemoveIndex(
+            model_name='creditbalancesnapshot',
+            name='credit_bala_credit__3a4f8f_idx',
+        ),
+        migrations.RemoveField(
+            model_name='creditbalancesnapshot',
+            name='last_transaction_id',
+        ),
+        migrations.AddIndex(
+            model_name='creditbalancesnapshot',
+            index=models.Index(fields=['credit_account', '-last_sequence'], name='credit_bala_credit__e8c8a6_idx'),
+        ),
+    ]
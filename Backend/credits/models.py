@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from accounts.models import User
+from outbox.models import OutboxEvent
 
 # Default credit limit constant
 DEFAULT_CREDIT_LIMIT = 50000  # ₦50,000
@@ -25,6 +26,8 @@ class CreditAccount(models.Model):
     )
     
     # Credit Information
+    # The figures are a cache of the credit ledger (credits/ledger.py), which is
+    # the source of truth; snapshot_credit_balances refreshes them
     credit_limit = models.DecimalField(
         max_digits=12,
         decimal_places=2,
@@ -71,6 +74,10 @@ class CreditAccount(models.Model):
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['loan_status']),
+            # Admin list: newest first (keyset on created_at, id), by status, by balance
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['loan_status', '-created_at', '-id']),
+            models.Index(fields=['credit_balance']),
         ]
     
     def __str__(self):
@@ -87,47 +94,89 @@ class CreditAccount(models.Model):
         return self.credit_limit - self.credit_balance
     
     def can_purchase(self, amount):
-        """Check if user has sufficient credit for purchase"""
+        """Check if user has sufficient credit for purchase (figures from the ledger)"""
+        from . import ledger
+        
+        ledger.attach([self])
         return (
             self.loan_status == self.LoanStatus.ACTIVE and
             self.credit_balance >= amount
         )
     
-    def deduct_credit(self, amount):
-        """Deduct credit after purchase"""
-        if not self.can_purchase(amount):
-            raise ValueError(
-                f"Insufficient credit. Available: ₦{self.credit_balance:,.2f}, Required: ₦{amount:,.2f}"
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            # Opening figures, the ledger adds transactions on top of them
+            CreditBalanceSnapshot.objects.create(
+                credit_account=self,
+                last_sequence=0,
+                credit_limit=self.credit_limit,
+                credit_balance=self.credit_balance,
+                total_credit_used=self.total_credit_used,
+                total_repaid=self.total_repaid
             )
+    
+    @transaction.atomic
+    def deduct_credit(self, amount, description='', reference=''):
+        """Deduct credit after purchase, returns the PURCHASE transaction"""
+        from . import ledger
+        
+        def change(before, loan_status):
+            # Checked against the whole ledger before the row takes its sequence
+            # number, so two checkouts racing on the same account cannot both pass
+            if loan_status != self.LoanStatus.ACTIVE or before.balance < amount:
+                raise ValueError(
+                    f"Insufficient credit. Available: ₦{before.balance:,.2f}, Required: ₦{amount:,.2f}"
+                )
+            # Update loan status if exhausted
+            fields = {'loan_status': self.LoanStatus.EXHAUSTED} if before.balance <= amount else {}
+            return amount, {'balance': -amount, 'used': amount}, fields
         
-        self.credit_balance -= amount
-        self.total_credit_used += amount
+        return ledger.post(
+            self, CreditTransaction.TransactionType.PURCHASE,
+            description or f"Purchase of ₦{amount:,.2f}", reference, change
+        )
+    
+    @transaction.atomic
+    def refund_credit(self, amount, description, reference=''):
+        """Give back credit from a cancelled purchase, returns the ADJUSTMENT transaction"""
+        from . import ledger
         
-        # Update loan status if exhausted
-        if self.credit_balance <= 0:
-            self.loan_status = self.LoanStatus.EXHAUSTED
+        def change(before, loan_status):
+            # If loan was exhausted, make it active again
+            fields = {'loan_status': self.LoanStatus.ACTIVE} if loan_status == self.LoanStatus.EXHAUSTED else {}
+            return amount, {'balance': amount, 'used': -amount}, fields
         
-        self.save()
+        return ledger.post(self, CreditTransaction.TransactionType.ADJUSTMENT, description, reference, change)
     
-    def process_repayment(self, amount, repaid_by_admin):
-        """Process loan repayment"""
+    @transaction.atomic
+    def process_repayment(self, amount, repaid_by_admin, notes=''):
+        """Process loan repayment, returns the REPAYMENT transaction"""
         from django.utils import timezone
+        from . import ledger
         
         if amount <= 0:
             raise ValueError("Repayment amount must be greater than zero")
         
-        # Record repayment
-        self.total_repaid += amount
-        self.credit_balance += amount
-        self.last_repayment_date = timezone.now()
+        now = timezone.now()
         
-        # If fully repaid, reset status
-        if self.credit_balance >= self.credit_limit:
-            self.credit_balance = self.credit_limit
-            self.loan_status = self.LoanStatus.ACTIVE
-            self.total_credit_used = 0
+        def change(before, loan_status):
+            fields = {'last_repayment_date': now}
+            deltas = {'balance': amount, 'repaid': amount}
+            # If fully repaid, reset status
+            if before.balance + amount >= before.limit:
+                deltas['balance'] = before.limit - before.balance
+                deltas['used'] = -before.used
+                fields['loan_status'] = self.LoanStatus.ACTIVE
+            return amount, deltas, fields
         
-        self.save()
+        entry = ledger.post(
+            self, CreditTransaction.TransactionType.REPAYMENT,
+            f"Loan repayment processed by admin. {notes}",
+            f"REPAY_{self.user_id}_{now.strftime('%Y%m%d%H%M%S')}",
+            change
+        )
         
         # Create repayment record
         RepaymentHistory.objects.create(
@@ -135,27 +184,52 @@ class CreditAccount(models.Model):
             amount=amount,
             repaid_by=repaid_by_admin
         )
+        
+        OutboxEvent.emit(
+            OutboxEvent.Topic.CREDIT_REPAID,
+            'credit_account',
+            self.id,
+            {
+                'credit_account_id': self.id,
+                'user_id': self.user_id,
+                'amount': amount,
+                'credit_balance': self.credit_balance,
+                'total_repaid': self.total_repaid,
+                'loan_status': self.loan_status,
+                'repaid_by': repaid_by_admin.id,
+            }
+        )
+        return entry
     
-    def increase_credit_limit(self, new_limit, approved_by_admin):
-        """Admin increases user's credit limit"""
-        if new_limit <= self.credit_limit:
-            raise ValueError("New limit must be greater than current limit")
+    @transaction.atomic
+    def increase_credit_limit(self, new_limit, approved_by_admin, reason=''):
+        """Admin increases user's credit limit, returns the LIMIT_INCREASE transaction"""
+        from django.utils import timezone
+        from . import ledger
         
-        old_limit = self.credit_limit
-        increase_amount = new_limit - old_limit
+        def change(before, loan_status):
+            if new_limit <= before.limit:
+                raise ValueError("New limit must be greater than current limit")
+            increase_amount = new_limit - before.limit
+            fields = {'loan_status': self.LoanStatus.ACTIVE} if loan_status != self.LoanStatus.ACTIVE else {}
+            return increase_amount, {'limit': increase_amount, 'balance': increase_amount}, fields
         
-        self.credit_limit = new_limit
-        self.credit_balance += increase_amount
-        self.loan_status = self.LoanStatus.ACTIVE
-        self.save()
+        entry = ledger.post(
+            self, CreditTransaction.TransactionType.LIMIT_INCREASE,
+            f"Credit limit increased by admin. {reason}",
+            f"LIMIT_INC_{self.user_id}_{timezone.now().strftime('%Y%m%d%H%M%S')}",
+            change
+        )
         
         # Create credit increase record
         CreditLimitHistory.objects.create(
             credit_account=self,
-            old_limit=old_limit,
+            old_limit=new_limit - entry.limit_delta,
             new_limit=new_limit,
-            increased_by=approved_by_admin
+            increased_by=approved_by_admin,
+            reason=reason
         )
+        return entry
 
 
 class RepaymentHistory(models.Model):
@@ -188,6 +262,12 @@ class RepaymentHistory(models.Model):
         db_table = 'repayment_history'
         ordering = ['-created_at']
         verbose_name_plural = 'Repayment histories'
+        indexes = [
+            # Admin list: newest first (keyset on created_at, id), per buyer, by amount
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['credit_account', '-created_at']),
+            models.Index(fields=['amount']),
+        ]
     
     def __str__(self):
         return f"{self.credit_account.user.get_full_name()} - ₦{self.amount:,.2f}"
@@ -220,6 +300,11 @@ class CreditLimitHistory(models.Model):
         db_table = 'credit_limit_history'
         ordering = ['-created_at']
         verbose_name_plural = 'Credit limit histories'
+        indexes = [
+            # Admin list: newest first (keyset on created_at, id), per buyer
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['credit_account', '-created_at']),
+        ]
     
     def __str__(self):
         return (
@@ -252,6 +337,15 @@ class CreditTransaction(models.Model):
     balance_before = models.DecimalField(max_digits=12, decimal_places=2)
     balance_after = models.DecimalField(max_digits=12, decimal_places=2)
     
+    # Position in the account's ledger, 1, 2, ... (unique per account, see credits/ledger.py)
+    sequence = models.PositiveBigIntegerField()
+    
+    # Signed changes to the account figures, summed by credits/ledger.py
+    limit_delta = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    balance_delta = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    used_delta = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    repaid_delta = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
     description = models.TextField()
     reference = models.CharField(max_length=100, blank=True)
     
@@ -263,7 +357,40 @@ class CreditTransaction(models.Model):
         indexes = [
             models.Index(fields=['credit_account', '-created_at']),
             models.Index(fields=['transaction_type']),
+            # Date range exports, read in (created_at, id) order
+            models.Index(fields=['created_at', 'id']),
+        ]
+        constraints = [
+            # One writer per ledger position; also serves the ledger tail reads
+            models.UniqueConstraint(fields=['credit_account', 'sequence'], name='credit_transaction_sequence'),
+        ]
+    
+    def __str__(self):
+        return f"{self.transaction_type} - ₦{self.amount:,.2f} ({self.created_at})"
+
+
+class CreditBalanceSnapshot(models.Model):
+    """Account figures as of a ledger position (see credits/ledger.py)"""
+    credit_account = models.ForeignKey(
+        CreditAccount,
+        on_delete=models.CASCADE,
+        related_name='balance_snapshots'
+    )
+    # Every transaction up to and including this sequence number is counted below
+    last_sequence = models.PositiveBigIntegerField(default=0)
+    
+    credit_limit = models.DecimalField(max_digits=12, decimal_places=2)
+    credit_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    total_credit_used = models.DecimalField(max_digits=12, decimal_places=2)
+    total_repaid = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'credit_balance_snapshots'
+        indexes = [
+            models.Index(fields=['credit_account', '-last_sequence']),
         ]
     
     def __str__(self):
-        return f"{self.transaction_type} - ₦{self.amount:,.2f} ({self.created_at})"
\ No newline at end of file
+        return f"{self.credit_account_id} @ {self.last_sequence}: ₦{self.credit_balance:,.2f}"
\ No newline at end of file
@@ -25,6 +25,28 @@ class CreditAccountSerializer(serializers.ModelSerializer):
         ]
 
 
+class CreditAccountListSerializer(serializers.ModelSerializer):
+    """Flat row for the admin list, reads only the account and its user (select_related)"""
+    user_id = serializers.IntegerField(read_only=True)
+    user_email = serializers.EmailField(source='user.email', read_only=True)
+    user_name = serializers.CharField(source='user.get_full_name', read_only=True)
+    outstanding_balance = serializers.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        read_only=True
+    )
+    
+    class Meta:
+        model = CreditAccount
+        fields = [
+            'id', 'user_id', 'user_email', 'user_name',
+            'credit_limit', 'credit_balance', 'available_credit',
+            'outstanding_balance', 'total_credit_used', 'loan_status',
+            'total_repaid', 'last_repayment_date', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
 class RepaymentSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=12, decimal_places=2)
     notes = serializers.CharField(required=False, allow_blank=True)
@@ -1,3 +1,306 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from . import export, ledger
+from .filters import filter_list
+from .models import CreditAccount, CreditTransaction
+
+# Writers that lose the SQLite lock are retried (see stress_credit)
+LOCK_RETRIES = 200
+
+
+def make_account(name='buyer'):
+    """Credit account (created by the user signals) with the default ₦50,000 limit"""
+    user = User.objects.create_user(name, f'{name}@example.com', role='BUYER')
+    return CreditAccount.objects.get(user=user)
+
+
+def assert_chain(test, account):
+    """Sequence numbers have no gaps and every balance follows the one before"""
+    entries = list(CreditTransaction.objects.filter(credit_account=account).order_by('sequence'))
+    test.assertEqual([entry.sequence for entry in entries], list(range(1, len(entries) + 1)))
+    for previous, entry in zip(entries, entries[1:]):
+        test.assertEqual(entry.balance_before, previous.balance_after)
+    test.assertTrue(all(entry.balance_after >= 0 for entry in entries))
+    return entries
+
+
+class CreditLedgerTests(TestCase):
+    def test_deduct_refuses_more_than_the_ledger_balance(self):
+        account = make_account()
+        # A second tab holding the account from before the first purchase
+        stale = CreditAccount.objects.get(pk=account.pk)
+
+        account.deduct_credit(Decimal('30000'))
+        with self.assertRaises(ValueError):
+            stale.deduct_credit(Decimal('30000'))
+
+        self.assertEqual(ledger.balances(account.pk).balance, Decimal('20000'))
+        self.assertEqual(stale.credit_balance, Decimal('20000'))
+        self.assertEqual(len(assert_chain(self, account)), 1)
+
+    def test_post_reads_again_when_its_sequence_number_is_taken(self):
+        account = make_account()
+        other = CreditAccount.objects.get(pk=account.pk)
+        calls = []
+
+        def change(before, loan_status):
+            if not calls:
+                # A concurrent purchase takes the next sequence number first
+                other.deduct_credit(Decimal('40000'))
+            calls.append(before.balance)
+            if before.balance < Decimal('30000'):
+                raise ValueError('Insufficient credit')
+            return Decimal('30000'), {'balance': Decimal('-30000'), 'used': Decimal('30000')}, {}
+
+        with self.assertRaises(ValueError):
+            ledger.post(account, CreditTransaction.TransactionType.PURCHASE, 'Purchase', '', change)
+
+        self.assertEqual(calls, [Decimal('50000'), Decimal('10000')])
+        self.assertEqual(ledger.balances(account.pk).balance, Decimal('10000'))
+        assert_chain(self, account)
+
+    def test_exhausting_and_refunding_move_the_loan_status(self):
+        account = make_account()
+
+        account.deduct_credit(Decimal('50000'))
+        self.assertFalse(account.can_purchase(Decimal('1')))
+        account.refund_credit(Decimal('100'), 'Refund')
+
+        account.refresh_from_db(fields=['loan_status'])
+        self.assertEqual(account.loan_status, CreditAccount.LoanStatus.ACTIVE)
+        self.assertTrue(account.can_purchase(Decimal('100')))
+
+    def test_balance_columns_follow_the_ledger(self):
+        account = make_account()
+        account.deduct_credit(Decimal('12500'))
+
+        cached = CreditAccount.objects.get(pk=account.pk)
+        self.assertEqual(cached.credit_balance, Decimal('37500'))
+        self.assertEqual(cached.total_credit_used, Decimal('12500'))
+
+        # A write around the ledger is repaired by the snapshot run
+        CreditAccount.objects.filter(pk=account.pk).update(credit_balance=0)
+        call_command('snapshot_credit_balances', min_tail=1, stdout=StringIO())
+        cached.refresh_from_db()
+        self.assertEqual(cached.credit_balance, Decimal('37500'))
+        self.assertEqual(ledger.balances(account.pk).tail, 0)
+
+    def test_accounts_without_a_snapshot_start_from_their_columns(self):
+        account = make_account()
+        # As left by bulk_create or loaddata, which skip CreditAccount.save
+        account.balance_snapshots.all().delete()
+        CreditAccount.objects.filter(pk=account.pk).update(credit_limit=80000, credit_balance=60000)
+
+        account.deduct_credit(Decimal('10000'))
+        self.assertEqual(ledger.balances(account.pk).balance, Decimal('50000'))
+
+        call_command('snapshot_credit_balances', stdout=StringIO())
+        account.refresh_from_db()
+        self.assertEqual(account.credit_balance, Decimal('50000'))
+        self.assertEqual(account.balance_snapshots.count(), 1)
+        self.assertEqual(ledger.balances(account.pk).balance, Decimal('50000'))
+        call_command('verify_credit_ledger', stdout=StringIO())
+
+
+class LedgerCommandTests(TestCase):
+    def test_snapshots_wait_for_a_long_enough_tail(self):
+        busy, quiet = make_account('busy'), make_account('quiet')
+        for _ in range(3):
+            busy.deduct_credit(Decimal('100'))
+        quiet.deduct_credit(Decimal('100'))
+
+        call_command('snapshot_credit_balances', min_tail=3, batch_size=1, stdout=StringIO())
+        self.assertEqual((busy.balance_snapshots.count(), quiet.balance_snapshots.count()), (2, 1))
+        self.assertEqual(ledger.balances(busy.pk), ledger.Balances(
+            limit=Decimal('50000'), balance=Decimal('49700'), used=Decimal('300'), sequence=3
+        ))
+        self.assertEqual(ledger.balances(quiet.pk).tail, 1)
+
+    def test_verify_reports_columns_that_differ_and_fix_rewrites_them(self):
+        account = make_account()
+        account.deduct_credit(Decimal('2000'))
+        call_command('verify_credit_ledger', stdout=StringIO())
+
+        CreditAccount.objects.filter(pk=account.pk).update(credit_balance=50000, total_credit_used=0)
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('verify_credit_ledger', stdout=out)
+        self.assertIn(f'Account {account.pk}:', out.getvalue())
+
+        call_command('verify_credit_ledger', fix=True, stdout=StringIO())
+        account.refresh_from_db()
+        self.assertEqual((account.credit_balance, account.total_credit_used), (Decimal('48000'), Decimal('2000')))
+        call_command('verify_credit_ledger', stdout=StringIO())
+
+
+class FilterListTests(TestCase):
+    def test_non_finite_amounts_are_rejected(self):
+        for value in ('NaN', 'sNaN', 'Infinity', '-inf', 'abc'):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                filter_list(CreditTransaction.objects.all(), {'min_amount': value}, 'amount')
+
+    def test_amount_bounds_filter(self):
+        account = make_account()
+        account.deduct_credit(Decimal('100'))
+        account.deduct_credit(Decimal('900'))
+
+        rows = filter_list(CreditTransaction.objects.all(), {'min_amount': '500.5'}, 'amount')
+        self.assertEqual([row.amount for row in rows], [Decimal('900')])
+
+
+class CreditAccountListTests(TestCase):
+    def setUp(self):
+        self.accounts = [make_account(f'buyer{i}') for i in range(3)]
+        self.accounts[0].deduct_credit(Decimal('50000'))
+        self.accounts[1].deduct_credit(Decimal('20000'))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', 'admin@example.com', role='ADMIN'))
+
+    def user_ids(self, query=''):
+        response = self.client.get(f'/api/credits/accounts/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['user_id'] for row in response.data['results'])
+
+    def test_filters(self):
+        exhausted, part_used, unused = [account.user_id for account in self.accounts]
+        self.assertEqual(self.user_ids('status=EXHAUSTED'), [exhausted])
+        # Balance bounds see the figures after the latest purchases
+        self.assertEqual(self.user_ids('min_balance=30000'), [part_used, unused])
+        self.assertEqual(self.user_ids('max_balance=0'), [exhausted])
+        self.assertEqual(self.user_ids(f'user={unused}'), [unused])
+        self.assertEqual(self.user_ids('date_from=2999-01-01'), [])
+
+        for query in ('status=OVERDUE', 'min_balance=NaN', 'user=me', 'date_to=yesterday'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/credits/accounts/?{query}').status_code, 400)
+
+    def test_pages_take_the_same_queries_for_any_number_of_accounts(self):
+        with CaptureQueriesContext(connection) as three:
+            self.client.get('/api/credits/accounts/')
+        for i in range(5):
+            make_account(f'more{i}').deduct_credit(Decimal('100'))
+        with CaptureQueriesContext(connection) as eight:
+            response = self.client.get('/api/credits/accounts/')
+        self.assertEqual(len(response.data['results']), 8)
+        self.assertEqual(len(eight), len(three))
+
+        seen, url = [], '/api/credits/accounts/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(CreditAccount.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+
+class TransactionExportTests(TestCase):
+    def setUp(self):
+        self.account = make_account()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', role='ADMIN')
+        self.account.deduct_credit(Decimal('1500'), 'Purchase, "jollof" and plantain', 'ORD1')
+        self.account.process_repayment(Decimal('1000'), self.admin)
+        make_account('other').deduct_credit(Decimal('700'), 'Purchase', 'ORD2')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, file_format, query=''):
+        response = self.client.get(f'/api/credits/transactions/export.{file_format}?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_has_a_header_and_one_row_per_transaction_oldest_first(self):
+        response, body = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="credit-transactions-\d{8}\.csv"$')
+
+        header, *rows = csv.reader(StringIO(body))
+        self.assertEqual(header, list(export.COLUMNS))
+        expected = CreditTransaction.objects.order_by('created_at', 'id')
+        self.assertEqual([int(row[0]) for row in rows], [entry.id for entry in expected])
+        first = dict(zip(header, rows[0]))
+        self.assertEqual(first['description'], 'Purchase, "jollof" and plantain')
+        self.assertEqual((first['amount'], first['user_email']), ('1500.00', 'buyer@example.com'))
+
+    def test_jsonl_rows_follow_the_filters(self):
+        response, body = self.export('jsonl', f'type=repayment&user={self.account.user_id}')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row['transaction_type'], row['amount']) for row in rows], [('REPAYMENT', '1000.00')])
+
+        _, body = self.export('jsonl', 'min_amount=800')
+        self.assertEqual([json.loads(line)['amount'] for line in body.splitlines()], ['1500.00', '1000.00'])
+
+    def test_bad_filters_and_non_admins_are_refused(self):
+        for query in ('type=GIFT', 'min_amount=NaN', 'date_from=someday'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/credits/transactions/export.csv?{query}').status_code, 400)
+
+        self.client.force_authenticate(self.account.user)
+        self.assertEqual(self.client.get('/api/credits/transactions/export.csv').status_code, 403)
+
+    def test_command_writes_the_same_rows(self):
+        _, body = self.export('jsonl')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'transactions.jsonl')
+            out = StringIO()
+            call_command('export_credit_transactions', format='jsonl', output=path, stdout=out)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), body)
+        self.assertIn('Exported 3 transactions', out.getvalue())
+
+
+class ConcurrentDeductionTests(TransactionTestCase):
+    """Purchases on one account from many threads at once"""
+
+    def test_concurrent_deductions_never_overspend(self):
+        account = make_account()
+        workers = 10
+        barrier = threading.Barrier(workers)
+        outcomes = []
+
+        def run():
+            # Like another browser tab, each thread holds its own stale instance
+            instance = CreditAccount.objects.get(pk=account.pk)
+            barrier.wait()
+            try:
+                for _ in range(LOCK_RETRIES):
+                    try:
+                        with transaction.atomic():
+                            instance.deduct_credit(Decimal('20000'))
+                    except ValueError:
+                        outcomes.append('rejected')
+                    except OperationalError as e:
+                        if 'locked' not in str(e):
+                            raise
+                        time.sleep(0.02)
+                        continue
+                    else:
+                        outcomes.append('purchased')
+                    break
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            (outcomes.count('purchased'), outcomes.count('rejected')), (2, workers - 2)
+        )
+        self.assertEqual(ledger.balances(account.pk).balance, Decimal('10000'))
+        self.assertEqual(len(assert_chain(self, account)), 2)
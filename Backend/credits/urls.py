@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 app_name = 'credits'
@@ -16,4 +16,6 @@ urlpatterns = [
     path('accounts/<int:user_id>/increase-limit/', views.increase_credit_limit, name='increase_credit_limit'),
     path('repayments/all/', views.all_repayment_history, name='all_repayment_history'),
     path('limit-history/', views.all_credit_limit_history, name='all_credit_limit_history'),
+    path('analytics/', views.credit_analytics_summary, name='credit_analytics'),
+    re_path(r'^transactions/export\.(?P<file_format>csv|jsonl)$', views.export_credit_transactions, name='export_credit_transactions'),
 ]
\ No newline at end of file
@@ -2,10 +2,17 @@ from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from shop.pagination import KeysetPagination
+from . import analytics as credit_analytics
+from . import export as transaction_export
+from . import ledger
 from .models import CreditAccount, RepaymentHistory, CreditLimitHistory, CreditTransaction
+from accounts.idempotency import idempotent
+from .filters import filter_list
 from .serializers import (
-    CreditAccountSerializer, RepaymentSerializer,
+    CreditAccountSerializer, CreditAccountListSerializer, RepaymentSerializer,
     RepaymentHistorySerializer, CreditLimitIncreaseSerializer,
     CreditLimitHistorySerializer, CreditTransactionSerializer
 )
@@ -25,6 +32,7 @@ def my_credit_account(request):
     
     # Get or create credit account
     credit_account, created = CreditAccount.objects.get_or_create(user=user)
+    ledger.attach([credit_account])
     serializer = CreditAccountSerializer(credit_account)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -69,26 +77,63 @@ def my_repayment_history(request):
     return Response([], status=status.HTTP_200_OK)
 
 
+# Admin list helpers
+def paginated_list(request, queryset, serializer_class, amount_field, prepare=None, **filter_options):
+    """
+    Filtered keyset page (newest first): one query per page, no COUNT/OFFSET.
+    `prepare(rows)` runs on the page before it is serialized.
+    """
+    try:
+        queryset = filter_list(queryset, request.query_params, amount_field, **filter_options)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    paginator = KeysetPagination(ordering='-created_at', page_size=50)
+    page = paginator.paginate_queryset(queryset, request)
+    if prepare is not None:
+        prepare(page)
+    serializer = serializer_class(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
 # Admin Views
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def all_credit_accounts(request):
-    """Admin views all credit accounts"""
+    """
+    Admin views all credit accounts, newest first, cursor paginated.
+    Filters: ?status=, ?date_from=/?date_to= (opened), ?min_balance=/?max_balance=, ?user=
+    """
     if not request.user.is_admin_user:
         return Response(
             {'error': 'Only admins can view all credit accounts'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    queryset = CreditAccount.objects.all()
+    # OPTIMIZATION: Flat rows with the user joined in, one query per page (plus
+    # the two ledger reads for the page's figures)
+    queryset = CreditAccount.objects.select_related('user').only(
+        'id', 'credit_limit', 'credit_balance', 'total_credit_used', 'loan_status',
+        'total_repaid', 'last_repayment_date', 'created_at', 'updated_at',
+        'user__id', 'user__email', 'user__first_name', 'user__last_name'
+    )
     
     # Filter by loan status
     loan_status = request.query_params.get('status')
     if loan_status:
+        if loan_status not in CreditAccount.LoanStatus.values:
+            return Response(
+                {'error': f'Unknown status: {loan_status}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         queryset = queryset.filter(loan_status=loan_status)
     
-    serializer = CreditAccountSerializer(queryset, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    # The balance filter runs on the balance columns, which every ledger write updates
+    return paginated_list(
+        request, queryset, CreditAccountListSerializer,
+        amount_field='credit_balance', amount_param='balance', user_field='user_id',
+        prepare=ledger.attach
+    )
 
 
 @api_view(['GET'])
@@ -103,6 +148,7 @@ def credit_account_detail(request, user_id):
     
     try:
         credit_account = CreditAccount.objects.get(user_id=user_id)
+        ledger.attach([credit_account])
         serializer = CreditAccountSerializer(credit_account)
         return Response(serializer.data, status=status.HTTP_200_OK)
     except CreditAccount.DoesNotExist:
@@ -114,6 +160,7 @@ def credit_account_detail(request, user_id):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def process_repayment(request, user_id):
     """Admin processes a loan repayment"""
     if not request.user.is_admin_user:
@@ -129,6 +176,7 @@ def process_repayment(request, user_id):
             with transaction.atomic():
                 # Get user's credit account
                 credit_account = CreditAccount.objects.get(user_id=user_id)
+                ledger.attach([credit_account])
                 
                 amount = serializer.validated_data['amount']
                 notes = serializer.validated_data.get('notes', '')
@@ -140,20 +188,8 @@ def process_repayment(request, user_id):
                         status=status.HTTP_400_BAD_REQUEST
                     )
                 
-                # Process repayment
-                old_balance = credit_account.credit_balance
-                credit_account.process_repayment(amount, request.user)
-                
-                # Create transaction log
-                CreditTransaction.objects.create(
-                    credit_account=credit_account,
-                    transaction_type=CreditTransaction.TransactionType.REPAYMENT,
-                    amount=amount,
-                    balance_before=old_balance,
-                    balance_after=credit_account.credit_balance,
-                    description=f"Loan repayment processed by admin. {notes}",
-                    reference=f"REPAY_{credit_account.user.id}_{timezone.now().strftime('%Y%m%d%H%M%S')}"
-                )
+                # Process repayment (appends a REPAYMENT to the ledger)
+                credit_account.process_repayment(amount, request.user, notes)
                 
                 return Response(
                     {
@@ -179,6 +215,7 @@ def process_repayment(request, user_id):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def increase_credit_limit(request, user_id):
     """Admin increases a user's credit limit"""
     if not request.user.is_admin_user:
@@ -193,6 +230,7 @@ def increase_credit_limit(request, user_id):
         try:
             with transaction.atomic():
                 credit_account = CreditAccount.objects.get(user_id=user_id)
+                ledger.attach([credit_account])
                 
                 new_limit = serializer.validated_data['new_limit']
                 reason = serializer.validated_data.get('reason', '')
@@ -204,22 +242,8 @@ def increase_credit_limit(request, user_id):
                         status=status.HTTP_400_BAD_REQUEST
                     )
                 
-                # Increase credit limit
-                old_balance = credit_account.credit_balance
-                old_limit = credit_account.credit_limit
-                credit_account.increase_credit_limit(new_limit, request.user)
-                
-                # Create transaction log
-                increase_amount = new_limit - old_limit
-                CreditTransaction.objects.create(
-                    credit_account=credit_account,
-                    transaction_type=CreditTransaction.TransactionType.LIMIT_INCREASE,
-                    amount=increase_amount,
-                    balance_before=old_balance,
-                    balance_after=credit_account.credit_balance,
-                    description=f"Credit limit increased by admin. {reason}",
-                    reference=f"LIMIT_INC_{credit_account.user.id}_{timezone.now().strftime('%Y%m%d%H%M%S')}"
-                )
+                # Increase credit limit (appends a LIMIT_INCREASE to the ledger)
+                credit_account.increase_credit_limit(new_limit, request.user, reason)
                 
                 return Response(
                     {
@@ -246,28 +270,97 @@ def increase_credit_limit(request, user_id):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def all_repayment_history(request):
-    """Admin views all repayment history"""
+    """
+    Admin views all repayment history, newest first, cursor paginated.
+    Filters: ?date_from=/?date_to=, ?min_amount=/?max_amount=, ?user=
+    """
     if not request.user.is_admin_user:
         return Response(
             {'error': 'Only admins can view all repayment history'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    repayments = RepaymentHistory.objects.all()
-    serializer = RepaymentHistorySerializer(repayments, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    # OPTIMIZATION: Buyer and admin names joined in, one query per page
+    repayments = RepaymentHistory.objects.select_related('credit_account__user', 'repaid_by')
+    return paginated_list(request, repayments, RepaymentHistorySerializer, amount_field='amount')
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def all_credit_limit_history(request):
-    """Admin views all credit limit increase history"""
+    """
+    Admin views all credit limit increase history, newest first, cursor paginated.
+    Filters: ?date_from=/?date_to=, ?min_limit=/?max_limit= (new limit), ?user=
+    """
     if not request.user.is_admin_user:
         return Response(
             {'error': 'Only admins can view credit limit history'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    history = CreditLimitHistory.objects.all()
-    serializer = CreditLimitHistorySerializer(history, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+    # OPTIMIZATION: Buyer and admin names joined in, one query per page
+    history = CreditLimitHistory.objects.select_related('credit_account__user', 'increased_by')
+    return paginated_list(
+        request, history, CreditLimitHistorySerializer,
+        amount_field='new_limit', amount_param='limit'
+    )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_credit_transactions(request, file_format):
+    """
+    Admin (finance) streams credit transactions as CSV or JSONL, oldest first.
+    Filters: ?date_from=/?date_to=, ?type=, ?min_amount=/?max_amount=, ?user=
+    """
+    if not request.user.is_admin_user:
+        return Response(
+            {'error': 'Only admins can export credit transactions'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    try:
+        queryset = transaction_export.transactions(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # OPTIMIZATION: Rows come off a server-side cursor in chunks and are
+    # written out as they arrive, memory use does not grow with the export
+    response = StreamingHttpResponse(
+        transaction_export.lines(queryset, file_format),
+        content_type=transaction_export.FORMATS[file_format]
+    )
+    filename = f"credit-transactions-{timezone.localdate():%Y%m%d}.{file_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def credit_analytics_summary(request):
+    """
+    Admin view of the whole loan book: status counts, utilization and
+    outstanding distributions, aging of outstanding balances, and repayments
+    and exhaustions per week. ?weeks= (default 12, max 52), ?refresh=1
+    """
+    if not request.user.is_admin_user:
+        return Response(
+            {'error': 'Only admins can view credit analytics'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    try:
+        weeks = int(request.query_params.get('weeks', credit_analytics.DEFAULT_WEEKS))
+    except ValueError:
+        return Response({'error': 'weeks must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= weeks <= credit_analytics.MAX_WEEKS:
+        return Response(
+            {'error': f'weeks must be between 1 and {credit_analytics.MAX_WEEKS}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # OPTIMIZATION: Columns are loaded in bulk and summarised as arrays,
+    # and the result is cached for a short while
+    refresh = request.query_params.get('refresh') in ('1', 'true')
+    return Response(credit_analytics.summary(weeks, refresh=refresh))
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 from datetime import timedelta
 import environ
+from corsheaders.defaults import default_headers
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -39,6 +40,7 @@ INSTALLED_APPS = [
     'shop',
     'orders',
     'credits',
+    'outbox',
 ]
 
 MIDDLEWARE = [
@@ -90,9 +92,21 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts, so concurrent checkouts
+        # wait for each other (up to the timeout) instead of failing with
+        # "database is locked" when a read lock is upgraded
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Cache (local memory by default, e.g. CACHE_URL=filecache:///var/tmp/foodflex or redis://...)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -177,10 +191,67 @@ CORS_ALLOW_METHODS = [
     'PUT',
 ]
 
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
+
 # Business Logic Constants
 DEFAULT_CREDIT_LIMIT = 50000  # ₦50,000 initial credit
 CURRENCY_SYMBOL = '₦'
 
+# Public catalog responses are cached for this long (seconds), signals invalidate earlier
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', default=300)
+
+# Rendered order QR code images are cached per token for this long (seconds)
+QR_CODE_CACHE_TIMEOUT = env.int('QR_CODE_CACHE_TIMEOUT', default=86400)
+
+# Order QR codes carry an HMAC-signed payload (see orders/signing.py)
+# Signed with QR_SIGNING_KEY (SECRET_KEY when unset). Keep it on the server: anyone holding
+# it can forge payloads, so scanners send what they read to /api/orders/verify-qr/
+QR_SIGNING_KEY = env('QR_SIGNING_KEY', default=None)
+QR_PAYLOAD_MAX_AGE = env.int('QR_PAYLOAD_MAX_AGE', default=60 * 60 * 24 * 30)
+
+# PENDING orders older than this (seconds) are cancelled by `manage.py expire_pending_orders`,
+# which gives their stock back and refunds the buyer
+PENDING_ORDER_TTL = env.int('PENDING_ORDER_TTL', default=60 * 60 * 48)
+
+# Admin loan book analytics (see credits/analytics.py) are cached for this long (seconds)
+CREDIT_ANALYTICS_CACHE_TIMEOUT = env.int('CREDIT_ANALYTICS_CACHE_TIMEOUT', default=60)
+
+# Responses to requests sent with an Idempotency-Key are replayed for this long (seconds)
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', default=86400)
+
+# Product views are buffered and flushed in bulk (see shop/counters.py)
+# The default buffers in each web process and flushes on a timer there (views since the
+# last flush are lost on a hard kill). Use 'shop.counters.CacheViewCounter' with a shared
+# cache (Redis/Memcached) to flush from `manage.py flush_view_counts`
+VIEW_COUNTER = {
+    'BACKEND': env('VIEW_COUNTER_BACKEND', default='shop.counters.LocalViewCounter'),
+    'OPTIONS': {
+        'flush_interval': env.int('VIEW_COUNTER_FLUSH_INTERVAL', default=30),
+    },
+}
+
+# Live order events for sellers (see orders/events.py), served over ASGI
+ORDER_EVENTS = {
+    'BACKEND': env('ORDER_EVENTS_BACKEND', default='orders.events.LocalBroker'),
+    'OPTIONS': {
+        'max_queue': env.int('ORDER_EVENTS_MAX_QUEUE', default=100),
+    },
+}
+ORDER_EVENTS_KEEPALIVE = env.int('ORDER_EVENTS_KEEPALIVE', default=15)
+
+# Outbox relay (see outbox/relay.py): where `manage.py relay_outbox` delivers events
+# e.g. OUTBOX_SINK=outbox.sinks.WebhookSink with OUTBOX_WEBHOOK_URL
+OUTBOX = {
+    'SINK': env('OUTBOX_SINK', default='outbox.sinks.JSONLinesSink'),
+    'OPTIONS': {'url': env('OUTBOX_WEBHOOK_URL')} if env('OUTBOX_WEBHOOK_URL', default=None) else {},
+}
+# Feed readers do not see events younger than this (seconds)
+OUTBOX_VISIBILITY_DELAY = env.int('OUTBOX_VISIBILITY_DELAY', default=2)
+# Feed readers wait this long (seconds) at a missing event id for the transaction
+# holding it to commit, then treat it as rolled back (see outbox/feed.py)
+OUTBOX_GAP_TIMEOUT = env.int('OUTBOX_GAP_TIMEOUT', default=300)
+
 # Security Settings (Production)
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
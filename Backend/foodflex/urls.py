@@ -15,6 +15,7 @@ urlpatterns = [
     path('api/shop/', include('shop.urls')),
     path('api/credits/', include('credits.urls')),
     path('api/orders/', include('orders.urls')),
+    path('api/events/', include('outbox.urls')),
 ]
 
 # Serve media files in development
@@ -0,0 +1,168 @@
+"""
+Live order events for sellers (GET /api/orders/events/, Server-Sent Events).
+
+Order changes are published after their transaction commits, to the owning
+seller only. Delivery goes through a broker (settings.ORDER_EVENTS['BACKEND']):
+
+- LocalBroker: in-process pub/sub. Each open stream holds a bounded queue on
+  its event loop; publishing to a seller without open streams is a dict
+  lookup. Only streams served by the same process see an event, which is
+  enough for a single ASGI worker.
+
+A cross-process broker (Redis pub/sub and the like) only has to provide the
+same subscribe()/publish() pair. Idle sellers cost nothing either way: there
+is no polling, and a stream sends a comment line every KEEPALIVE seconds.
+"""
+import asyncio
+import itertools
+import json
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'orders.events.LocalBroker'
+
+ORDER_CREATED = 'order.created'
+ORDER_CONFIRMED = 'order.confirmed'
+ORDER_COMPLETED = 'order.completed'
+ORDER_CANCELLED = 'order.cancelled'
+# Sent when a slow stream dropped events, the client should refetch its list
+RESYNC = 'resync'
+
+
+class Subscription:
+    """One open stream: a bounded queue read on the stream's event loop"""
+
+    def __init__(self, seller_id, max_queue):
+        self.seller_id = seller_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def put(self, event):
+        # Runs on the subscriber's loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        if self.overflowed:
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return {'type': RESYNC, 'data': {}}
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class LocalBroker:
+    """In-process pub/sub, see module docstring"""
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, seller_id):
+        """Call from the stream's event loop"""
+        subscription = Subscription(seller_id, self.max_queue)
+        with self.lock:
+            self.subscribers.setdefault(seller_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscribers.get(subscription.seller_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscribers[subscription.seller_id]
+
+    def publish(self, seller_id, event):
+        """Safe from any thread"""
+        with self.lock:
+            subscriptions = list(self.subscribers.get(seller_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Loop already closed, the stream is gone
+                self.unsubscribe(subscription)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'backend': type(self).__name__,
+                'sellers': len(self.subscribers),
+                'streams': sum(len(subscriptions) for subscriptions in self.subscribers.values()),
+            }
+
+
+_broker = None
+_broker_lock = threading.Lock()
+_event_ids = itertools.count(1)
+
+
+def get_broker():
+    """Process-wide broker configured by settings.ORDER_EVENTS"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = getattr(settings, 'ORDER_EVENTS', {})
+                backend = import_string(config.get('BACKEND', DEFAULT_BACKEND))
+                _broker = backend(**config.get('OPTIONS', {}))
+    return _broker
+
+
+def order_data(order):
+    """Event payload from an Order or a values() dict"""
+    get = order.get if isinstance(order, dict) else lambda field: getattr(order, field)
+    return {
+        'id': get('id'),
+        'order_number': get('order_number'),
+        'status': get('status'),
+        'total_amount': get('total_amount'),
+    }
+
+
+def publish(event_type, seller_id, orders):
+    """Send one event per order to the seller once the current transaction commits"""
+    events = [{'type': event_type, 'data': order_data(order)} for order in orders]
+    if not events:
+        return
+
+    def send():
+        broker = get_broker()
+        for event in events:
+            broker.publish(seller_id, event)
+
+    transaction.on_commit(send)
+
+
+def format_event(event):
+    """One SSE frame"""
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f"id: {next(_event_ids)}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def stream(seller_id, keepalive):
+    """Async iterator of SSE frames for one seller, unsubscribes when the client goes away"""
+    broker = get_broker()
+    subscription = broker.subscribe(seller_id)
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                event = await subscription.get(keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,145 @@
+"""
+Expiry of abandoned PENDING orders.
+
+Stock and credit are taken at checkout, so an order nobody picks up holds both
+until it is cancelled. expire_pending_orders() cancels PENDING orders older
+than PENDING_ORDER_TTL in bounded batches. Each batch is one transaction:
+
+  - one UPDATE marks the orders CANCELLED
+  - one UPDATE gives the stock back (Product.release_stock)
+  - one bulk_create writes the refund ledger rows, one UPDATE reactivates
+    exhausted accounts
+  - the seller rollups get one delta per seller
+  - one bulk_create writes the order.cancelled outbox rows; sellers with an
+    open event stream get order.cancelled
+
+Orders are found through the status index, oldest id first.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from credits import ledger as credit_ledger
+from credits.models import CreditAccount, CreditTransaction
+from outbox.models import OutboxEvent
+from shop import caching as catalog_cache
+from shop.models import Product
+from . import events, rollups
+from .models import Order, OrderItem
+
+DEFAULT_BATCH_SIZE = 500
+REASON = 'expired'
+
+
+def cutoff(ttl=None, now=None):
+    ttl = settings.PENDING_ORDER_TTL if ttl is None else ttl
+    return (now or timezone.now()) - timedelta(seconds=ttl)
+
+
+def expired_orders(before):
+    return Order.objects.filter(status=Order.OrderStatus.PENDING, created_at__lt=before)
+
+
+def expire_pending_orders(ttl=None, batch_size=DEFAULT_BATCH_SIZE, limit=None):
+    """Cancel every expired PENDING order, returns how many were cancelled"""
+    before = cutoff(ttl)
+    expired = 0
+    while limit is None or expired < limit:
+        size = batch_size if limit is None else min(batch_size, limit - expired)
+        cancelled = expire_batch(before, size)
+        expired += cancelled
+        if cancelled < size:
+            break
+    return expired
+
+
+@transaction.atomic
+def expire_batch(before, batch_size=DEFAULT_BATCH_SIZE):
+    orders = list(
+        expired_orders(before).select_for_update().order_by('id').values(
+            'id', 'order_number', 'buyer_id', 'seller_id', 'total_amount'
+        )[:batch_size]
+    )
+    if not orders:
+        return 0
+
+    now = timezone.now()
+    order_ids = [order['id'] for order in orders]
+    Order.objects.filter(id__in=order_ids).update(
+        status=Order.OrderStatus.CANCELLED,
+        notes=f'Cancelled: {REASON}',
+        updated_at=now
+    )
+
+    quantities = dict(
+        OrderItem.objects.filter(order_id__in=order_ids, product__isnull=False)
+        .order_by('product_id').values('product_id').annotate(quantity=Sum('quantity'))
+        .values_list('product_id', 'quantity')
+    )
+    if quantities:
+        Product.release_stock(quantities)
+        # Stock changed through UPDATE, which skips the cache invalidation signals
+        transaction.on_commit(lambda: catalog_cache.bump('products'))
+
+    refund_buyers(orders, now)
+
+    per_seller = defaultdict(list)
+    for order in orders:
+        per_seller[order['seller_id']].append((Order.OrderStatus.PENDING, order['total_amount']))
+    for seller_id, rows in per_seller.items():
+        rollups.record_many(seller_id, rows, Order.OrderStatus.CANCELLED, when=now)
+
+    for order in orders:
+        order['status'] = Order.OrderStatus.CANCELLED
+        events.publish(events.ORDER_CANCELLED, order['seller_id'], [order])
+    OutboxEvent.emit_orders(OutboxEvent.Topic.ORDER_CANCELLED, orders, reason=REASON)
+
+    return len(orders)
+
+
+def refund_buyers(orders, now):
+    """Refund every order to its buyer's credit account and log it"""
+    accounts = dict(
+        CreditAccount.objects.filter(
+            user_id__in={order['buyer_id'] for order in orders}
+        ).order_by('id').values_list('user_id', 'id')
+    )
+
+    # Refunds are ledger inserts (see credits/ledger.py); if a concurrent
+    # write takes one of the sequence numbers the batch is priced again
+    for attempt in range(credit_ledger.POST_ATTEMPTS):
+        balances = credit_ledger.balances_many(accounts.values())
+        entries = []
+        for order in orders:
+            account_id = accounts.get(order['buyer_id'])
+            if account_id is None:
+                continue
+            amount = order['total_amount']
+            entry, balances[account_id] = credit_ledger.entry(
+                account_id, balances[account_id], CreditTransaction.TransactionType.ADJUSTMENT, amount,
+                f"Refund - Order {order['order_number']} cancelled: {REASON}", order['order_number'],
+                balance=amount, used=-amount
+            )
+            entries.append(entry)
+        try:
+            with transaction.atomic():
+                CreditTransaction.objects.bulk_create(entries)
+        except IntegrityError:
+            if attempt + 1 == credit_ledger.POST_ATTEMPTS:
+                raise
+            continue
+        break
+    
+    # The balance columns follow the ledger, as in credit_ledger.post
+    credit_ledger.refresh_columns({
+        account_id: balances[account_id] for account_id in accounts.values()
+    })
+
+    # If loan was exhausted, make it active again
+    CreditAccount.objects.filter(
+        id__in=list(accounts.values()), loan_status=CreditAccount.LoanStatus.EXHAUSTED
+    ).update(loan_status=CreditAccount.LoanStatus.ACTIVE, updated_at=now)
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from accounts.models import User
+from orders.models import CartItem
+from orders.views import checkout
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Checks out carts of growing size inside a rolled-back transaction and '
+        'fails if the number of queries depends on the cart size'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 30, 100])
+
+    def handle(self, *args, **options):
+        results = []
+        with transaction.atomic():
+            seller = User.objects.create_user(
+                'benchmark-seller', 'benchmark-seller@example.com', role='SELLER'
+            )
+            products = Product.objects.bulk_create([
+                Product(
+                    seller=seller,
+                    name=f'Benchmark {i}',
+                    slug=f'benchmark-{i}',
+                    description='Checkout benchmark product',
+                    price=10,
+                    stock_quantity=1000,
+                    main_image='https://example.com/benchmark.png',
+                )
+                for i in range(max(options['sizes']))
+            ])
+            for size in options['sizes']:
+                buyer = User.objects.create_user(
+                    f'benchmark-buyer-{size}', f'benchmark-buyer-{size}@example.com', role='BUYER'
+                )
+                CartItem.objects.bulk_create([
+                    CartItem(cart=buyer.cart, product=product, quantity=1) for product in products[:size]
+                ])
+                request = APIRequestFactory().post('/api/orders/checkout/')
+                force_authenticate(request, user=User.objects.get(pk=buyer.pk))
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = checkout(request)
+                    elapsed = (time.perf_counter() - start) * 1000
+                if response.status_code != 201:
+                    raise CommandError(f'Checkout of {size} item(s) failed: {response.data}')
+                results.append((size, len(queries), elapsed))
+            transaction.set_rollback(True)
+
+        for size, query_count, elapsed in results:
+            self.stdout.write(f'{size} item(s): {query_count} queries, {elapsed:.1f}ms')
+        if len({query_count for _, query_count, _ in results}) > 1:
+            raise CommandError('Checkout query count grows with the cart size')
+        self.stdout.write(self.style.SUCCESS('Checkout runs a constant number of queries'))
@@ -0,0 +1,93 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.crypto import get_random_string
+from rest_framework.test import APIRequestFactory, force_authenticate
+from accounts.models import User
+from orders.models import Order, OrderItem
+from orders.views import all_orders, my_orders
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds synthetic orders inside a rolled-back transaction and checks that '
+        'the order list endpoints run a fixed number of queries per page'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seller, admin = self.seed(options['orders'])
+            cases = [
+                ('my_orders (seller), page 1', my_orders, seller, {}),
+                ('my_orders (seller), page 50', my_orders, seller, {'page': 50}),
+                ('my_orders (seller), cursor', my_orders, seller, {'pagination': 'cursor'}),
+                ('my_orders (seller), cursor, 100 rows', my_orders, seller, {'pagination': 'cursor', 'page_size': 100}),
+                ('all_orders (admin), page 1', all_orders, admin, {}),
+                ('all_orders (admin), cursor, 100 rows', all_orders, admin, {'pagination': 'cursor', 'page_size': 100}),
+            ]
+            results = [(label, *self.measure(view, user, params, options['runs'])) for label, view, user, params in cases]
+            transaction.set_rollback(True)
+
+        for label, timings, query_count in results:
+            p50 = timings[len(timings) // 2]
+            p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+            self.stdout.write(f'{label}: {query_count} queries, p50 {p50:.1f}ms, p95 {p95:.1f}ms')
+
+        cursor_counts = {query_count for label, _, query_count in results if 'cursor' in label}
+        if len(cursor_counts) > 1:
+            raise CommandError('Query count depends on the page size')
+        self.stdout.write(self.style.SUCCESS('Order lists run a fixed number of queries per page'))
+
+    def seed(self, total):
+        start = time.perf_counter()
+        seller = User.objects.create_user('benchmark-seller', 'benchmark-seller@example.com', role='SELLER')
+        admin = User.objects.create_user('benchmark-admin', 'benchmark-admin@example.com', role='ADMIN')
+        buyers = [
+            User.objects.create_user(f'benchmark-buyer-{i}', f'benchmark-buyer-{i}@example.com', role='BUYER',
+                                     first_name='Buyer', last_name=str(i))
+            for i in range(50)
+        ]
+        orders = Order.objects.bulk_create([
+            Order(
+                order_number=f'FFB{i:09d}',
+                qr_code_token=get_random_string(64),
+                buyer=random.choice(buyers),
+                seller=seller,
+                total_amount=random.randint(500, 50000),
+                status=random.choice(Order.OrderStatus.values),
+            )
+            for i in range(total)
+        ], batch_size=1000)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_name='Benchmark item', product_price=100, quantity=1, subtotal=100)
+            for order in orders
+            for _ in range(random.randint(1, 5))
+        ], batch_size=2000)
+        self.stdout.write(f'Seeded {total} orders in {time.perf_counter() - start:.1f}s')
+        return seller, admin
+
+    def measure(self, view, user, params, runs):
+        factory = APIRequestFactory()
+
+        def call():
+            request = factory.get('/api/orders/', params)
+            force_authenticate(request, user=user)
+            response = view(request)
+            assert response.status_code == 200, response.data
+            return response
+
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings), len(queries)
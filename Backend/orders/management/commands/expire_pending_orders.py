@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from orders import expiry
+
+
+class Command(BaseCommand):
+    help = (
+        'Cancels PENDING orders older than PENDING_ORDER_TTL, gives their stock back '
+        'and refunds the buyers. Run it from cron, or with --loop as a worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl', type=int, help='Age in seconds (default: PENDING_ORDER_TTL)')
+        parser.add_argument('--batch-size', type=int, default=expiry.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--limit', type=int, help='Stop after this many orders')
+        parser.add_argument('--loop', action='store_true', help='Keep running, every --interval seconds')
+        parser.add_argument('--interval', type=int, default=300)
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expiry.expire_pending_orders(
+                ttl=options['ttl'],
+                batch_size=options['batch_size'],
+                limit=options['limit']
+            )
+            self.stdout.write(f'Expired {expired} pending orders')
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from orders import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the seller order rollups (dashboard stats) from the orders table'
+
+    def handle(self, *args, **options):
+        sellers = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt order stats for {sellers} sellers'))
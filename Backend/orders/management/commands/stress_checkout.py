@@ -0,0 +1,126 @@
+import multiprocessing
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Sum
+from rest_framework.test import APIRequestFactory, force_authenticate
+from accounts.models import User
+from orders.models import Cart, CartItem, OrderItem
+from orders.views import checkout
+from shop.models import Product
+
+# SQLite serializes writers; a checkout that times out on the lock is retried
+LOCK_RETRIES = 20
+
+
+def run_buyers(user_ids, barrier, results):
+    """Worker process: wait for every worker, then check out each buyer once"""
+    factory = APIRequestFactory()
+    users = list(User.objects.filter(pk__in=user_ids))
+    barrier.wait()
+    for user in users:
+        for _ in range(LOCK_RETRIES):
+            request = factory.post('/api/orders/checkout/')
+            force_authenticate(request, user=user)
+            response = checkout(request)
+            error = response.data.get('error', '') if response.status_code != 201 else ''
+            if 'locked' not in str(error):
+                break
+            time.sleep(0.05)
+        results.put((response.status_code, error))
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs concurrent checkouts from many processes against products with '
+        'limited stock and verifies nothing is oversold. Creates its own buyers, '
+        'seller and products and deletes them afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=200, help='Concurrent processes')
+        parser.add_argument('--stock', type=int, default=50, help='Initial stock per product')
+        parser.add_argument('--products', type=int, default=2, help='Products in every cart')
+        parser.add_argument('--quantity', type=int, default=1, help='Quantity of each product per cart')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        seller = User.objects.create_user(f'stress-seller-{tag}', f'stress-seller-{tag}@example.com', role='SELLER')
+        products = [
+            Product.objects.create(
+                seller=seller,
+                name=f'Stress {tag} {i}',
+                description='Stress test product',
+                price=100,
+                stock_quantity=options['stock'],
+                main_image='https://example.com/stress.png',
+            )
+            for i in range(options['products'])
+        ]
+        buyers = [
+            User.objects.create_user(f'stress-buyer-{tag}-{i}', f'stress-buyer-{tag}-{i}@example.com', role='BUYER')
+            for i in range(options['buyers'])
+        ]
+        try:
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, product=product, quantity=options['quantity'])
+                for cart in Cart.objects.filter(user__in=buyers)
+                for product in products
+            ])
+            elapsed, outcomes = self.run_checkouts([buyer.pk for buyer in buyers], options['workers'])
+            self.verify(products, options, elapsed, outcomes)
+        finally:
+            User.objects.filter(pk__in=[buyer.pk for buyer in buyers]).delete()
+            Product.objects.filter(pk__in=[product.pk for product in products]).delete()
+            seller.delete()
+
+    def run_checkouts(self, user_ids, workers):
+        workers = max(1, min(workers, len(user_ids)))
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(workers)
+        results = context.Queue()
+        # Children must open their own connections
+        connections.close_all()
+        processes = [
+            context.Process(target=run_buyers, args=(user_ids[i::workers], barrier, results))
+            for i in range(workers)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in user_ids]
+        for process in processes:
+            process.join()
+        return time.perf_counter() - start, outcomes
+
+    def verify(self, products, options, elapsed, outcomes):
+        placed = sum(1 for code, _ in outcomes if code == 201)
+        sold_out = sum(1 for _, error in outcomes if str(error).startswith('Insufficient stock'))
+        failed = len(outcomes) - placed - sold_out
+        self.stdout.write(
+            f'{len(outcomes)} checkouts in {elapsed:.2f}s: {placed} placed, '
+            f'{sold_out} rejected for stock, {failed} other errors'
+        )
+
+        problems = []
+        for product in products:
+            product.refresh_from_db()
+            ordered = OrderItem.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+            self.stdout.write(
+                f'{product.name}: {ordered} ordered, {product.stock_quantity} left, '
+                f'{product.sales_count} recorded as sold'
+            )
+            if product.stock_quantity < 0:
+                problems.append(f'{product.name} went negative')
+            if ordered + product.stock_quantity != options['stock']:
+                problems.append(f'{product.name} stock and orders do not add up')
+            if ordered != placed * options['quantity']:
+                problems.append(f'{product.name} has items from failed checkouts')
+
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('No overselling: stock and orders add up'))
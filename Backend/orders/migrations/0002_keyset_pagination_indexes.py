@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_buyer_i_bfe3d2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_seller__706a34_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['buyer', '-created_at', '-id'], name='orders_buyer_i_61ecb4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['seller', '-created_at', '-id'], name='orders_seller__784664_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at', '-id'], name='orders_created_826ed5_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['seller', 'status'], name='orders_seller__0c477d_idx'),
+        ),
+    ]
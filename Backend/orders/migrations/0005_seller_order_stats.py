@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_order_stats(apps, schema_editor):
+    from orders.rollups import rebuild
+    rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_seller_status_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerOrderStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pending_orders', models.IntegerField(default=0)),
+                ('confirmed_orders', models.IntegerField(default=0)),
+                ('completed_orders', models.IntegerField(default=0)),
+                ('cancelled_orders', models.IntegerField(default=0)),
+                ('open_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('seller', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='order_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'seller_order_stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='SellerDailyOrderStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('orders_placed', models.IntegerField(default=0)),
+                ('orders_completed', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_order_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'seller_daily_order_stats',
+                'constraints': [models.UniqueConstraint(fields=('seller', 'date'), name='unique_seller_daily_order_stats')],
+            },
+        ),
+        migrations.RunPython(backfill_order_stats, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,14 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.utils.crypto import get_random_string
-from accounts.models import User
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+from accounts.models import SellerProfile, User
+from outbox.models import OutboxEvent
+from shop import caching as catalog_cache
 from shop.models import Product
 import qrcode
+import qrcode.image.svg
 from io import BytesIO
 import base64
 
@@ -137,6 +142,7 @@ class Order(models.Model):
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     confirmed_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
@@ -146,11 +152,15 @@ class Order(models.Model):
         db_table = 'orders'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['buyer', '-created_at']),
-            models.Index(fields=['seller', '-created_at']),
+            # Keyset pagination on (created_at, id)
+            models.Index(fields=['buyer', '-created_at', '-id']),
+            models.Index(fields=['seller', '-created_at', '-id']),
+            models.Index(fields=['-created_at', '-id']),
             models.Index(fields=['order_number']),
             models.Index(fields=['qr_code_token']),
             models.Index(fields=['status']),
+            # Seller pickup manifest: a seller's PENDING orders
+            models.Index(fields=['seller', 'status']),
         ]
     
     def __str__(self):
@@ -175,8 +185,14 @@ class Order(models.Model):
         """Generate secure QR code token"""
         return get_random_string(64)
     
-    def generate_qr_code(self):
-        """Generate QR code image as base64 string"""
+    @property
+    def qr_code_data(self):
+        """Signed compact payload (order, seller, amount, expiry), see orders/signing.py"""
+        from .signing import sign_order
+        return sign_order(self)
+    
+    def render_qr_code(self, image_format='png'):
+        """Render the QR code as PNG or SVG bytes"""
         try:
             # Create QR code
             qr = qrcode.QRCode(
@@ -185,31 +201,34 @@ class Order(models.Model):
                 box_size=10,
                 border=4,
             )
-            
-            # QR data includes order number and token for security
-            qr_data = f"FOODFLEX_ORDER:{self.order_number}:{self.qr_code_token}"
-            qr.add_data(qr_data)
+            qr.add_data(self.qr_code_data)
             qr.make(fit=True)
             
+            if image_format == 'svg':
+                return qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).to_string()
+            
             # Generate image
             img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convert to base64 for frontend to upload to Cloudinary
             buffer = BytesIO()
             img.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            # Return base64 string - frontend will upload this to Cloudinary
-            img_base64 = base64.b64encode(buffer.getvalue()).decode()
-            return f"data:image/png;base64,{img_base64}"
+            return buffer.getvalue()
             
         except Exception as e:
             raise Exception(f"QR code generation failed: {str(e)}")
     
+    def generate_qr_code(self):
+        """Generate QR code image as base64 string"""
+        img_base64 = base64.b64encode(self.render_qr_code('png')).decode()
+        return f"data:image/png;base64,{img_base64}"
+    
+    @transaction.atomic
     def confirm_order(self, confirmed_by_seller):
         """Seller confirms order after scanning QR (stock already reduced at checkout)"""
         from django.utils import timezone
         
+        # Lock the order and re-read its status, so a concurrent confirm or
+        # cancel cannot be overwritten or counted twice
+        self.status = Order.objects.select_for_update().values_list('status', flat=True).get(pk=self.pk)
         if self.status != self.OrderStatus.PENDING:
             raise ValueError(f"Cannot confirm order with status: {self.status}")
         
@@ -219,7 +238,13 @@ class Order(models.Model):
         self.status = self.OrderStatus.CONFIRMED
         self.confirmed_at = timezone.now()
         self.save()
+        
+        from . import events, rollups
+        rollups.record(self.seller_id, self.OrderStatus.PENDING, self.status, amount=self.total_amount)
+        events.publish(events.ORDER_CONFIRMED, self.seller_id, [self])
+        OutboxEvent.emit_orders(OutboxEvent.Topic.ORDER_CONFIRMED, [self])
     
+    @transaction.atomic
     def complete_order(self):
         """
         Complete order and transfer earnings to seller
@@ -227,6 +252,9 @@ class Order(models.Model):
         """
         from django.utils import timezone
         
+        # Lock the order and re-read its status, so concurrent completes pay
+        # the seller once and a cancelled order stays cancelled
+        self.status = Order.objects.select_for_update().values_list('status', flat=True).get(pk=self.pk)
         if self.status != self.OrderStatus.CONFIRMED:
             raise ValueError(f"Cannot complete order with status: {self.status}")
         
@@ -235,54 +263,136 @@ class Order(models.Model):
         self.completed_at = timezone.now()
         self.save()
         
+        from . import events, rollups
+        rollups.record(
+            self.seller_id, self.OrderStatus.CONFIRMED, self.status,
+            amount=self.total_amount, when=self.completed_at
+        )
+        events.publish(events.ORDER_COMPLETED, self.seller_id, [self])
+        OutboxEvent.emit_orders(OutboxEvent.Topic.ORDER_COMPLETED, [self])
+        
         # Stock was already reduced at checkout, so we don't touch it here
-        # Just transfer earnings to seller
-        seller_profile = self.seller.seller_profile
-        seller_profile.add_earnings(self.total_amount)
-        seller_profile.increment_order_count()
+        # Just transfer earnings to seller (one UPDATE on the seller profile)
+        SellerProfile.credit_fulfilled_orders(self.seller_id, self.total_amount)
+    
+    @classmethod
+    def bulk_confirm(cls, seller, order_ids):
+        """
+        Confirm many of a seller's PENDING orders with one UPDATE.
+        Returns the ids that were confirmed; others are left untouched.
+        """
+        from django.utils import timezone
+        
+        from . import events, rollups
+        
+        rows = list(
+            cls.objects.select_for_update().filter(
+                id__in=order_ids, seller=seller, status=cls.OrderStatus.PENDING
+            ).order_by('id').values('id', 'order_number', 'buyer_id', 'seller_id', 'total_amount')
+        )
+        confirmed = [row['id'] for row in rows]
+        if confirmed:
+            now = timezone.now()
+            cls.objects.filter(id__in=confirmed).update(
+                status=cls.OrderStatus.CONFIRMED,
+                confirmed_at=now,
+                updated_at=now
+            )
+            rollups.record(
+                seller.id, cls.OrderStatus.PENDING, cls.OrderStatus.CONFIRMED,
+                count=len(rows), amount=sum(row['total_amount'] for row in rows)
+            )
+            for row in rows:
+                row['status'] = cls.OrderStatus.CONFIRMED
+            events.publish(events.ORDER_CONFIRMED, seller.id, rows)
+            OutboxEvent.emit_orders(OutboxEvent.Topic.ORDER_CONFIRMED, rows)
+        return confirmed
+    
+    @classmethod
+    def bulk_complete(cls, seller, order_ids):
+        """
+        Complete many of a seller's PENDING or CONFIRMED orders (a pickup confirms
+        and completes at once) with one UPDATE, then pay the seller with a single
+        aggregated wallet increment. Returns the ids that were completed.
+        """
+        from django.utils import timezone
+        from . import events, rollups
+        
+        rows = list(
+            cls.objects.select_for_update().filter(
+                id__in=order_ids,
+                seller=seller,
+                status__in=[cls.OrderStatus.PENDING, cls.OrderStatus.CONFIRMED]
+            ).order_by('id').values('id', 'order_number', 'buyer_id', 'seller_id', 'total_amount', 'status')
+        )
+        if not rows:
+            return []
+        
+        completed = [row['id'] for row in rows]
+        now = timezone.now()
+        cls.objects.filter(id__in=completed).update(
+            status=cls.OrderStatus.COMPLETED,
+            confirmed_at=Coalesce('confirmed_at', Value(now)),
+            completed_at=now,
+            updated_at=now
+        )
+        SellerProfile.credit_fulfilled_orders(
+            seller.id, sum(row['total_amount'] for row in rows), count=len(rows)
+        )
+        rollups.record_many(
+            seller.id,
+            [(row['status'], row['total_amount']) for row in rows],
+            cls.OrderStatus.COMPLETED,
+            when=now
+        )
+        for row in rows:
+            row['status'] = cls.OrderStatus.COMPLETED
+        events.publish(events.ORDER_COMPLETED, seller.id, rows)
+        OutboxEvent.emit_orders(OutboxEvent.Topic.ORDER_COMPLETED, rows)
+        return completed
     
+    @transaction.atomic
     def cancel_order(self, reason=''):
         """
         Cancel order and refund credit to buyer
         ✅ RESTORE STOCK because it was reduced at checkout
         """
+        # Lock the order and re-read its status, so a concurrent cancel or the
+        # expiry job cannot give back the stock and refund the same order again
+        self.status = Order.objects.select_for_update().values_list('status', flat=True).get(pk=self.pk)
         if self.status in [self.OrderStatus.COMPLETED, self.OrderStatus.CANCELLED]:
             raise ValueError(f"Cannot cancel order with status: {self.status}")
         
         # ✅ RESTORE STOCK - Add back the quantities that were reduced at checkout
-        for item in self.items.all():
-            if item.product:  # Check product still exists
-                item.product.stock_quantity += item.quantity
-                item.product.save(update_fields=['stock_quantity'])
-        
-        # Refund credit to buyer
-        credit_account = self.buyer.credit_account
-        credit_account.credit_balance += self.total_amount
-        credit_account.total_credit_used -= self.total_amount
-        
-        # If loan was exhausted, make it active again
-        if credit_account.loan_status == 'EXHAUSTED':
-            credit_account.loan_status = 'ACTIVE'
-        
-        credit_account.save()
+        # (one relative UPDATE, safe next to concurrent reservations)
+        quantities = dict(
+            self.items.filter(product__isnull=False)
+            .order_by('product_id').values('product_id').annotate(quantity=Sum('quantity'))
+            .values_list('product_id', 'quantity')
+        )
+        if quantities:
+            Product.release_stock(quantities)
+            # Stock changed through UPDATE, which skips the cache invalidation signals
+            transaction.on_commit(lambda: catalog_cache.bump('products'))
         
-        # Log refund transaction
-        from credits.models import CreditTransaction
-        CreditTransaction.objects.create(
-            credit_account=credit_account,
-            transaction_type=CreditTransaction.TransactionType.ADJUSTMENT,
-            amount=self.total_amount,
-            balance_before=credit_account.credit_balance - self.total_amount,
-            balance_after=credit_account.credit_balance,
+        # Refund credit to buyer (appends an ADJUSTMENT to the credit ledger)
+        self.buyer.credit_account.refund_credit(
+            self.total_amount,
             description=f"Refund - Order {self.order_number} cancelled: {reason}",
             reference=self.order_number
         )
         
         # Update order status
+        previous_status = self.status
         self.status = self.OrderStatus.CANCELLED
         if reason:
             self.notes = f"Cancelled: {reason}"
         self.save()
+        
+        from . import events, rollups
+        rollups.record(self.seller_id, previous_status, self.status, amount=self.total_amount)
+        events.publish(events.ORDER_CANCELLED, self.seller_id, [self])
+        OutboxEvent.emit_orders(OutboxEvent.Topic.ORDER_CANCELLED, [self], reason=reason)
 
 
 class OrderItem(models.Model):
@@ -325,4 +435,54 @@ class OrderItem(models.Model):
         
         # Calculate subtotal
         self.subtotal = self.product_price * self.quantity
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class SellerOrderStats(models.Model):
+    """Per-seller order rollup, kept current by orders/rollups.py"""
+    seller = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='order_stats'
+    )
+    
+    # Orders currently in each status
+    pending_orders = models.IntegerField(default=0)
+    confirmed_orders = models.IntegerField(default=0)
+    completed_orders = models.IntegerField(default=0)
+    cancelled_orders = models.IntegerField(default=0)
+    
+    # Value of PENDING + CONFIRMED orders (not picked up yet)
+    open_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Value of COMPLETED orders
+    total_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'seller_order_stats'
+    
+    def __str__(self):
+        return f"Order stats - {self.seller.email}"
+
+
+class SellerDailyOrderStats(models.Model):
+    """Per-seller, per-day rollup (orders placed, completed and revenue)"""
+    seller = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='daily_order_stats'
+    )
+    date = models.DateField()
+    orders_placed = models.IntegerField(default=0)
+    orders_completed = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'seller_daily_order_stats'
+        constraints = [
+            # Also the index for "this week" range reads
+            models.UniqueConstraint(fields=['seller', 'date'], name='unique_seller_daily_order_stats'),
+        ]
+    
+    def __str__(self):
+        return f"{self.seller.email} - {self.date}"
@@ -0,0 +1,30 @@
+"""
+Cached QR code images for orders.
+
+Images are rendered on first request instead of inside checkout and cached
+under the order's qr_code_token. A token never changes its image, so clients
+can cache the image endpoints until the signed payload in the image expires.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+def cache_key(token, image_format):
+    return f'orders:qr:{image_format}:{token}'
+
+
+def get_image(order, image_format='png'):
+    """QR code bytes for an order, rendered once per token and format"""
+    key = cache_key(order.qr_code_token, image_format)
+    image = cache.get(key)
+    if image is None:
+        image = order.render_qr_code(image_format)
+        cache.set(key, image, getattr(settings, 'QR_CODE_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+    return image
@@ -0,0 +1,154 @@
+"""
+Incremental per-seller order rollups behind /api/orders/stats/.
+
+Every status change adds deltas to SellerOrderStats (counts per status, open
+amount, revenue) and SellerDailyOrderStats (orders placed/completed and revenue
+per day) with F() updates, so the dashboard reads one stats row plus at most
+seven daily rows instead of scanning the seller's orders.
+rebuild() recomputes both tables from the orders table.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Order, SellerDailyOrderStats, SellerOrderStats
+
+STATUS_FIELDS = {
+    Order.OrderStatus.PENDING: 'pending_orders',
+    Order.OrderStatus.CONFIRMED: 'confirmed_orders',
+    Order.OrderStatus.COMPLETED: 'completed_orders',
+    Order.OrderStatus.CANCELLED: 'cancelled_orders',
+}
+OPEN_STATUSES = (Order.OrderStatus.PENDING, Order.OrderStatus.CONFIRMED)
+
+
+def add(model, lookup, deltas):
+    """UPDATE ... SET field = field + delta, creating the row the first time"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Created concurrently, add on top of it
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record(seller_id, from_status, to_status, count=1, amount=Decimal('0'), when=None):
+    """
+    Move `count` orders worth `amount` from one status to another.
+    from_status is None for newly placed orders.
+    """
+    deltas = defaultdict(int)
+    if from_status is not None:
+        deltas[STATUS_FIELDS[from_status]] -= count
+    deltas[STATUS_FIELDS[to_status]] += count
+
+    was_open = from_status in OPEN_STATUSES
+    is_open = to_status in OPEN_STATUSES
+    if is_open and not was_open:
+        deltas['open_amount'] += amount
+    elif was_open and not is_open:
+        deltas['open_amount'] -= amount
+    if to_status == Order.OrderStatus.COMPLETED:
+        deltas['total_revenue'] += amount
+
+    add(SellerOrderStats, {'seller_id': seller_id}, deltas)
+
+    daily = {}
+    if from_status is None:
+        daily['orders_placed'] = count
+    if to_status == Order.OrderStatus.COMPLETED:
+        daily['orders_completed'] = count
+        daily['revenue'] = amount
+    if daily:
+        add(SellerDailyOrderStats, {'seller_id': seller_id, 'date': timezone.localdate(when)}, daily)
+
+
+def record_many(seller_id, rows, to_status, when=None):
+    """record() for a batch of (from_status, amount) rows, one update per source status"""
+    grouped = defaultdict(lambda: [0, Decimal('0')])
+    for from_status, amount in rows:
+        grouped[from_status][0] += 1
+        grouped[from_status][1] += amount
+    for from_status, (count, amount) in grouped.items():
+        record(seller_id, from_status, to_status, count, amount, when)
+
+
+def dashboard(seller_id):
+    """Stats for the seller dashboard: one stats row and this week's daily rows"""
+    stats = SellerOrderStats.objects.filter(seller_id=seller_id).first() or SellerOrderStats(seller_id=seller_id)
+    today = timezone.localdate()
+    week_start = today - timedelta(days=today.weekday())
+    days = {
+        day.date: day
+        for day in SellerDailyOrderStats.objects.filter(seller_id=seller_id, date__gte=week_start)
+    }
+    today_stats = days.get(today)
+    return {
+        'orders': {
+            'pending': stats.pending_orders,
+            'confirmed': stats.confirmed_orders,
+            'completed': stats.completed_orders,
+            'cancelled': stats.cancelled_orders,
+        },
+        'pending_pickups': stats.pending_orders + stats.confirmed_orders,
+        'open_amount': stats.open_amount,
+        'orders_today': today_stats.orders_placed if today_stats else 0,
+        'revenue': {
+            'total': stats.total_revenue,
+            'today': today_stats.revenue if today_stats else Decimal('0'),
+            'this_week': sum((day.revenue for day in days.values()), Decimal('0')),
+        },
+        'week_start': week_start,
+        'updated_at': stats.updated_at,
+    }
+
+
+def rebuild(apps=global_apps):
+    """Recompute both rollup tables from the orders table"""
+    Order = apps.get_model('orders', 'Order')
+    Stats = apps.get_model('orders', 'SellerOrderStats')
+    Daily = apps.get_model('orders', 'SellerDailyOrderStats')
+    # Plain values, historical models (migrations) have no OrderStatus
+    pending, confirmed, completed, cancelled = 'PENDING', 'CONFIRMED', 'COMPLETED', 'CANCELLED'
+
+    with transaction.atomic():
+        Stats.objects.all().delete()
+        Daily.objects.all().delete()
+
+        per_seller = Order.objects.order_by().values('seller_id').annotate(
+            pending_orders=Count('id', filter=Q(status=pending)),
+            confirmed_orders=Count('id', filter=Q(status=confirmed)),
+            completed_orders=Count('id', filter=Q(status=completed)),
+            cancelled_orders=Count('id', filter=Q(status=cancelled)),
+            open_amount=Sum('total_amount', filter=Q(status__in=[pending, confirmed]), default=0),
+            total_revenue=Sum('total_amount', filter=Q(status=completed), default=0),
+        )
+        Stats.objects.bulk_create([Stats(**row) for row in per_seller], batch_size=1000)
+
+        days = {}
+        placed = Order.objects.order_by().annotate(date=TruncDate('created_at')).values(
+            'seller_id', 'date'
+        ).annotate(orders_placed=Count('id'))
+        for row in placed:
+            days[row['seller_id'], row['date']] = Daily(**row)
+        done = Order.objects.order_by().filter(status=completed, completed_at__isnull=False).annotate(
+            date=TruncDate('completed_at')
+        ).values('seller_id', 'date').annotate(orders_completed=Count('id'), revenue=Sum('total_amount'))
+        for row in done:
+            day = days.setdefault((row['seller_id'], row['date']), Daily(seller_id=row['seller_id'], date=row['date']))
+            day.orders_completed = row['orders_completed']
+            day.revenue = row['revenue']
+        Daily.objects.bulk_create(days.values(), batch_size=1000)
+    return len(per_seller)
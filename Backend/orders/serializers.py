@@ -79,8 +79,12 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
 
 class OrderListSerializer(serializers.ModelSerializer):
-    buyer_name = serializers.CharField(source='buyer.get_full_name', read_only=True)
-    seller_name = serializers.CharField(source='seller.get_full_name', read_only=True)
+    """
+    Reads buyer_name, seller_name and items_count annotated by
+    orders.views.order_list_queryset, falls back to per-row lookups otherwise
+    """
+    buyer_name = serializers.SerializerMethodField()
+    seller_name = serializers.SerializerMethodField()
     items_count = serializers.SerializerMethodField()
     
     class Meta:
@@ -91,7 +95,19 @@ class OrderListSerializer(serializers.ModelSerializer):
             'status', 'items_count', 'created_at'
         ]
     
+    def get_buyer_name(self, obj):
+        if hasattr(obj, 'buyer_name'):
+            return obj.buyer_name
+        return obj.buyer.get_full_name()
+    
+    def get_seller_name(self, obj):
+        if hasattr(obj, 'seller_name'):
+            return obj.seller_name
+        return obj.seller.get_full_name()
+    
     def get_items_count(self, obj):
+        if hasattr(obj, 'items_count'):
+            return obj.items_count
         return obj.items.count()
 
 
@@ -120,6 +136,36 @@ class ConfirmOrderSerializer(serializers.Serializer):
     qr_code_token = serializers.CharField(max_length=100)
 
 
+class BatchVerifyQRCodeSerializer(serializers.Serializer):
+    """Serializer for verifying many scanned QR payloads at once"""
+    payloads = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        allow_empty=False,
+        max_length=500
+    )
+
+
+class OrderSyncSerializer(serializers.Serializer):
+    """Serializer for syncing offline pickups (order ids to confirm/complete)"""
+    confirm = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        default=list,
+        max_length=500
+    )
+    complete = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        default=list,
+        max_length=500
+    )
+    
+    def validate(self, data):
+        if not data['confirm'] and not data['complete']:
+            raise serializers.ValidationError("Nothing to sync")
+        return data
+
+
 class OrderQRCodeSerializer(serializers.Serializer):
     """Serializer for QR code upload after generation"""
     qr_code_image = serializers.URLField()
@@ -0,0 +1,101 @@
+"""
+Signed, compact QR payloads for orders.
+
+    FF1.<order id>.<seller id>.<amount in kobo>.<expiry>.<signature>
+
+Numbers are base 36 and the signature is a truncated HMAC-SHA256 in base 32,
+so the whole payload is upper case and fits the dense QR alphanumeric mode.
+The verify endpoints check the signature, expiry and seller before touching
+the database; only payloads that pass are looked up. The key stays on the
+server, scanners send what they read to verify_qr_code.
+
+Pickup manifests (a seller's PENDING orders for offline matching) are signed
+as a whole with sign_document.
+"""
+import base64
+import json
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+PREFIX = 'FF1'
+SALT = 'foodflex.orders.qr'
+DOCUMENT_SALT = 'foodflex.orders.manifest'
+SIGNATURE_BYTES = 16
+DEFAULT_MAX_AGE = 60 * 60 * 24 * 30
+
+
+class InvalidPayload(ValueError):
+    pass
+
+
+def to_base36(number):
+    digits = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    encoded = ''
+    while True:
+        number, remainder = divmod(number, 36)
+        encoded = digits[remainder] + encoded
+        if not number:
+            return encoded
+
+
+def signing_key():
+    return getattr(settings, 'QR_SIGNING_KEY', None) or settings.SECRET_KEY
+
+
+def signature(body):
+    digest = salted_hmac(SALT, body, secret=signing_key(), algorithm='sha256').digest()
+    return base64.b32encode(digest[:SIGNATURE_BYTES]).decode('ascii').rstrip('=')
+
+
+def sign_document(data):
+    """HMAC-SHA256 (hex) over the canonical JSON of `data`"""
+    body = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return salted_hmac(DOCUMENT_SALT, body, secret=signing_key(), algorithm='sha256').hexdigest()
+
+
+def sign(order_id, seller_id, amount, expires):
+    kobo = int((Decimal(amount) * 100).to_integral_value())
+    body = '.'.join([PREFIX] + [to_base36(int(value)) for value in (order_id, seller_id, kobo, expires)])
+    return f'{body}.{signature(body)}'
+
+
+def expires(order):
+    """Unix time at which the order's signed payload stops verifying"""
+    return int(order.created_at.timestamp()) + getattr(settings, 'QR_PAYLOAD_MAX_AGE', DEFAULT_MAX_AGE)
+
+
+def sign_order(order):
+    return sign(order.id, order.seller_id, order.total_amount, expires(order))
+
+
+def is_signed(payload):
+    return payload.strip().upper().startswith(f'{PREFIX}.')
+
+
+def verify(payload, now=None):
+    """Check a scanned payload without the database, raises InvalidPayload"""
+    parts = payload.strip().upper().split('.')
+    if len(parts) != 6 or parts[0] != PREFIX:
+        raise InvalidPayload('Malformed QR code')
+
+    body, sent = '.'.join(parts[:5]), parts[5]
+    if not constant_time_compare(signature(body), sent):
+        raise InvalidPayload('QR code signature does not match')
+
+    try:
+        order_id, seller_id, kobo, expires = (int(part, 36) for part in parts[1:5])
+    except ValueError:
+        raise InvalidPayload('Malformed QR code')
+
+    if expires < (now if now is not None else time.time()):
+        raise InvalidPayload('QR code has expired')
+
+    return {
+        'order_id': order_id,
+        'seller_id': seller_id,
+        'amount': Decimal(kobo) / 100,
+        'expires': expires,
+    }
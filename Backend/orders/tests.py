@@ -1,3 +1,530 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import Sum
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.models import SellerProfile, User
+from credits import ledger
+from credits.models import CreditAccount
+from outbox.models import OutboxEvent
+from shop.models import Product
+from . import events as order_events, expiry, signing as order_signing
+from .models import Cart, CartItem, Order, OrderItem, SellerOrderStats
+
+
+# Checkouts that lose the SQLite write lock are retried (see stress_checkout)
+LOCK_RETRIES = 200
+
+# Queries per checkout, whatever the cart size, once the seller's rollup rows exist
+CHECKOUT_QUERIES = 24
+
+
+def make_seller(name='seller'):
+    return User.objects.create_user(name, f'{name}@example.com', role='SELLER')
+
+
+def make_product(seller, stock, name='Jollof Rice', price=100):
+    return Product.objects.create(
+        seller=seller,
+        name=name,
+        description='Test product',
+        price=price,
+        stock_quantity=stock,
+        main_image='https://example.com/product.png',
+    )
+
+
+def make_buyer(name, products, quantity=1):
+    """Buyer (with the credit account and cart the signals create) holding `products` in the cart"""
+    buyer = User.objects.create_user(name, f'{name}@example.com', role='BUYER')
+    cart = Cart.objects.get(user=buyer)
+    CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=quantity) for product in products])
+    # Fresh instance, the signals attached the related objects to another one
+    return User.objects.get(pk=buyer.pk)
+
+
+def checkout(buyer):
+    client = APIClient()
+    client.force_authenticate(buyer)
+    return client.post('/api/orders/checkout/')
+
+
+def ordered(product):
+    return OrderItem.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.seller = make_seller()
+
+    def test_reserve_stock_changes_nothing_when_any_product_is_short(self):
+        rice = make_product(self.seller, stock=5)
+        beans = make_product(self.seller, stock=1, name='Beans')
+
+        self.assertFalse(Product.reserve_stock({rice.pk: 2, beans.pk: 2}))
+        # The caller rolls back; the short row was never touched
+        beans.refresh_from_db()
+        self.assertEqual(beans.stock_quantity, 1)
+
+    def test_checkout_never_oversells(self):
+        product = make_product(self.seller, stock=3)
+        buyers = [make_buyer(f'buyer{i}', [product]) for i in range(5)]
+
+        responses = [checkout(buyer) for buyer in buyers]
+
+        self.assertEqual([response.status_code for response in responses], [201] * 3 + [400] * 2)
+        self.assertTrue(responses[-1].data['error'].startswith('Insufficient stock'))
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 0)
+        self.assertEqual(ordered(product), 3)
+
+    def test_cancel_gives_back_stock_once(self):
+        product = make_product(self.seller, stock=5)
+        buyer = make_buyer('buyer', [product], quantity=2)
+        self.assertEqual(checkout(buyer).status_code, 201)
+        order = Order.objects.get(buyer=buyer)
+        stale = Order.objects.get(pk=order.pk)
+
+        order.cancel_order('Changed my mind')
+        with self.assertRaises(ValueError):
+            stale.cancel_order('Changed my mind')
+
+        product.refresh_from_db()
+        self.assertEqual((product.stock_quantity, product.sales_count), (5, 0))
+
+
+class OrderTransitionTests(TestCase):
+    def setUp(self):
+        self.seller = make_seller()
+        SellerProfile.objects.create(user=self.seller, business_name='Mama Put')
+        buyer = make_buyer('buyer', [make_product(self.seller, stock=5)])
+        self.assertEqual(checkout(buyer).status_code, 201)
+        self.order = Order.objects.get(buyer=buyer)
+
+    def test_stale_instances_cannot_confirm_or_complete_twice(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        self.order.confirm_order(self.seller)
+        with self.assertRaises(ValueError):
+            stale.confirm_order(self.seller)
+
+        stale = Order.objects.get(pk=self.order.pk)
+        self.order.complete_order()
+        with self.assertRaises(ValueError):
+            stale.complete_order()
+
+        profile = SellerProfile.objects.get(user=self.seller)
+        self.assertEqual((profile.total_earnings, profile.total_orders_fulfilled), (100, 1))
+
+    def test_complete_does_not_overwrite_a_cancel(self):
+        self.order.confirm_order(self.seller)
+        stale = Order.objects.get(pk=self.order.pk)
+        self.order.cancel_order('Out of stock')
+
+        with self.assertRaises(ValueError):
+            stale.complete_order()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.CANCELLED)
+
+
+class CheckoutQueryCountTests(TestCase):
+    def setUp(self):
+        self.seller = make_seller()
+        self.products = [make_product(self.seller, stock=10, name=f'Product {i}') for i in range(10)]
+        # The seller's first order creates its rollup rows, later ones update them
+        self.assertEqual(checkout(make_buyer('first', self.products[:1])).status_code, 201)
+
+    def test_one_item_cart(self):
+        buyer = make_buyer('buyer', self.products[:1])
+        with self.assertNumQueries(CHECKOUT_QUERIES):
+            self.assertEqual(checkout(buyer).status_code, 201)
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        buyer = make_buyer('buyer', self.products)
+        with self.assertNumQueries(CHECKOUT_QUERIES):
+            self.assertEqual(checkout(buyer).status_code, 201)
+        self.assertEqual(OrderItem.objects.filter(order__buyer=buyer).count(), len(self.products))
+
+
+class OrderQrCodeTests(TestCase):
+    def test_image_is_cached_only_while_the_payload_verifies(self):
+        buyer = make_buyer('buyer', [make_product(make_seller(), stock=5)])
+        self.assertEqual(checkout(buyer).status_code, 201)
+        order = Order.objects.get(buyer=buyer)
+        client = APIClient()
+        client.force_authenticate(buyer)
+
+        Order.objects.filter(pk=order.pk).update(
+            created_at=order.created_at - timedelta(seconds=settings.QR_PAYLOAD_MAX_AGE - 600)
+        )
+        max_age = int(client.get(f'/api/orders/{order.pk}/qr-code.png')['Cache-Control'].split('max-age=')[1].split(',')[0])
+        self.assertTrue(0 < max_age <= 600)
+
+        Order.objects.filter(pk=order.pk).update(
+            created_at=order.created_at - timedelta(seconds=settings.QR_PAYLOAD_MAX_AGE + 1)
+        )
+        self.assertEqual(client.get(f'/api/orders/{order.pk}/qr-code.png')['Cache-Control'], 'private, no-cache')
+
+
+class VerifyQrCodeTests(TestCase):
+    def setUp(self):
+        self.seller = make_seller()
+        buyer = make_buyer('buyer', [make_product(self.seller, stock=5)])
+        self.assertEqual(checkout(buyer).status_code, 201)
+        self.order = Order.objects.get(buyer=buyer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def verify(self, payload):
+        return self.client.post('/api/orders/verify-qr/', {'qr_code_token': payload})
+
+    def test_signed_payload_verifies(self):
+        response = self.verify(order_signing.sign_order(self.order))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order']['id'], self.order.pk)
+
+    def test_signed_amount_must_match_the_order(self):
+        payload = order_signing.sign(
+            self.order.pk, self.seller.pk, self.order.total_amount - 1, order_signing.expires(self.order)
+        )
+        response = self.verify(payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Amount does not match the order')
+
+
+class OrderListTests(TestCase):
+    def test_cursor_pages_walk_the_orders_newest_first(self):
+        seller = make_seller()
+        products = [make_product(seller, stock=5, name=f'Product {i}') for i in range(5)]
+        buyer = make_buyer('buyer', [])
+        for product in products:
+            CartItem.objects.create(cart=buyer.cart, product=product, quantity=1)
+            self.assertEqual(checkout(buyer).status_code, 201)
+        client = APIClient()
+        client.force_authenticate(buyer)
+
+        seen, url = [], '/api/orders/?pagination=cursor&page_size=2'
+        while url:
+            response = client.get(url)
+            seen += [order['id'] for order in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+
+    def test_list_pages_take_the_same_queries_for_any_number_of_orders(self):
+        seller = make_seller()
+        seller.first_name, seller.last_name = 'Mama', 'Put'
+        seller.save()
+        buyer = make_buyer('buyer', [make_product(seller, stock=5, name=f'Product {i}') for i in range(3)])
+        self.assertEqual(checkout(buyer).status_code, 201)
+        client = APIClient()
+        client.force_authenticate(buyer)
+
+        with CaptureQueriesContext(connection) as one_order:
+            response = client.get('/api/orders/')
+        order = response.data['results'][0]
+        self.assertEqual(order['items_count'], 3)
+        self.assertEqual(order['seller_name'], 'Mama Put')
+        # Blank names fall back to the email, like User.get_full_name
+        self.assertEqual(order['buyer_name'], 'buyer@example.com')
+
+        for i in range(4):
+            self.assertEqual(checkout(make_buyer(f'buyer{i}', [make_product(seller, stock=5)])).status_code, 201)
+        client.force_authenticate(seller)
+        with CaptureQueriesContext(connection) as five_orders:
+            response = client.get('/api/orders/')
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(five_orders), len(one_order))
+
+
+class OrderDetailConditionalTests(TestCase):
+    def setUp(self):
+        self.seller = make_seller()
+        self.buyer = make_buyer('buyer', [make_product(self.seller, stock=5)])
+        self.assertEqual(checkout(self.buyer).status_code, 201)
+        self.order = Order.objects.get(buyer=self.buyer)
+        self.url = f'/api/orders/{self.order.pk}/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def test_not_modified_until_the_order_or_a_profile_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        self.order.confirm_order(self.seller)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.seller.phone_number = '08030000000'
+        self.seller.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_other_users_orders_are_not_stamped(self):
+        self.client.force_authenticate(make_buyer('other', []))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class PickupSyncTests(TestCase):
+    def setUp(self):
+        self.seller = make_seller()
+        SellerProfile.objects.create(user=self.seller, business_name='Mama Put')
+        products = [make_product(self.seller, stock=5, name=f'Product {i}') for i in range(4)]
+        for i, product in enumerate(products):
+            self.assertEqual(checkout(make_buyer(f'buyer{i}', [product])).status_code, 201)
+        self.orders = list(Order.objects.order_by('id'))
+        self.orders[3].cancel_order('Changed my mind')
+
+        other = make_seller('other')
+        self.assertEqual(checkout(make_buyer('elsewhere', [make_product(other, stock=5)])).status_code, 201)
+        self.foreign = Order.objects.get(seller=other)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def test_manifest_lists_pending_orders_and_is_signed(self):
+        manifest = self.client.get('/api/orders/manifest/').data
+        signature = manifest.pop('signature')
+
+        self.assertEqual(signature, order_signing.sign_document(manifest))
+        self.assertEqual(manifest['fields'], ['id', 'order_number', 'total_amount', 'qr_code_token'])
+        self.assertEqual(
+            manifest['orders'],
+            [[order.id, order.order_number, '100.00', order.qr_code_token] for order in self.orders[:3]]
+        )
+
+        self.client.force_authenticate(self.foreign.buyer)
+        self.assertEqual(self.client.get('/api/orders/manifest/').status_code, 403)
+
+    def test_sync_confirms_and_completes_in_one_batch(self):
+        first, second, third, cancelled = self.orders
+        response = self.client.post('/api/orders/sync/', {
+            'confirm': [first.id, cancelled.id],
+            'complete': [second.id, third.id, self.foreign.id],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['confirmed'], [first.id])
+        self.assertEqual(sorted(response.data['completed']), [second.id, third.id])
+        self.assertEqual(response.data['skipped'], sorted([cancelled.id, self.foreign.id]))
+
+        statuses = dict(Order.objects.values_list('id', 'status'))
+        self.assertEqual(
+            [statuses[order.id] for order in self.orders + [self.foreign]],
+            ['CONFIRMED', 'COMPLETED', 'COMPLETED', 'CANCELLED', 'PENDING']
+        )
+        profile = SellerProfile.objects.get(user=self.seller)
+        self.assertEqual((profile.total_earnings, profile.total_orders_fulfilled), (200, 2))
+
+        # A second sync of the same pickups changes nothing
+        response = self.client.post('/api/orders/sync/', {'complete': [second.id]}, format='json')
+        self.assertEqual(response.data['skipped'], [second.id])
+        profile.refresh_from_db()
+        self.assertEqual(profile.total_orders_fulfilled, 2)
+
+
+class OrderStatsTests(TestCase):
+    def setUp(self):
+        self.seller = make_seller()
+        SellerProfile.objects.create(user=self.seller, business_name='Mama Put')
+        for i in range(5):
+            product = make_product(self.seller, stock=5, name=f'Product {i}', price=100 * (i + 1))
+            self.assertEqual(checkout(make_buyer(f'buyer{i}', [product])).status_code, 201)
+        self.orders = list(Order.objects.order_by('total_amount'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def stats(self):
+        response = self.client.get('/api/orders/stats/')
+        self.assertEqual(response.status_code, 200)
+        response.data.pop('updated_at')
+        return response.data
+
+    def test_rollups_follow_every_status_change(self):
+        first, second, third, fourth, _ = self.orders
+        first.confirm_order(self.seller)
+        second.confirm_order(self.seller)
+        second.complete_order()
+        third.cancel_order('Out of stock')
+        self.client.post('/api/orders/sync/', {'complete': [fourth.id]}, format='json')
+
+        stats = self.stats()
+        self.assertEqual(stats['orders'], {'pending': 1, 'confirmed': 1, 'completed': 2, 'cancelled': 1})
+        self.assertEqual(stats['pending_pickups'], 2)
+        self.assertEqual(stats['open_amount'], 600)
+        self.assertEqual(stats['orders_today'], 5)
+        self.assertEqual(stats['revenue'], {'total': 600, 'today': 600, 'this_week': 600})
+
+        # The incremental rollups agree with a rebuild from the orders table
+        call_command('rebuild_order_stats', stdout=StringIO())
+        self.assertEqual(self.stats(), stats)
+
+    def test_admins_pick_the_seller_and_buyers_have_no_stats(self):
+        admin = User.objects.create_user('admin', 'admin@example.com', role='ADMIN')
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get('/api/orders/stats/').status_code, 400)
+        response = self.client.get(f'/api/orders/stats/?seller={self.seller.pk}')
+        self.assertEqual(response.data['orders']['pending'], 5)
+
+        self.client.force_authenticate(self.orders[0].buyer)
+        self.assertEqual(self.client.get('/api/orders/stats/').status_code, 403)
+
+
+class OrderExpiryTests(TestCase):
+    def setUp(self):
+        self.seller = make_seller()
+        self.product = make_product(self.seller, stock=10)
+        self.feast = make_product(self.seller, stock=1, name='Party Tray', price=50000)
+        # Three abandoned orders, one of them spending all of the buyer's credit
+        for i in range(2):
+            self.assertEqual(checkout(make_buyer(f'buyer{i}', [self.product], quantity=2)).status_code, 201)
+        self.assertEqual(checkout(make_buyer('big', [self.feast])).status_code, 201)
+        Order.objects.update(created_at=timezone.now() - timedelta(seconds=settings.PENDING_ORDER_TTL + 60))
+        self.abandoned = list(Order.objects.order_by('id'))
+        self.abandoned[1].confirm_order(self.seller)
+        # A recent order is left alone
+        self.assertEqual(checkout(make_buyer('recent', [self.product])).status_code, 201)
+
+    def test_expiry_cancels_refunds_and_releases_stock(self):
+        first, confirmed, big = self.abandoned
+        self.assertEqual(big.buyer.credit_account.loan_status, CreditAccount.LoanStatus.EXHAUSTED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('expire_pending_orders', batch_size=1, stdout=StringIO())
+
+        statuses = dict(Order.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[first.id], statuses[confirmed.id], statuses[big.id]], ['CANCELLED', 'CONFIRMED', 'CANCELLED'])
+        self.assertEqual(Order.objects.filter(status='PENDING').count(), 1)
+        self.product.refresh_from_db()
+        self.feast.refresh_from_db()
+        self.assertEqual((self.product.stock_quantity, self.feast.stock_quantity), (10 - 2 - 1, 1))
+
+        for order in (first, big):
+            account = CreditAccount.objects.get(user=order.buyer)
+            self.assertEqual(ledger.balances(account.pk).balance, Decimal('50000'))
+            self.assertEqual((account.credit_balance, account.total_credit_used), (Decimal('50000'), 0))
+            self.assertEqual(account.loan_status, CreditAccount.LoanStatus.ACTIVE)
+
+        stats = SellerOrderStats.objects.get(seller=self.seller)
+        self.assertEqual((stats.pending_orders, stats.confirmed_orders, stats.cancelled_orders), (1, 1, 2))
+        self.assertEqual(stats.open_amount, 300)
+        self.assertEqual(
+            sorted(OutboxEvent.objects.filter(topic=OutboxEvent.Topic.ORDER_CANCELLED).values_list('aggregate_id', flat=True)),
+            [first.id, big.id]
+        )
+
+        # Nothing left to expire
+        self.assertEqual(expiry.expire_pending_orders(), 0)
+
+
+class OrderEventStreamTests(TestCase):
+    def setUp(self):
+        self.seller = make_seller()
+        self.buyer = make_buyer('buyer', [make_product(self.seller, stock=5)])
+        # Another seller's order, not sent to this seller's stream
+        self.other_buyer = make_buyer('other', [make_product(make_seller('other_seller'), stock=5)])
+
+    def stream(self, user=None, token=None, method='get'):
+        token = token or (str(AccessToken.for_user(user)) if user else '')
+        return getattr(Client(), method)(f'/api/orders/events/?token={token}')
+
+    def test_only_sellers_can_subscribe(self):
+        self.assertEqual(self.stream().status_code, 401)
+        self.assertEqual(self.stream(token='not-a-token').status_code, 401)
+        self.assertEqual(self.stream(self.buyer).status_code, 403)
+        self.assertEqual(self.stream(self.seller, method='post').status_code, 405)
+
+        response = self.stream(self.seller)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+    def place_order(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(checkout(self.buyer).status_code, 201)
+            self.assertEqual(checkout(self.other_buyer).status_code, 201)
+        # Nothing is published before the checkout commits
+        self.assertEqual(self.received, [])
+        for callback in callbacks:
+            callback()
+
+    async def listen(self):
+        frames = order_events.stream(self.seller.id, keepalive=0.1)
+        self.assertEqual(await anext(frames), 'retry: 3000\n\n')
+        subscription, = order_events.get_broker().subscribers[self.seller.id]
+        self.received = []
+        try:
+            await sync_to_async(self.place_order)()
+            while True:
+                frame = await anext(frames)
+                if frame.startswith(':'):
+                    # Keepalive: nothing else is queued
+                    return
+                self.received.append(frame)
+        finally:
+            await frames.aclose()
+        self.assertNotIn(subscription, order_events.get_broker().subscribers.get(self.seller.id, ()))
+
+    def test_order_events_reach_their_seller_after_commit(self):
+        async_to_sync(self.listen)()
+
+        order = Order.objects.get(seller=self.seller)
+        frame, = self.received
+        lines = dict(line.split(': ', 1) for line in frame.strip().split('\n'))
+        self.assertEqual(lines['event'], order_events.ORDER_CREATED)
+        self.assertEqual(
+            json.loads(lines['data']),
+            {'id': order.id, 'order_number': order.order_number, 'status': 'PENDING', 'total_amount': '100.00'}
+        )
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Checkouts from many threads at once against limited stock"""
+
+    def test_concurrent_checkouts_never_oversell(self):
+        seller = make_seller()
+        products = [make_product(seller, stock=4), make_product(seller, stock=4, name='Beans')]
+        buyers = [make_buyer(f'buyer{i}', products) for i in range(10)]
+        barrier = threading.Barrier(len(buyers))
+        responses = []
+
+        def run(buyer):
+            barrier.wait()
+            try:
+                # SQLite serializes writers; a checkout that gives up on the lock retries
+                for _ in range(LOCK_RETRIES):
+                    response = checkout(buyer)
+                    if 'locked' not in str(response.data.get('error', '')):
+                        break
+                    time.sleep(0.02)
+                responses.append(response)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(buyer,)) for buyer in buyers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        placed = [response for response in responses if response.status_code == 201]
+        rejected = [response for response in responses if str(response.data.get('error', '')).startswith('Insufficient stock')]
+        self.assertEqual((len(placed), len(rejected)), (4, len(buyers) - 4))
+        for product in products:
+            product.refresh_from_db()
+            self.assertGreaterEqual(product.stock_quantity, 0)
+            self.assertEqual(product.stock_quantity + ordered(product), 4)
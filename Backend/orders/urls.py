@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 app_name = 'orders'
@@ -18,11 +18,21 @@ urlpatterns = [
     path('', views.my_orders, name='my_orders'),  # GET for buyers, different response for sellers
     path('<int:order_id>/', views.order_detail, name='order_detail'),
     path('<int:order_id>/qr-code/', views.save_qr_code, name='save_qr_code'),
+    re_path(r'^(?P<order_id>[0-9]+)/qr-code\.(?P<image_format>png|svg)$', views.order_qr_code, name='order_qr_code'),
     
     # Order Actions (seller uses these, but no "seller/" prefix in URL)
     path('<int:order_id>/confirm/', views.confirm_order, name='confirm_order'),
     path('<int:order_id>/complete/', views.complete_order, name='complete_order'),
     path('verify-qr/', views.verify_qr_code, name='verify_qr_code'),
+    path('verify-qr/batch/', views.verify_qr_codes, name='verify_qr_codes'),
+    
+    # Offline pickup (seller downloads a manifest, syncs pickups in batches)
+    path('manifest/', views.seller_manifest, name='seller_manifest'),
+    path('sync/', views.sync_orders, name='sync_orders'),
+    
+    # Seller dashboard (rollup backed)
+    path('stats/', views.order_stats, name='order_stats'),
+    path('events/', views.order_event_stream, name='order_event_stream'),
     
     # Management (was admin)
     path('all/', views.all_orders, name='all_orders'),
@@ -1,15 +1,37 @@
+import time
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.conf import settings
 from django.db import transaction
+from django.db.models import CharField, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
+from django.utils import timezone
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from .models import Cart, CartItem, Order, OrderItem
 from shop.models import Product
-from credits.models import CreditAccount, CreditTransaction
+from shop.pagination import KeysetPagination
+from shop.conditional import conditional
+from shop import caching as catalog_cache
+from outbox.models import OutboxEvent
+from accounts.idempotency import idempotent
+from . import events as order_events
+from . import qr as order_qr
+from . import rollups as order_rollups
+from . import signing as order_signing
 from .serializers import (
     CartSerializer, CartItemSerializer, AddToCartSerializer,
     UpdateCartItemSerializer, OrderListSerializer, OrderDetailSerializer,
-    ConfirmOrderSerializer, OrderQRCodeSerializer
+    ConfirmOrderSerializer, OrderQRCodeSerializer, BatchVerifyQRCodeSerializer,
+    OrderSyncSerializer
 )
 
 
@@ -210,6 +232,7 @@ def clear_cart(request):
 # Order Views
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def checkout(request):
     """
     Checkout and create order
@@ -228,14 +251,19 @@ def checkout(request):
             # Get cart
             cart = Cart.objects.get(user=user)
             
-            if not cart.items.exists():
+            # OPTIMIZATION: Cart items, products and sellers in one query
+            cart_items = list(
+                cart.items.select_related('product__seller').order_by('product_id')
+            )
+            
+            if not cart_items:
                 return Response(
                     {'error': 'Cart is empty'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
             # Calculate total
-            total_amount = cart.subtotal
+            total_amount = sum(cart_item.total_price for cart_item in cart_items)
             
             # Get credit account
             credit_account = user.credit_account
@@ -251,36 +279,34 @@ def checkout(request):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Verify stock for all items AND reduce stock immediately
-            for cart_item in cart.items.all():
-                # Refresh product data from DB to get latest stock
-                cart_item.product.refresh_from_db()
-                
-                if cart_item.quantity > cart_item.product.stock_quantity:
-                    return Response(
-                        {
-                            'error': f'Insufficient stock for {cart_item.product.name}',
-                            'available': cart_item.product.stock_quantity,
-                            'requested': cart_item.quantity
-                        },
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # ✅ REDUCE STOCK IMMEDIATELY AT CHECKOUT
-                success = cart_item.product.reduce_stock(cart_item.quantity)
-                if not success:
-                    # Rollback will happen automatically due to transaction.atomic()
-                    return Response(
-                        {
-                            'error': f'Failed to reserve stock for {cart_item.product.name}',
-                            'available': cart_item.product.stock_quantity
-                        },
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+            # Reserve stock for all items immediately.
+            # OPTIMIZATION: One conditional UPDATE for the whole cart
+            # (stock_quantity >= quantity per row), so concurrent checkouts cannot oversell
+            quantities = {cart_item.product_id: cart_item.quantity for cart_item in cart_items}
+            if not Product.reserve_stock(quantities):
+                available = dict(
+                    Product.objects.filter(pk__in=list(quantities)).values_list('id', 'stock_quantity')
+                )
+                # Returning from inside atomic() would commit the items reserved so far
+                transaction.set_rollback(True)
+                short = next(
+                    cart_item for cart_item in cart_items
+                    if available.get(cart_item.product_id, 0) < cart_item.quantity
+                )
+                return Response(
+                    {
+                        'error': f'Insufficient stock for {short.product.name}',
+                        'available': available.get(short.product_id, 0),
+                        'requested': short.quantity
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Stock changed through UPDATE, which skips the cache invalidation signals
+            transaction.on_commit(lambda: catalog_cache.bump('products'))
             
             # Get seller (assume all products from same seller)
-            first_item = cart.items.first()
-            seller = first_item.product.seller
+            seller = cart_items[0].product.seller
             
             # Create order
             order = Order.objects.create(
@@ -289,33 +315,31 @@ def checkout(request):
                 total_amount=total_amount,
                 status=Order.OrderStatus.PENDING
             )
+            order_rollups.record(seller.id, None, order.status, amount=total_amount)
+            order_events.publish(order_events.ORDER_CREATED, seller.id, [order])
+            OutboxEvent.emit_orders(OutboxEvent.Topic.ORDER_CREATED, [order])
             
             # Create order items (snapshot of products at order time)
-            for cart_item in cart.items.all():
-                OrderItem.objects.create(
+            # OPTIMIZATION: Snapshot fields filled here, one INSERT for all items
+            OrderItem.objects.bulk_create([
+                OrderItem(
                     order=order,
                     product=cart_item.product,
-                    quantity=cart_item.quantity
+                    product_name=cart_item.product.name,
+                    product_price=cart_item.product.price,
+                    quantity=cart_item.quantity,
+                    subtotal=cart_item.total_price
                 )
+                for cart_item in cart_items
+            ])
             
-            # Deduct credit from buyer
-            old_balance = credit_account.credit_balance
-            credit_account.deduct_credit(total_amount)
-            
-            # Log credit transaction
-            CreditTransaction.objects.create(
-                credit_account=credit_account,
-                transaction_type=CreditTransaction.TransactionType.PURCHASE,
-                amount=total_amount,
-                balance_before=old_balance,
-                balance_after=credit_account.credit_balance,
+            # Deduct credit from buyer (appends a PURCHASE to the credit ledger)
+            credit_account.deduct_credit(
+                total_amount,
                 description=f"Purchase - Order {order.order_number}",
                 reference=order.order_number
             )
             
-            # Generate QR code
-            qr_code_base64 = order.generate_qr_code()
-            
             # Clear cart
             cart.clear()
             
@@ -323,7 +347,12 @@ def checkout(request):
                 {
                     'message': 'Order placed successfully',
                     'order': OrderDetailSerializer(order).data,
-                    'qr_code_base64': qr_code_base64
+                    # OPTIMIZATION: The QR image is rendered (and cached) by the
+                    # qr-code.png/.svg endpoints, not inside this transaction
+                    'qr_code_token': order.qr_code_token,
+                    'qr_code_url': request.build_absolute_uri(
+                        reverse('orders:order_qr_code', args=[order.id, 'png'])
+                    )
                 },
                 status=status.HTTP_201_CREATED
             )
@@ -382,13 +411,33 @@ def verify_qr_code(request):
     
     if serializer.is_valid():
         qr_code_token = serializer.validated_data['qr_code_token']
+        orders = Order.objects.filter(seller=user, status=Order.OrderStatus.PENDING)
+        payload = None
+        
+        # Signed payloads are checked before any query, plain tokens are looked up
+        if order_signing.is_signed(qr_code_token):
+            try:
+                payload = order_signing.verify(qr_code_token)
+            except order_signing.InvalidPayload as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if payload['seller_id'] != user.id:
+                return Response(
+                    {'error': 'Invalid QR code or order not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            orders = orders.filter(id=payload['order_id'])
+        else:
+            orders = orders.filter(qr_code_token=qr_code_token)
         
         try:
-            order = Order.objects.get(
-                qr_code_token=qr_code_token,
-                seller=user,
-                status=Order.OrderStatus.PENDING
-            )
+            order = orders.get()
+            
+            # As in the batch endpoint, the signed amount must be the order's
+            if payload is not None and order.total_amount != payload['amount']:
+                return Response(
+                    {'error': 'Amount does not match the order'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
             return Response(
                 {
@@ -407,6 +456,71 @@ def verify_qr_code(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def verify_qr_codes(request):
+    """
+    Seller verifies a burst of scanned QR payloads at once.
+    Signatures, expiry and seller are checked offline; the payloads that pass
+    are resolved with one query. Results come back in request order.
+    """
+    user = request.user
+    
+    if user.role != 'SELLER':
+        return Response(
+            {'error': 'Only sellers can verify orders'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    serializer = BatchVerifyQRCodeSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    scanned = serializer.validated_data['payloads']
+    results = []
+    for raw in scanned:
+        try:
+            payload = order_signing.verify(raw)
+        except order_signing.InvalidPayload as e:
+            results.append({'payload': raw, 'valid': False, 'error': str(e)})
+            continue
+        if payload['seller_id'] != user.id:
+            results.append({'payload': raw, 'valid': False, 'error': 'Order belongs to another seller'})
+            continue
+        results.append({'payload': raw, 'valid': True, 'order_id': payload['order_id'], 'amount': payload['amount']})
+    
+    # OPTIMIZATION: One query for every payload that passed the offline checks
+    order_ids = [result['order_id'] for result in results if result['valid']]
+    orders = {
+        order['id']: order
+        for order in Order.objects.filter(id__in=order_ids, seller=user).values(
+            'id', 'order_number', 'status', 'total_amount', 'created_at'
+        )
+    }
+    
+    for result in results:
+        if not result['valid']:
+            continue
+        order = orders.get(result.pop('order_id'))
+        amount = result.pop('amount')
+        if order is None:
+            result.update(valid=False, error='Order not found')
+        elif order['total_amount'] != amount:
+            result.update(valid=False, error='Amount does not match the order')
+        elif order['status'] != Order.OrderStatus.PENDING:
+            result.update(valid=False, error=f"Order is {order['status'].lower()}", order=order)
+        else:
+            result['order'] = order
+    
+    return Response(
+        {
+            'verified': sum(1 for result in results if result['valid']),
+            'results': results
+        },
+        status=status.HTTP_200_OK
+    )
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def confirm_order(request, order_id):
@@ -490,26 +604,124 @@ def complete_order(request, order_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
-def my_orders(request):
+def seller_manifest(request):
     """
-    Unified view for orders - works for both buyers and sellers
-    Automatically detects user role and returns appropriate orders
+    Seller downloads all PENDING orders (and their QR tokens) for offline
+    matching at the pickup counter. The manifest is signed: `signature` is an
+    HMAC-SHA256 over the JSON of every other key (sorted keys, no spaces).
     """
     user = request.user
     
-    # Determine which orders to fetch based on role
-    if user.role == 'BUYER':
-        orders = Order.objects.filter(buyer=user).select_related('seller', 'buyer').prefetch_related('items__product')
+    if user.role != 'SELLER':
+        return Response(
+            {'error': 'Only sellers have a pickup manifest'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    fields = ['id', 'order_number', 'total_amount', 'qr_code_token']
+    # OPTIMIZATION: One index range read on (seller, status), rows as plain lists
+    orders = Order.objects.filter(
+        seller=user, status=Order.OrderStatus.PENDING
+    ).order_by('id').values_list(*fields)
+    
+    manifest = {
+        'seller_id': user.id,
+        'generated_at': timezone.now().isoformat(),
+        'fields': fields,
+        'orders': [[str(value) if isinstance(value, Decimal) else value for value in row] for row in orders],
+    }
+    manifest['signature'] = order_signing.sign_document(manifest)
+    return Response(manifest, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def order_stats(request):
+    """
+    Seller dashboard numbers: orders per status, pending pickups, revenue
+    (total, today, this week). Admins pass ?seller=<id>.
+    """
+    user = request.user
+    
+    if user.is_admin_user:
+        seller_id = request.query_params.get('seller')
+        if not seller_id or not seller_id.isdigit():
+            return Response(
+                {'error': 'seller query parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        seller_id = int(seller_id)
     elif user.role == 'SELLER':
-        orders = Order.objects.filter(seller=user).select_related('seller', 'buyer').prefetch_related('items__product')
-    elif user.is_admin_user:
-        orders = Order.objects.all().select_related('seller', 'buyer').prefetch_related('items__product')
+        seller_id = user.id
     else:
+        return Response(
+            {'error': 'Only sellers have order stats'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    # OPTIMIZATION: Reads the incrementally maintained rollup (one row plus at
+    # most seven daily rows) instead of aggregating the seller's orders
+    return Response(order_rollups.dashboard(seller_id), status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def sync_orders(request):
+    """
+    Seller syncs offline pickups: confirms and/or completes many orders in one
+    transaction. Completing a PENDING order confirms it too. Ids that are not
+    the seller's or not in a valid status are returned as skipped.
+    """
+    user = request.user
+    
+    if user.role != 'SELLER':
+        return Response(
+            {'error': 'Only sellers can sync orders'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    serializer = OrderSyncSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    to_confirm = serializer.validated_data['confirm']
+    to_complete = serializer.validated_data['complete']
+    
+    # OPTIMIZATION: Set-based status updates and one wallet increment for the batch
+    with transaction.atomic():
+        confirmed = Order.bulk_confirm(user, to_confirm) if to_confirm else []
+        completed = Order.bulk_complete(user, to_complete) if to_complete else []
+    
+    done = set(confirmed) | set(completed)
+    return Response(
+        {
+            'message': f'{len(confirmed)} order(s) confirmed, {len(completed)} order(s) completed',
+            'confirmed': confirmed,
+            'completed': completed,
+            'skipped': sorted(set(to_confirm + to_complete) - done)
+        },
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def my_orders(request):
+    """
+    Unified view for orders - works for both buyers and sellers
+    Automatically detects user role and returns appropriate orders
+    """
+    # Determine which orders to fetch based on role
+    orders = visible_orders(request.user)
+    if orders is None:
         return Response(
             {'error': 'Invalid user role'},
             status=status.HTTP_403_FORBIDDEN
         )
     
+    # OPTIMIZATION: Names and item counts come annotated, one query per page
+    orders = order_list_queryset(orders)
+    
     # Order by newest first
     orders = orders.order_by('-created_at')
     
@@ -518,9 +730,12 @@ def my_orders(request):
     if order_status:
         orders = orders.filter(status=order_status.upper())
     
-    # Pagination
-    paginator = PageNumberPagination()
-    paginator.page_size = 20
+    # Pagination (?pagination=cursor for keyset cursors, no COUNT/OFFSET)
+    if KeysetPagination.requested(request):
+        paginator = KeysetPagination(ordering='-created_at', page_size=20)
+    else:
+        paginator = PageNumberPagination()
+        paginator.page_size = 20
     paginated_orders = paginator.paginate_queryset(orders, request)
     
     if paginated_orders is not None:
@@ -545,8 +760,84 @@ def seller_orders(request):
     return my_orders(request)
 
 
+def visible_orders(user):
+    """Orders the user may see, or None"""
+    if user.role == 'BUYER':
+        return Order.objects.filter(buyer=user)
+    elif user.role == 'SELLER':
+        return Order.objects.filter(seller=user)
+    elif user.is_admin_user:
+        return Order.objects.all()
+    return None
+
+
+def full_name(user_field):
+    """SQL version of User.get_full_name: "first last", or the email when blank"""
+    name = Trim(Concat(f'{user_field}__first_name', Value(' '), f'{user_field}__last_name'))
+    return Coalesce(NullIf(name, Value('')), f'{user_field}__email', output_field=CharField())
+
+
+def order_list_queryset(orders):
+    """
+    Everything OrderListSerializer needs in one query per page: order columns,
+    buyer/seller names joined in SQL and the item count as a subquery (not a
+    GROUP BY, so the paginator's COUNT(*) stays a plain count)
+    """
+    items_count = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+        count=Count('id')
+    ).values('count')
+    return orders.select_related(None).prefetch_related(None).only(
+        'id', 'order_number', 'buyer_id', 'seller_id', 'total_amount', 'status', 'created_at'
+    ).annotate(
+        buyer_name=full_name('buyer'),
+        seller_name=full_name('seller'),
+        items_count=Coalesce(Subquery(items_count), 0)
+    )
+
+
+def order_detail_stamp(request, order_id):
+    """
+    ETag inputs for an order the user may see: the order and the buyer and
+    seller profiles nested in the response (items are immutable)
+    """
+    orders = visible_orders(request.user)
+    if orders is None:
+        return None
+    
+    stamp = orders.filter(id=order_id).values(
+        'id', 'status', 'updated_at', 'buyer__updated_at', 'seller__updated_at'
+    ).first()
+    if stamp is None:
+        return None
+    return {
+        'parts': list(stamp.values()),
+        'last_modified': max(stamp['updated_at'], stamp['buyer__updated_at'], stamp['seller__updated_at']),
+    }
+
+
+def order_qr_code_stamp(request, order_id, image_format):
+    """
+    A token always renders the same image, so the token is the ETag. Clients
+    keep the image only while the signed payload in it still verifies.
+    """
+    orders = visible_orders(request.user)
+    if orders is None:
+        return None
+    
+    order = orders.filter(id=order_id).only('qr_code_token', 'created_at').first()
+    if order is None:
+        return None
+    remaining = max(order_signing.expires(order) - int(time.time()), 0)
+    return {
+        'parts': [order.qr_code_token, image_format],
+        'last_modified': order.created_at,
+        'cache_control': f'private, max-age={remaining}, immutable' if remaining else 'private, no-cache',
+    }
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional(order_detail_stamp, cache_control='private, no-cache')
 def order_detail(request, order_id):
     """View order details"""
     user = request.user
@@ -575,6 +866,28 @@ def order_detail(request, order_id):
         )
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@conditional(order_qr_code_stamp)
+def order_qr_code(request, order_id, image_format):
+    """QR code image (PNG or SVG) for an order, rendered on first request"""
+    orders = visible_orders(request.user)
+    if orders is None:
+        return Response(
+            {'error': 'Permission denied'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    order = orders.filter(id=order_id).only('id', 'seller_id', 'total_amount', 'qr_code_token', 'created_at').first()
+    if order is None:
+        return Response(
+            {'error': 'Order not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return HttpResponse(order_qr.get_image(order, image_format), content_type=order_qr.CONTENT_TYPES[image_format])
+
+
 # Admin Views
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -586,17 +899,73 @@ def all_orders(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    orders = Order.objects.all()
+    # OPTIMIZATION: Names and item counts come annotated, one query per page
+    orders = order_list_queryset(Order.objects.all())
     
     # Filter by status
     order_status = request.query_params.get('status')
     if order_status:
         orders = orders.filter(status=order_status)
     
-    # Pagination
-    paginator = PageNumberPagination()
-    paginator.page_size = 20
+    # Pagination (?pagination=cursor for keyset cursors, no COUNT/OFFSET)
+    if KeysetPagination.requested(request):
+        paginator = KeysetPagination(ordering='-created_at', page_size=20)
+    else:
+        paginator = PageNumberPagination()
+        paginator.page_size = 20
     paginated_orders = paginator.paginate_queryset(orders, request)
     
     serializer = OrderListSerializer(paginated_orders, many=True)
-    return paginator.get_paginated_response(serializer.data)
\ No newline at end of file
+    return paginator.get_paginated_response(serializer.data)
+
+
+# ============================================
+# LIVE ORDER EVENTS (Server-Sent Events, ASGI)
+# ============================================
+
+def stream_user(request):
+    """
+    JWT user for an event stream. EventSource cannot set headers, so the
+    access token may also come as ?token=.
+    """
+    authentication = JWTAuthentication()
+    raw_token = request.GET.get('token')
+    try:
+        if raw_token:
+            return authentication.get_user(authentication.get_validated_token(raw_token))
+        result = authentication.authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+async def order_event_stream(request):
+    """
+    Seller subscribes to their order events (order.created, order.confirmed,
+    order.completed, order.cancelled) instead of polling my_orders.
+    Plain async Django view: DRF views cannot stream asynchronously.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    
+    user = await sync_to_async(stream_user)(request)
+    if user is None:
+        return JsonResponse(
+            {'error': 'Authentication credentials were not provided or are invalid'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    if user.role != 'SELLER':
+        return JsonResponse(
+            {'error': 'Only sellers can subscribe to order events'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    # OPTIMIZATION: An open stream waits on an in-process queue, no queries
+    # until an order event for this seller is published
+    response = StreamingHttpResponse(
+        order_events.stream(user.id, settings.ORDER_EVENTS_KEEPALIVE),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
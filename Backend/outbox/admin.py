@@ -0,0 +1,14 @@
+from django.contrib import admin
+from .models import OutboxCursor, OutboxEvent
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'topic', 'aggregate_type', 'aggregate_id', 'created_at']
+    list_filter = ['topic']
+    search_fields = ['aggregate_id']
+    readonly_fields = ['topic', 'aggregate_type', 'aggregate_id', 'payload', 'created_at']
+
+
+@admin.register(OutboxCursor)
+class OutboxCursorAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_event_id', 'updated_at']
@@ -0,0 +1,66 @@
+"""
+Reading the outbox in id order.
+
+Consumers keep the id of the last event they handled and ask for the events
+after it: a primary key range read (or a (topic, id) range with a topic), no
+OFFSET and no COUNT.
+
+Ids are taken at INSERT but become visible at COMMIT, so a transaction that
+emits early and commits late (checkout emits before it writes the items and
+the credit ledger) leaves a hole below ids that are already readable. A
+consumer that read past the hole would never see that event. Reads therefore
+stop below the first missing id while the event after it is younger than
+OUTBOX_GAP_TIMEOUT seconds; older holes are inserts that rolled back, and are
+skipped. Events younger than OUTBOX_VISIBILITY_DELAY seconds are held back as
+well, which keeps most short transactions from stalling a reader at all.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+FIELDS = ('id', 'topic', 'aggregate_type', 'aggregate_id', 'payload', 'created_at')
+DEFAULT_GAP_TIMEOUT = 300
+
+
+def settled_until(after, last, now=None):
+    """
+    Highest id in (after, last] below which no id is still missing: every id
+    is either an event or a hole whose next event is older than the timeout
+    """
+    horizon = (now or timezone.now()) - timedelta(
+        seconds=getattr(settings, 'OUTBOX_GAP_TIMEOUT', DEFAULT_GAP_TIMEOUT)
+    )
+    # Holes below the recent events are old enough to be rollbacks
+    first_recent = OutboxEvent.objects.filter(
+        id__gt=after, id__lte=last, created_at__gt=horizon
+    ).order_by('id').values_list('id', flat=True).first()
+    if first_recent is None:
+        return last
+
+    expected = max(after + 1, first_recent - 1)
+    rows = OutboxEvent.objects.filter(id__gte=expected, id__lte=last).order_by('id').values_list('id', 'created_at')
+    for event_id, created_at in rows:
+        if event_id != expected and created_at > horizon:
+            return expected - 1
+        expected = event_id + 1
+    return last
+
+
+def events_after(after=0, limit=100, topics=None, now=None):
+    """Up to `limit` events with id > after, oldest first, as dicts"""
+    now = now or timezone.now()
+    events = OutboxEvent.objects.filter(id__gt=after)
+    if topics:
+        events = events.filter(topic__in=topics)
+    delay = getattr(settings, 'OUTBOX_VISIBILITY_DELAY', 0)
+    if delay:
+        events = events.filter(created_at__lte=now - timedelta(seconds=delay))
+    events = list(events.order_by('id').values(*FIELDS)[:limit])
+    if not events:
+        return events
+
+    until = settled_until(after, events[-1]['id'], now)
+    return [event for event in events if event['id'] <= until]
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from outbox import relay
+
+
+class Command(BaseCommand):
+    help = (
+        'Delivers outbox events to a sink (settings.OUTBOX or --sink) in id order, '
+        'remembering progress under --cursor. Run it from cron, or with --loop as a worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', help='Dotted path of the sink class (default: settings.OUTBOX)')
+        parser.add_argument('--cursor', default='default', help='Name the progress is stored under')
+        parser.add_argument('--batch-size', type=int, default=relay.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep running, every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        sink = relay.get_sink(options['sink'], {} if options['sink'] else None)
+        while True:
+            delivered = relay.relay(sink, options['cursor'], options['batch_size'])
+            if delivered or not options['loop']:
+                self.stdout.write(f'Delivered {delivered} events')
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:57
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_event_id', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'outbox_cursors',
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(choices=[('order.created', 'Order created'), ('order.confirmed', 'Order confirmed'), ('order.completed', 'Order completed'), ('order.cancelled', 'Order cancelled'), ('credit.repaid', 'Credit repaid')], max_length=50)),
+                ('aggregate_type', models.CharField(max_length=30)),
+                ('aggregate_id', models.PositiveBigIntegerField()),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'outbox_events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['topic', 'id'], name='outbox_even_topic_810286_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class OutboxEvent(models.Model):
+    """
+    Transactional outbox: one row per order/credit change, written in the same
+    transaction as the change itself. Read in id order by GET /api/events/
+    and by `manage.py relay_outbox`.
+    """
+    class Topic(models.TextChoices):
+        ORDER_CREATED = 'order.created', 'Order created'
+        ORDER_CONFIRMED = 'order.confirmed', 'Order confirmed'
+        ORDER_COMPLETED = 'order.completed', 'Order completed'
+        ORDER_CANCELLED = 'order.cancelled', 'Order cancelled'
+        CREDIT_REPAID = 'credit.repaid', 'Credit repaid'
+    
+    topic = models.CharField(max_length=50, choices=Topic.choices)
+    aggregate_type = models.CharField(max_length=30)
+    aggregate_id = models.PositiveBigIntegerField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'outbox_events'
+        ordering = ['id']
+        indexes = [
+            # ?topic= feeds read (topic, id) ranges
+            models.Index(fields=['topic', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.id} {self.topic} {self.aggregate_type}:{self.aggregate_id}"
+    
+    @staticmethod
+    def order_payload(order):
+        """Payload for an Order or a values() dict of one"""
+        get = order.get if isinstance(order, dict) else lambda field: getattr(order, field)
+        return {
+            'order_id': get('id'),
+            'order_number': get('order_number'),
+            'buyer_id': get('buyer_id'),
+            'seller_id': get('seller_id'),
+            'total_amount': get('total_amount'),
+            'status': get('status'),
+        }
+    
+    @classmethod
+    def emit(cls, topic, aggregate_type, aggregate_id, payload):
+        return cls.objects.create(
+            topic=topic,
+            aggregate_type=aggregate_type,
+            aggregate_id=aggregate_id,
+            payload=payload
+        )
+    
+    @classmethod
+    def emit_orders(cls, topic, orders, **extra):
+        """One event per order with a single INSERT"""
+        return cls.objects.bulk_create([
+            cls(
+                topic=topic,
+                aggregate_type='order',
+                aggregate_id=payload['order_id'],
+                payload={**payload, **extra}
+            )
+            for payload in map(cls.order_payload, orders)
+        ])
+
+
+class OutboxCursor(models.Model):
+    """Last event id a relay has delivered to its sink"""
+    name = models.CharField(max_length=100, unique=True)
+    last_event_id = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'outbox_cursors'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.last_event_id}"
@@ -0,0 +1,51 @@
+"""
+Relay from the outbox to a sink, at least once.
+
+The relay reads the batch after its cursor, hands it to the sink and only then
+moves the cursor, with a conditional UPDATE so two relays sharing a cursor
+cannot move it backwards. Nothing is locked while the sink runs.
+
+The feed stops below ids that are not committed yet (see feed.py), so the
+cursor waits there instead of passing an event that commits late. An event
+whose transaction runs longer than OUTBOX_GAP_TIMEOUT is the one case that
+can still be skipped.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .feed import events_after
+from .models import OutboxCursor
+
+DEFAULT_SINK = 'outbox.sinks.JSONLinesSink'
+DEFAULT_BATCH_SIZE = 100
+
+
+def get_sink(path=None, options=None):
+    config = getattr(settings, 'OUTBOX', {})
+    sink = import_string(path or config.get('SINK', DEFAULT_SINK))
+    return sink(**(config.get('OPTIONS', {}) if options is None else options))
+
+
+def relay_batch(sink, cursor_name, batch_size=DEFAULT_BATCH_SIZE):
+    """Deliver the next batch, returns how many events were delivered"""
+    cursor, _ = OutboxCursor.objects.get_or_create(name=cursor_name)
+    events = events_after(cursor.last_event_id, batch_size)
+    if not events:
+        return 0
+
+    sink.deliver(events)
+
+    OutboxCursor.objects.filter(
+        pk=cursor.pk, last_event_id__lt=events[-1]['id']
+    ).update(last_event_id=events[-1]['id'])
+    return len(events)
+
+
+def relay(sink, cursor_name, batch_size=DEFAULT_BATCH_SIZE):
+    """Deliver everything that is visible now, returns the number of events"""
+    delivered = 0
+    while True:
+        count = relay_batch(sink, cursor_name, batch_size)
+        delivered += count
+        if count < batch_size:
+            return delivered
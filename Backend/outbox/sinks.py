@@ -0,0 +1,48 @@
+"""
+Where `manage.py relay_outbox` delivers events (settings.OUTBOX['SINK']).
+
+A sink is any class with deliver(events), taking a list of event dicts and
+raising if the batch was not accepted; the relay then retries the same batch.
+"""
+import json
+import sys
+import urllib.request
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class JSONLinesSink:
+    """Appends every event as one JSON line to `path`, or writes to stdout"""
+
+    def __init__(self, path=None):
+        self.path = path
+
+    def deliver(self, events):
+        lines = ''.join(json.dumps(event, cls=DjangoJSONEncoder) + '\n' for event in events)
+        if self.path is None:
+            sys.stdout.write(lines)
+            sys.stdout.flush()
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+class WebhookSink:
+    """POSTs each batch as {"events": [...]} JSON, any 2xx accepts it"""
+
+    def __init__(self, url, timeout=10, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    def deliver(self, events):
+        body = json.dumps({'events': events}, cls=DjangoJSONEncoder).encode()
+        request = urllib.request.Request(
+            self.url,
+            data=body,
+            headers={'Content-Type': 'application/json', **self.headers},
+            method='POST'
+        )
+        # urlopen raises HTTPError for non-2xx responses
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
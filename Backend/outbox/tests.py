@@ -0,0 +1,202 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from orders.models import Cart, CartItem, Order
+from shop.models import Product
+from .feed import events_after
+from .models import OutboxCursor, OutboxEvent
+from .relay import relay, relay_batch
+
+
+def emit(count=1, topic=OutboxEvent.Topic.ORDER_CREATED):
+    return [
+        OutboxEvent.emit(topic, 'order', number, {'order_id': number})
+        for number in range(count)
+    ]
+
+
+def age(events, seconds):
+    OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(
+        created_at=timezone.now() - timedelta(seconds=seconds)
+    )
+
+
+def commit_late(event):
+    """Delete `event` as if its transaction had not committed, returns a function that commits it"""
+    event_id = event.id
+    event.delete()
+    return lambda: OutboxEvent.objects.create(
+        id=event_id, topic=event.topic, aggregate_type='order', aggregate_id=1, payload={}
+    )
+
+
+def ids(events):
+    return [event['id'] for event in events]
+
+
+class ListSink:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def deliver(self, events):
+        if self.fail:
+            raise ConnectionError('sink is down')
+        self.batches.append(ids(events))
+
+
+@override_settings(OUTBOX_VISIBILITY_DELAY=0, OUTBOX_GAP_TIMEOUT=300)
+class EventFeedTests(TestCase):
+    def test_reads_stop_below_an_id_that_is_not_committed_yet(self):
+        first, pending, last = emit(3)
+        # A transaction that took its id early and has not committed
+        commit = commit_late(pending)
+
+        self.assertEqual(ids(events_after(0)), [first.id])
+        self.assertEqual(events_after(first.id), [])
+
+        # It commits later and the reader carries on from where it stopped
+        commit()
+        self.assertEqual(ids(events_after(first.id)), [first.id + 1, last.id])
+
+    def test_old_gaps_are_rollbacks_and_are_skipped(self):
+        events = emit(4)
+        events[1].delete()
+        events[2].delete()
+        age(events, 301)
+
+        self.assertEqual(ids(events_after(0)), [events[0].id, events[3].id])
+
+    def test_gap_before_an_other_topic_still_holds_a_topic_read(self):
+        created, pending, repaid, confirmed = emit(4)
+        commit_late(pending)
+        OutboxEvent.objects.filter(id=repaid.id).update(topic=OutboxEvent.Topic.CREDIT_REPAID)
+
+        self.assertEqual(ids(events_after(0, topics=[OutboxEvent.Topic.ORDER_CREATED])), [created.id])
+        age([created, repaid, confirmed], 301)
+        self.assertEqual(
+            ids(events_after(0, topics=[OutboxEvent.Topic.ORDER_CREATED])),
+            [created.id, confirmed.id]
+        )
+
+    @override_settings(OUTBOX_VISIBILITY_DELAY=2)
+    def test_events_younger_than_the_visibility_delay_are_held_back(self):
+        old, young = emit(2)
+        age([old], 5)
+
+        self.assertEqual(ids(events_after(0)), [old.id])
+
+    def test_endpoint_is_for_admins_and_validates_its_parameters(self):
+        emit(3)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('buyer', 'buyer@example.com', role='BUYER'))
+        self.assertEqual(client.get('/api/events/').status_code, 403)
+
+        client.force_authenticate(User.objects.create_user('admin', 'admin@example.com', role='ADMIN'))
+        for query in ('after=x', 'after=-1', 'limit=0', 'topic=order.eaten'):
+            with self.subTest(query=query):
+                self.assertEqual(client.get(f'/api/events/?{query}').status_code, 400)
+
+        page = client.get('/api/events/?limit=2').json()
+        self.assertEqual(len(page['events']), 2)
+        self.assertTrue(page['has_more'])
+        page = client.get(f"/api/events/?after={page['next']}&limit=2").json()
+        self.assertEqual(len(page['events']), 1)
+        self.assertFalse(page['has_more'])
+
+
+@override_settings(OUTBOX_VISIBILITY_DELAY=0, OUTBOX_GAP_TIMEOUT=300)
+class RelayTests(TestCase):
+    def test_cursor_moves_only_after_the_sink_accepts_the_batch(self):
+        events = emit(3)
+
+        with self.assertRaises(ConnectionError):
+            relay_batch(ListSink(fail=True), 'warehouse', batch_size=2)
+        self.assertEqual(OutboxCursor.objects.get(name='warehouse').last_event_id, 0)
+
+        sink = ListSink()
+        self.assertEqual(relay(sink, 'warehouse', batch_size=2), 3)
+        self.assertEqual(sink.batches, [[events[0].id, events[1].id], [events[2].id]])
+        self.assertEqual(OutboxCursor.objects.get(name='warehouse').last_event_id, events[2].id)
+        self.assertEqual(relay(sink, 'warehouse'), 0)
+
+    def test_cursor_waits_at_a_gap_until_it_commits(self):
+        first, pending, last = emit(3)
+        commit = commit_late(pending)
+        sink = ListSink()
+
+        relay(sink, 'warehouse')
+        self.assertEqual(OutboxCursor.objects.get(name='warehouse').last_event_id, first.id)
+
+        commit()
+        relay(sink, 'warehouse')
+        self.assertEqual(sink.batches, [[first.id], [first.id + 1, last.id]])
+
+    def test_a_cursor_never_moves_backwards(self):
+        first, second = emit(2)
+        OutboxCursor.objects.create(name='warehouse', last_event_id=second.id)
+
+        # A second relay on the same cursor read its batch before the first
+        # one moved the cursor, and finishes last
+        with patch('outbox.relay.events_after', return_value=events_after(0, 1)):
+            self.assertEqual(relay_batch(ListSink(), 'warehouse'), 1)
+        self.assertEqual(OutboxCursor.objects.get(name='warehouse').last_event_id, second.id)
+
+
+@override_settings(OUTBOX_VISIBILITY_DELAY=0, OUTBOX_GAP_TIMEOUT=300)
+class OrderEventTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', 'seller@example.com', role='SELLER')
+        self.product = Product.objects.create(
+            seller=self.seller, name='Jollof Rice', description='Test product', price=100,
+            stock_quantity=2, main_image='https://example.com/product.png'
+        )
+        self.buyer = User.objects.create_user('buyer', 'buyer@example.com', role='BUYER')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def checkout(self, quantity):
+        CartItem.objects.create(cart=Cart.objects.get(user=self.buyer), product=self.product, quantity=quantity)
+        return self.client.post('/api/orders/checkout/')
+
+    def test_order_changes_emit_events_with_their_transaction(self):
+        # Out of stock: the checkout rolls back and emits nothing
+        self.assertEqual(self.checkout(3).status_code, 400)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+        CartItem.objects.all().delete()
+        self.assertEqual(self.checkout(2).status_code, 201)
+        order = Order.objects.get()
+        order.confirm_order(self.seller)
+        order.cancel_order('Closed early')
+
+        events = events_after(0)
+        self.assertEqual(
+            [event['topic'] for event in events],
+            [OutboxEvent.Topic.ORDER_CREATED, OutboxEvent.Topic.ORDER_CONFIRMED, OutboxEvent.Topic.ORDER_CANCELLED]
+        )
+        self.assertEqual({event['aggregate_id'] for event in events}, {order.id})
+        self.assertEqual(events[0]['payload']['buyer_id'], self.buyer.id)
+        self.assertEqual(events[2]['payload']['reason'], 'Closed early')
+
+    def test_relay_command_delivers_to_the_configured_sink(self):
+        self.checkout(1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            with override_settings(OUTBOX={'SINK': 'outbox.sinks.JSONLinesSink', 'OPTIONS': {'path': path}}):
+                call_command('relay_outbox', cursor='warehouse', stdout=StringIO())
+                call_command('relay_outbox', cursor='warehouse', stdout=StringIO())
+            with open(path, encoding='utf-8') as f:
+                delivered = [json.loads(line) for line in f]
+
+        self.assertEqual([event['topic'] for event in delivered], [OutboxEvent.Topic.ORDER_CREATED])
+        self.assertEqual(OutboxCursor.objects.get(name='warehouse').last_event_id, delivered[0]['id'])
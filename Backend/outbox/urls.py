@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'outbox'
+
+urlpatterns = [
+    path('', views.event_feed, name='event_feed'),
+]
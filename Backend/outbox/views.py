@@ -0,0 +1,55 @@
+from rest_framework import status, permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from .feed import events_after
+from .models import OutboxEvent
+
+MAX_LIMIT = 1000
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def event_feed(request):
+    """
+    Admin/integration change feed: events after ?after=<id> (default 0),
+    optionally only ?topic=a,b, at most ?limit= (default 100).
+    Pass the returned `next` as `after` to continue.
+    """
+    if not request.user.is_admin_user:
+        return Response(
+            {'error': 'Only admins can read the event feed'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    try:
+        after = int(request.query_params.get('after', 0))
+        limit = min(int(request.query_params.get('limit', 100)), MAX_LIMIT)
+    except ValueError:
+        return Response(
+            {'error': 'after and limit must be integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if after < 0 or limit < 1:
+        return Response(
+            {'error': 'after must be >= 0 and limit >= 1'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    topics = [topic for topic in request.query_params.get('topic', '').split(',') if topic]
+    unknown = set(topics) - set(OutboxEvent.Topic.values)
+    if unknown:
+        return Response(
+            {'error': f"Unknown topic: {', '.join(sorted(unknown))}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # OPTIMIZATION: Primary key (or (topic, id)) range read, no OFFSET/COUNT
+    events = events_after(after, limit, topics)
+    return Response(
+        {
+            'events': events,
+            'next': events[-1]['id'] if events else after,
+            'has_more': len(events) == limit,
+        },
+        status=status.HTTP_200_OK
+    )
@@ -31,7 +31,7 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description', 'seller__email', 'seller__first_name', 'seller__last_name']
     list_editable = ['price', 'stock_quantity', 'is_active']
     prepopulated_fields = {'slug': ('name',)}
-    readonly_fields = ['views_count', 'sales_count', 'created_at', 'updated_at', 'average_rating']
+    readonly_fields = ['views_count', 'sales_count', 'review_count', 'created_at', 'updated_at', 'average_rating']
     date_hierarchy = 'created_at'
     
     fieldsets = (
@@ -49,7 +49,7 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('is_active', 'is_featured')
         }),
         ('Statistics (Read-Only)', {
-            'fields': ('views_count', 'sales_count', 'average_rating', 'created_at', 'updated_at'),
+            'fields': ('views_count', 'sales_count', 'average_rating', 'review_count', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
@@ -0,0 +1,127 @@
+"""
+Versioned response cache for the public catalog endpoints.
+
+Cache keys embed a version counter per namespace ('products', 'categories').
+Model signals bump the counter, so invalidation is a single incr and stale
+entries are never read again; they just age out of the cache. Works with any
+Django cache backend (local memory, file, Redis, Memcached).
+"""
+import functools
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+DEFAULT_TIMEOUT = 300
+
+
+def version_key(namespace):
+    return f'catalog:version:{namespace}'
+
+
+def get_versions(namespaces):
+    keys = [version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Seed from the clock so an evicted counter never reuses an old version
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*namespaces):
+    """Invalidate every cached response in the given namespaces"""
+    for namespace in namespaces:
+        key = version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def normalized_params(request):
+    """Query string with sorted keys/values and blank values dropped"""
+    pairs = []
+    for name in sorted(request.query_params):
+        for value in sorted(request.query_params.getlist(name)):
+            if value != '':
+                pairs.append((name, value))
+    return urlencode(pairs)
+
+
+def make_key(request, name, namespaces):
+    versions = '.'.join(str(version) for version in get_versions(namespaces))
+    raw = f'{request.get_host()}|{request.path}|{normalized_params(request)}'
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'catalog:{name}:{versions}:{digest}'
+
+
+def get_or_set(name, namespaces, params, compute):
+    """Cache an arbitrary computed value under the namespaces' current versions"""
+    versions = '.'.join(str(version) for version in get_versions(namespaces))
+    digest = hashlib.md5(repr(params).encode('utf-8')).hexdigest()
+    key = f'catalog:{name}:{versions}:{digest}'
+    value = cache.get(key)
+    if value is not None:
+        record('hits')
+        return value
+    record('misses')
+    value = compute()
+    cache.set(key, value, getattr(settings, 'CATALOG_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+    return value
+
+
+def record(outcome):
+    key = f'catalog:stats:{outcome}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def stats():
+    hits = cache.get('catalog:stats:hits', 0)
+    misses = cache.get('catalog:stats:misses', 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0,
+        'versions': dict(zip(('categories', 'products'), get_versions(('categories', 'products')))),
+    }
+
+
+def cache_response(*namespaces, on_hit=None, skip=None):
+    """
+    Cache successful GET responses of a function view.
+    Put it below @api_view/@permission_classes so permissions run first.
+    `on_hit(data)` runs for every cache hit (e.g. to record a product view).
+    Requests for which `skip(request)` is true are never cached.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or (skip is not None and skip(request)):
+                return view(request, *args, **kwargs)
+
+            key = make_key(request, view.__name__, namespaces)
+            data = cache.get(key)
+            if data is not None:
+                record('hits')
+                if on_hit is not None:
+                    on_hit(data)
+                return Response(data)
+
+            record('misses')
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                timeout = getattr(settings, 'CATALOG_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+                cache.set(key, response.data, timeout)
+            return response
+        return wrapper
+    return decorator
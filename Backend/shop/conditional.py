@@ -0,0 +1,73 @@
+"""
+Conditional GET (ETag / Last-Modified) for read endpoints.
+
+A cheap "stamp" query decides whether the client's copy is still current. If
+it is, a 304 is returned before the full query and the serializers run.
+"""
+import functools
+import hashlib
+
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return quote_etag(digest)
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        # If-None-Match uses weak comparison and takes precedence over dates
+        etags = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(if_none_match)]
+        return '*' in etags or etag in etags
+
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    if if_modified_since is not None and last_modified is not None:
+        return int(last_modified.timestamp()) <= if_modified_since
+    return False
+
+
+def conditional(stamp, cache_control='no-cache', on_not_modified=None):
+    """
+    Add ETag/Last-Modified to a function view and answer 304 when they match.
+
+    `stamp(request, *args, **kwargs)` returns a dict with `parts` (values the
+    ETag is derived from) and `last_modified` (datetime or None), or None when
+    the resource is missing so the view can answer as usual. A `cache_control`
+    entry overrides the decorator's value for that response.
+    `on_not_modified(stamp)` runs for every 304.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            validators = stamp(request, *args, **kwargs)
+            if validators is None:
+                return view(request, *args, **kwargs)
+
+            etag = make_etag(*validators['parts'])
+            last_modified = validators.get('last_modified')
+
+            if is_not_modified(request, etag, last_modified):
+                if on_not_modified is not None:
+                    on_not_modified(validators)
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+            header = validators.get('cache_control', cache_control)
+            if header:
+                response['Cache-Control'] = header
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,316 @@
+"""
+Write-behind buffer for Product.views_count.
+
+product_detail records a view in the buffer instead of writing the product row.
+flush() later applies the buffered counts with one
+UPDATE ... SET views_count = views_count + n per batch of products sharing n.
+
+Backends (settings.VIEW_COUNTER['BACKEND']):
+- LocalViewCounter: sharded in-process counters, flushed by a timer thread and
+  at exit. No shared infrastructure, each worker flushes its own buffer; views
+  recorded since the last flush are lost if the worker is killed (SIGKILL).
+  The flush_view_counts command cannot reach these buffers and refuses to run.
+- CacheViewCounter: counters in a shared Django cache (Redis/Memcached), so the
+  flush_view_counts command can drain views recorded by every worker. With any
+  other cache get_view_counter() uses LocalViewCounter instead: a local memory
+  cache is private to the process, and the file and database caches do not
+  increment atomically.
+"""
+import atexit
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+DEFAULT_BACKEND = 'shop.counters.LocalViewCounter'
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+BATCH_SIZE = 500
+
+
+def apply_view_counts(pending):
+    """Add buffered counts to views_count. Returns number of UPDATE statements."""
+    by_increment = defaultdict(list)
+    for product_id, count in pending.items():
+        if count > 0:
+            by_increment[count].append(product_id)
+
+    statements = 0
+    with transaction.atomic():
+        for count, product_ids in by_increment.items():
+            for start in range(0, len(product_ids), BATCH_SIZE):
+                Product.objects.filter(pk__in=product_ids[start:start + BATCH_SIZE]).update(
+                    views_count=F('views_count') + count
+                )
+                statements += 1
+    return statements
+
+
+class LocalViewCounter:
+    """Sharded in-process counters with a periodic background flush"""
+    # Buffers live in each process, another process cannot flush them
+    shared = False
+
+    def __init__(self, shards=16, flush_interval=30):
+        self.shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.flush_interval = flush_interval
+        self.oldest_pending = None
+        self.last_flush_at = None
+        self._timer = None
+        self._timer_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def record(self, product_id):
+        counts, lock = self.shards[product_id % len(self.shards)]
+        with lock:
+            counts[product_id] = counts.get(product_id, 0) + 1
+        if self.oldest_pending is None:
+            self.oldest_pending = time.time()
+        self._schedule_flush()
+
+    def drain(self):
+        """Take every buffered count out of the shards"""
+        pending = defaultdict(int)
+        self.oldest_pending = None
+        for counts, lock in self.shards:
+            with lock:
+                items = list(counts.items())
+                counts.clear()
+            for product_id, count in items:
+                pending[product_id] += count
+        return dict(pending)
+
+    def restore(self, pending):
+        """Put counts back after a failed flush"""
+        for product_id, count in pending.items():
+            counts, lock = self.shards[product_id % len(self.shards)]
+            with lock:
+                counts[product_id] = counts.get(product_id, 0) + count
+        if pending and self.oldest_pending is None:
+            self.oldest_pending = time.time()
+
+    def pending(self):
+        totals = {}
+        for counts, lock in self.shards:
+            with lock:
+                totals.update(counts)
+        return totals
+
+    def flush(self, scan=False):
+        # scan only matters for shared backends, this buffer knows all its ids
+        pending = self.drain()
+        if not pending:
+            return {'products': 0, 'views': 0}
+        try:
+            apply_view_counts(pending)
+        except Exception:
+            self.restore(pending)
+            raise
+        self.last_flush_at = time.time()
+        return {'products': len(pending), 'views': sum(pending.values())}
+
+    def stats(self):
+        pending = self.pending()
+        return {
+            'backend': type(self).__name__,
+            'pending_products': len(pending),
+            'pending_views': sum(pending.values()),
+            'lag_seconds': round(time.time() - self.oldest_pending, 3) if self.oldest_pending else 0,
+            'last_flush_at': self.last_flush_at,
+        }
+
+    def _schedule_flush(self):
+        if self._timer is not None or not self.flush_interval:
+            return
+        with self._timer_lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _timed_flush(self):
+        try:
+            self.flush()
+        finally:
+            self._timer = None
+            # The timer thread owns its own DB connection
+            connection.close()
+            if self.pending():
+                self._schedule_flush()
+
+
+class CacheViewCounter:
+    """
+    Counters kept in a shared cache.
+
+    Each product's count lives under its own key and is drained with decr(), so
+    views recorded during a flush are never lost. Products are registered in a
+    sharded, append-only index the first time their count leaves zero: incr()
+    hands out the next slot of the shard, so concurrent registrations never
+    overwrite each other, and a flush only moves the shard's read cursor past
+    the slots it has read. `flush_view_counts --scan` sweeps every product id
+    as well, for registrations lost with an evicted key. The cursors only move
+    once the counts are written, so a failed flush reads the same slots again.
+    Needs a backend with atomic incr/decr (Redis, Memcached, local memory).
+    """
+
+    def __init__(self, alias='default', shards=64, flush_interval=None):
+        self.alias = alias
+        self.shards = shards
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, product_id):
+        return f'views:pending:{product_id}'
+
+    @property
+    def shared(self):
+        # Only these are shared between processes and increment atomically
+        return isinstance(self.cache, (RedisCache, BaseMemcachedCache))
+
+    def slot_count_key(self, shard):
+        return f'views:dirty:{shard}:slots'
+
+    def cursor_key(self, shard):
+        return f'views:dirty:{shard}:read'
+
+    def slot_key(self, shard, slot):
+        return f'views:dirty:{shard}:{slot}'
+
+    def record(self, product_id):
+        cache = self.cache
+        key = self.key(product_id)
+        cache.add(key, 0, timeout=None)
+        if cache.incr(key) == 1:
+            self._register(product_id)
+        cache.add('views:oldest_pending', time.time(), timeout=None)
+
+    def _register(self, product_id):
+        cache = self.cache
+        shard = product_id % self.shards
+        cache.add(self.slot_count_key(shard), 0, timeout=None)
+        slot = cache.incr(self.slot_count_key(shard))
+        cache.set(self.slot_key(shard, slot), product_id, timeout=None)
+
+    def unread_slots(self):
+        """
+        {shard: (slots handed out since the read cursor, slot found missing at
+        the last flush)}
+        """
+        keys = []
+        for shard in range(self.shards):
+            keys += [self.slot_count_key(shard), self.cursor_key(shard)]
+        values = self.cache.get_many(keys)
+        slots = {}
+        for shard in range(self.shards):
+            last = values.get(self.slot_count_key(shard), 0)
+            read, gap = values.get(self.cursor_key(shard), (0, None))
+            if last > read:
+                slots[shard] = (range(read + 1, last + 1), gap)
+        return slots
+
+    def dirty_slots(self):
+        """Registered product ids, and the read cursors to store once they are flushed"""
+        cache = self.cache
+        slots = self.unread_slots()
+        values = cache.get_many([
+            self.slot_key(shard, slot) for shard, (numbers, _) in slots.items() for slot in numbers
+        ])
+        product_ids, cursors = set(), {}
+        for shard, (numbers, gap) in slots.items():
+            read = numbers.start - 1
+            for slot in numbers:
+                product_id = values.get(self.slot_key(shard, slot))
+                if product_id is None and slot != gap:
+                    # Handed out but not written yet: read it next time. If it is
+                    # still missing then, its writer died and the slot is skipped
+                    gap = slot
+                    break
+                if product_id is not None:
+                    product_ids.add(product_id)
+                read = slot
+            cursors[shard] = (numbers.start, read, gap)
+        return product_ids, cursors
+
+    def dirty_ids(self):
+        return self.dirty_slots()[0]
+
+    def consume(self, cursors):
+        """Move the read cursors past slots whose counts are flushed"""
+        cache = self.cache
+        for shard, (start, read, gap) in cursors.items():
+            cache.set(self.cursor_key(shard), (read, gap), timeout=None)
+            cache.delete_many([self.slot_key(shard, slot) for slot in range(start, read + 1)])
+
+    def pending(self, product_ids=None):
+        if product_ids is None:
+            product_ids = self.dirty_ids()
+        keys = {self.key(product_id): product_id for product_id in product_ids}
+        values = self.cache.get_many(list(keys))
+        return {keys[key]: count for key, count in values.items() if count}
+
+    def flush(self, scan=False):
+        cache = self.cache
+        product_ids, cursors = self.dirty_slots()
+
+        if scan:
+            product_ids |= set(Product.objects.values_list('id', flat=True).iterator())
+
+        pending = {}
+        product_ids = list(product_ids)
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            pending.update(self.pending(product_ids[start:start + BATCH_SIZE]))
+
+        apply_view_counts(pending)
+        self.consume(cursors)
+        cache.delete('views:oldest_pending')
+        for product_id, count in pending.items():
+            # Views recorded since we read the count stay buffered
+            if cache.decr(self.key(product_id), count) > 0:
+                self._register(product_id)
+                cache.add('views:oldest_pending', time.time(), timeout=None)
+
+        cache.set('views:last_flush_at', time.time(), timeout=None)
+        return {'products': len(pending), 'views': sum(pending.values())}
+
+    def stats(self):
+        pending = self.pending()
+        oldest = self.cache.get('views:oldest_pending')
+        return {
+            'backend': type(self).__name__,
+            'pending_products': len(pending),
+            'pending_views': sum(pending.values()),
+            'lag_seconds': round(time.time() - oldest, 3) if oldest else 0,
+            'last_flush_at': self.cache.get('views:last_flush_at'),
+        }
+
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_view_counter():
+    """Process-wide view counter configured by settings.VIEW_COUNTER"""
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                config = getattr(settings, 'VIEW_COUNTER', {})
+                backend = import_string(config.get('BACKEND', DEFAULT_BACKEND))
+                options = config.get('OPTIONS', {})
+                counter = backend(**options)
+                if isinstance(counter, CacheViewCounter) and not counter.shared:
+                    counter = LocalViewCounter(flush_interval=options.get('flush_interval', 30))
+                _counter = counter
+    return _counter
@@ -0,0 +1,91 @@
+"""
+Facet counts for product_list (?facets=category,price,in_stock).
+
+All requested facets come from one GROUP BY category query with conditional
+aggregates for the price buckets and stock, instead of one COUNT per category
+and per bucket. Results are cached per normalized filter set.
+"""
+from django.db.models import Count, Q
+
+from . import caching as catalog_cache
+
+FACETS = ('category', 'price', 'in_stock')
+
+# (key, min inclusive, max exclusive)
+PRICE_BUCKETS = (
+    ('0-1000', None, 1000),
+    ('1000-5000', 1000, 5000),
+    ('5000-20000', 5000, 20000),
+    ('20000-50000', 20000, 50000),
+    ('50000+', 50000, None),
+)
+
+# Params that change the page but not the filtered set
+NON_FILTER_PARAMS = {'page', 'page_size', 'ordering', 'pagination', 'cursor', 'seed', 'facets'}
+
+
+def requested_facets(request):
+    value = request.query_params.get('facets', '')
+    if value in ('true', 'all'):
+        return list(FACETS)
+    return [name for name in FACETS if name in value.split(',')]
+
+
+def bucket_filter(low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(price__gte=low)
+    if high is not None:
+        condition &= Q(price__lt=high)
+    return condition
+
+
+def compute_facets(queryset, names):
+    """Facet counts for a filtered Product queryset in a single query"""
+    aggregates = {'total': Count('id')}
+    if 'in_stock' in names:
+        aggregates['in_stock'] = Count('id', filter=Q(stock_quantity__gt=0))
+    if 'price' in names:
+        for index, (key, low, high) in enumerate(PRICE_BUCKETS):
+            aggregates[f'price_{index}'] = Count('id', filter=bucket_filter(low, high))
+
+    rows = list(
+        queryset.order_by().values('category_id', 'category__name', 'category__slug')
+        .annotate(**aggregates)
+    )
+
+    facets = {}
+    if 'category' in names:
+        facets['category'] = sorted(
+            (
+                {'id': row['category_id'], 'name': row['category__name'],
+                 'slug': row['category__slug'], 'count': row['total']}
+                for row in rows if row['category_id'] is not None
+            ),
+            key=lambda item: (-item['count'], item['name'])
+        )
+    if 'price' in names:
+        facets['price'] = [
+            {'range': key, 'min': low, 'max': high,
+             'count': sum(row[f'price_{index}'] for row in rows)}
+            for index, (key, low, high) in enumerate(PRICE_BUCKETS)
+        ]
+    if 'in_stock' in names:
+        in_stock = sum(row['in_stock'] for row in rows)
+        facets['in_stock'] = {
+            'in_stock': in_stock,
+            'out_of_stock': sum(row['total'] for row in rows) - in_stock,
+        }
+    return facets
+
+
+def get_facets(request, queryset, names):
+    """Cached facet counts for the request's filter params"""
+    filters = [
+        (name, sorted(value for value in request.query_params.getlist(name) if value))
+        for name in sorted(request.query_params) if name not in NON_FILTER_PARAMS
+    ]
+    return catalog_cache.get_or_set(
+        'product_facets', ('products', 'categories'), [filters, sorted(names)],
+        lambda: compute_facets(queryset, names)
+    )
@@ -0,0 +1,139 @@
+"""
+Random product feed.
+
+Every product carries an indexed `random_key` in [0, 1). A feed is a walk over
+(random_key, id) starting at a point derived from the client's seed and
+wrapping around once, so each page is an index range scan of page-size rows
+instead of ORDER BY RANDOM() over the whole catalog. Pages are stable per seed
+and never repeat within a walk. `manage.py reshuffle_random_feed` redraws the
+keys periodically so the global order changes over time.
+"""
+import base64
+import hashlib
+import json
+import random
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.crypto import get_random_string
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Uniform [0, 1) per row, evaluated by the database
+RANDOM_SQL = {
+    'sqlite': '(random() / 18446744073709551616.0 + 0.5)',
+    'postgresql': 'random()',
+}
+
+
+def reshuffle(conn=None):
+    """Redraw every product's random_key in a single UPDATE"""
+    conn = conn or connection
+    expression = RANDOM_SQL.get(conn.vendor)
+    if expression is None:
+        from .models import Product
+        products = list(Product.objects.only('id'))
+        for product in products:
+            product.random_key = random.random()
+        Product.objects.bulk_update(products, ['random_key'], batch_size=1000)
+        return len(products)
+    with conn.cursor() as cursor:
+        cursor.execute(f"UPDATE shop_product SET random_key = {expression}")
+        return cursor.rowcount
+
+
+def seed_position(seed):
+    """Map a seed string to a stable start point in [0, 1)"""
+    digest = hashlib.sha1(seed.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+class RandomFeedPagination(BasePagination):
+    """
+    Seeded random feed over the (random_key, id) index.
+    Send ?seed= to keep the order stable across a session, the response echoes
+    the seed used. Follow `next` for further pages.
+    """
+    seed_query_param = 'seed'
+    cursor_query_param = 'cursor'
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.seed = request.query_params.get(self.seed_query_param) or get_random_string(12)
+        start = seed_position(self.seed)
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        queryset = queryset.order_by('random_key', 'id')
+        rows = []
+
+        if not cursor or not cursor['w']:
+            # First lap: from the seed's start point up to 1.0
+            lap = queryset.filter(random_key__gte=start)
+            if cursor:
+                lap = lap.filter(self.after(cursor))
+            rows = list(lap[:size + 1])
+            cursor = None
+
+        if len(rows) <= size:
+            # Second lap: from 0.0 back up to the start point
+            lap = queryset.filter(random_key__lt=start)
+            if cursor:
+                lap = lap.filter(self.after(cursor))
+            rows += list(lap[:size + 1 - len(rows)])
+
+        self.start = start
+        self.has_next = len(rows) > size
+        self.page = rows[:size]
+        return self.page
+
+    @staticmethod
+    def after(cursor):
+        return Q(random_key__gt=cursor['k']) | Q(random_key=cursor['k'], id__gt=cursor['id'])
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return {'k': float(cursor['k']), 'id': int(cursor['id']), 'w': bool(cursor['w'])}
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        token = json.dumps(
+            {'k': last.random_key, 'id': last.pk, 'w': last.random_key < self.start},
+            separators=(',', ':')
+        )
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.seed_query_param, self.seed)
+        return replace_query_param(
+            url, self.cursor_query_param, base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'seed': self.seed,
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data
+        })
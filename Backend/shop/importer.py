@@ -0,0 +1,195 @@
+"""
+Streaming bulk product import (CSV or JSONL).
+
+Rows are read lazily and handled in batches: each batch is validated with the
+ProductCreateUpdateSerializer rules (categories come from one preloaded map),
+its slugs are resolved with a single query and the valid rows are written with
+one bulk_create. Invalid rows are reported with their row number and skipped.
+A batch that loses a slug to a concurrent write is retried with fresh slugs.
+"""
+import csv
+import json
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+from rest_framework import serializers
+from rest_framework.serializers import as_serializer_error
+
+from . import caching as catalog_cache
+from . import search
+from .models import Category, Product
+from .serializers import ProductCreateUpdateSerializer
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+# Attempts at inserting a batch when another writer takes one of its slugs first
+SLUG_ATTEMPTS = 3
+
+
+class ImportCategoryField(serializers.Field):
+    """Category by id, slug or name, looked up in the importer's preloaded map"""
+    default_error_messages = {
+        'does_not_exist': 'Category "{value}" does not exist.',
+    }
+
+    def to_internal_value(self, data):
+        categories = self.context['categories']
+        key = str(data).strip()
+        category = categories.get(key) or categories.get(key.lower())
+        if category is None:
+            self.fail('does_not_exist', value=data)
+        return category
+
+    def to_representation(self, value):
+        return value.pk
+
+
+class ProductImportSerializer(ProductCreateUpdateSerializer):
+    """ProductCreateUpdateSerializer rules without a query per row for the category"""
+    category = ImportCategoryField(required=False, allow_null=True)
+
+
+def iter_rows(stream, file_format):
+    """Yield (row number, dict) from a text stream, row numbers start at 1"""
+    if file_format == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, clean_csv_row(row)
+    elif file_format == 'jsonl':
+        number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                yield number, {'__error__': f'Invalid JSON: {e}'}
+    else:
+        raise ValueError(f"Unsupported format '{file_format}', use one of: {', '.join(FORMATS)}")
+
+
+def clean_csv_row(row):
+    """Drop blank cells so model defaults apply, split image lists"""
+    cleaned = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+    images = cleaned.get('additional_images')
+    if images is not None:
+        if images.startswith('['):
+            try:
+                cleaned['additional_images'] = json.loads(images)
+            except ValueError:
+                pass
+        else:
+            cleaned['additional_images'] = [url.strip() for url in images.split('|') if url.strip()]
+    return cleaned
+
+
+class ProductImporter:
+    """Import products for one seller, see module docstring"""
+
+    def __init__(self, seller, batch_size=DEFAULT_BATCH_SIZE):
+        self.seller = seller
+        self.batch_size = batch_size
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.categories = self.load_categories()
+        # One serializer validates every row, like ListSerializer does, so its
+        # fields are built once instead of once per row
+        self.serializer = ProductImportSerializer(context={'categories': self.categories})
+
+    @staticmethod
+    def load_categories():
+        categories = {}
+        for category in Category.objects.all():
+            categories[str(category.pk)] = category
+            categories[category.slug] = category
+            categories[category.name.lower()] = category
+        return categories
+
+    def run(self, rows):
+        batch = []
+        for number, row in rows:
+            batch.append((number, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        if self.created:
+            catalog_cache.bump('products', 'categories')
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+    def add_error(self, number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'errors': errors})
+
+    def import_batch(self, batch):
+        valid = []
+        numbers = []
+        for number, row in batch:
+            if not isinstance(row, dict) or '__error__' in row:
+                message = row.get('__error__') if isinstance(row, dict) else 'Row must be an object'
+                self.add_error(number, {'non_field_errors': [message]})
+                continue
+            try:
+                valid.append(self.serializer.run_validation(row))
+                numbers.append(number)
+            except serializers.ValidationError as e:
+                self.add_error(number, as_serializer_error(e))
+
+        if not valid:
+            return
+
+        for _ in range(SLUG_ATTEMPTS):
+            slugs = self.resolve_slugs([data['name'] for data in valid])
+            products = [
+                Product(seller=self.seller, slug=slug, **data)
+                for data, slug in zip(valid, slugs)
+            ]
+            try:
+                with transaction.atomic():
+                    Product.objects.bulk_create(products)
+                    search.index_products([product.pk for product in products])
+            except IntegrityError:
+                # A concurrent import or create took a slug between the read and the insert
+                continue
+            self.created += len(products)
+            return
+
+        for number in numbers:
+            self.add_error(number, {'non_field_errors': ['Could not reserve a unique slug, try again']})
+
+    @staticmethod
+    def resolve_slugs(names):
+        """Unique slugs for a batch, same scheme as Product.save, in one query"""
+        bases = [slugify(name) or 'product' for name in names]
+        # base and base-* only: prefix matches on the slug index, whatever the collation
+        conditions = [Q(slug=base) | Q(slug__startswith=f'{base}-') for base in set(bases)]
+        taken = set(
+            Product.objects.filter(reduce(or_, conditions)).values_list('slug', flat=True)
+        )
+
+        counters = {}
+        slugs = []
+        for base in bases:
+            slug = base
+            counter = counters.get(base, 1)
+            while slug in taken:
+                slug = f'{base}-{counter}'
+                counter += 1
+            counters[base] = counter
+            taken.add(slug)
+            slugs.append(slug)
+        return slugs
@@ -0,0 +1,44 @@
+"""Synthetic catalog for the benchmark commands (run inside a rolled-back transaction)"""
+import random
+import time
+
+from accounts.models import User
+from shop import search
+from shop.models import Category, Product
+
+WORDS = [
+    'rice', 'beans', 'garri', 'yam', 'plantain', 'palm', 'oil', 'groundnut', 'maize',
+    'millet', 'sorghum', 'cassava', 'flour', 'semovita', 'pepper', 'tomato', 'onion',
+    'egusi', 'ogbono', 'crayfish', 'stockfish', 'honey', 'sugar', 'salt', 'spaghetti',
+    'noodles', 'oats', 'milk', 'butter', 'bread', 'local', 'foreign', 'parboiled',
+    'premium', 'organic', 'fresh', 'dried', 'smoked', 'bag', 'carton', 'bottle',
+]
+
+
+def seed_products(total, stdout, categories=12):
+    start = time.perf_counter()
+    seller = User.objects.create_user(
+        'benchmark-seller', 'benchmark-seller@example.com', role='SELLER'
+    )
+    categories = Category.objects.bulk_create([
+        Category(name=f'Benchmark {word}', slug=f'benchmark-{word}') for word in WORDS[:categories]
+    ])
+    batch = []
+    for i in range(total):
+        batch.append(Product(
+            seller=seller,
+            category=random.choice(categories),
+            name=' '.join(random.sample(WORDS, 3)).title(),
+            slug=f'benchmark-{i}',
+            description=' '.join(random.choices(WORDS, k=20)),
+            price=random.randint(500, 60000),
+            stock_quantity=random.randint(0, 100),
+            main_image='https://example.com/benchmark.png',
+        ))
+        if len(batch) == 5000:
+            Product.objects.bulk_create(batch)
+            batch = []
+    Product.objects.bulk_create(batch)
+    search.rebuild_index()
+    stdout.write(f'Seeded {total} products in {time.perf_counter() - start:.1f}s')
+    return seller, categories
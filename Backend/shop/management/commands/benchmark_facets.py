@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from shop.facets import PRICE_BUCKETS, bucket_filter, compute_facets, FACETS
+from shop.models import Category, Product
+from ._seed import seed_products
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds synthetic products inside a rolled-back transaction and compares '
+        'single-query facet counts with per-category count() queries'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--categories', type=int, default=12)
+        parser.add_argument('--runs', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed_products(options['products'], self.stdout, categories=options['categories'])
+            products = Product.objects.filter(is_active=True)
+            aggregated = self.measure(options['runs'], lambda: compute_facets(products, FACETS))
+            per_count = self.measure(options['runs'], lambda: self.count_each(products))
+            transaction.set_rollback(True)
+
+        self.report('grouped aggregate', *aggregated)
+        self.report('per-category count()', *per_count)
+
+    def count_each(self, products):
+        """What CategorySerializer.product_count plus per-bucket counts would cost"""
+        facets = {
+            'category': {
+                category.slug: category.products.filter(is_active=True).count()
+                for category in Category.objects.filter(is_active=True)
+            },
+            'price': {key: products.filter(bucket_filter(low, high)).count() for key, low, high in PRICE_BUCKETS},
+            'in_stock': products.filter(stock_quantity__gt=0).count(),
+        }
+        return facets
+
+    def measure(self, runs, compute):
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            compute()
+        for _ in range(runs):
+            start = time.perf_counter()
+            compute()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings), len(queries)
+
+    def report(self, label, timings, query_count):
+        p50 = timings[len(timings) // 2]
+        p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+        self.stdout.write(
+            self.style.SUCCESS(f'{label}: {query_count} queries, p50 {p50:.1f}ms, p95 {p95:.1f}ms')
+        )
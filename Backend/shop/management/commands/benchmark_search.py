@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from shop import search
+from shop.models import Product
+from ._seed import seed_products
+
+QUERIES = ['rice', 'palm oil', 'fre', 'smoked fish', 'organic beans', 'premium parb', 'yam flour']
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds synthetic products inside a rolled-back transaction and reports '
+        'p50/p95 search latency for the full-text index vs. icontains'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--runs', type=int, default=50, help='Runs per query')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed_products(options['products'], self.stdout)
+            index_timings = self.measure(options['runs'], self.index_page)
+            scan_timings = self.measure(options['runs'], self.scan_page)
+            transaction.set_rollback(True)
+
+        self.report('full-text index', index_timings)
+        self.report('icontains scan', scan_timings)
+
+    def index_page(self, text):
+        products = search.search_products(Product.objects.filter(is_active=True), text, rank=True)
+        list(products.order_by('-search_rank', '-created_at')[:30])
+        products.count()
+
+    def scan_page(self, text):
+        products = Product.objects.filter(is_active=True).filter(
+            Q(name__icontains=text) |
+            Q(description__icontains=text) |
+            Q(category__name__icontains=text)
+        )
+        list(products.order_by('-created_at')[:30])
+        products.count()
+
+    def measure(self, runs, page):
+        timings = []
+        for _ in range(runs):
+            for text in QUERIES:
+                start = time.perf_counter()
+                page(text)
+                timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)
+
+    def report(self, label, timings):
+        p50 = timings[len(timings) // 2]
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            self.style.SUCCESS(f'{label}: p50 {p50:.1f}ms, p95 {p95:.1f}ms ({len(timings)} requests)')
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from shop.counters import get_view_counter
+
+class Command(BaseCommand):
+    help = 'Applies buffered product views to Product.views_count'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scan',
+            action='store_true',
+            help='Also check every product id, not just those registered as pending'
+        )
+
+    def handle(self, *args, **options):
+        counter = get_view_counter()
+        if not counter.shared:
+            raise CommandError(
+                f"With {type(counter).__name__} and this cache, views are buffered inside each "
+                "web process, where this command cannot reach them; those processes flush on "
+                "their own. Use VIEW_COUNTER_BACKEND=shop.counters.CacheViewCounter with a "
+                "shared cache (CACHE_URL=redis://...) to flush from here."
+            )
+        lag = counter.stats()['lag_seconds']
+        result = counter.flush(scan=options['scan'])
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Flushed {result['views']} view(s) across {result['products']} product(s) "
+                f"(oldest pending view was {lag:.1f}s old)"
+            )
+        )
@@ -0,0 +1,34 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from shop.importer import DEFAULT_BATCH_SIZE, FORMATS, ProductImporter, iter_rows
+
+class Command(BaseCommand):
+    help = 'Bulk-imports products for a seller from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file')
+        parser.add_argument('--seller', required=True, help='Seller email')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            seller = get_user_model().objects.get(email=options['seller'], role='SELLER')
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No seller with email {options['seller']}")
+
+        file_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(f"Unsupported format, use --format with one of: {', '.join(FORMATS)}")
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            importer = ProductImporter(seller, batch_size=options['batch_size'])
+            report = importer.run(iter_rows(stream, file_format))
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {report['created']} product(s), {report['failed']} row(s) failed")
+        )
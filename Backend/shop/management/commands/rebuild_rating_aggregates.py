@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from shop.models import Product, ProductReview
+
+class Command(BaseCommand):
+    help = 'Recomputes Product.rating_sum and Product.review_count from reviews'
+
+    def handle(self, *args, **kwargs):
+        reviews = ProductReview.objects.filter(product=OuterRef('pk')).order_by().values('product')
+        
+        # One UPDATE with correlated subqueries instead of a loop over products
+        count = Product.objects.update(
+            rating_sum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+            review_count=Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), 0),
+        )
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt rating aggregates for {count} product(s)')
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from shop import caching as catalog_cache
+from shop import search
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product full-text search index from the product table'
+
+    def handle(self, *args, **kwargs):
+        if not search.is_supported():
+            self.stdout.write(
+                self.style.WARNING('This database has no full-text index, search uses icontains')
+            )
+            return
+        
+        count = search.rebuild_index()
+        # Cached search responses were computed from the old index
+        catalog_cache.bump('products')
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {count} product(s)')
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from shop import caching as catalog_cache
+from shop import feed
+
+class Command(BaseCommand):
+    help = 'Redraws Product.random_key so the random homepage feed gets a new order'
+
+    def handle(self, *args, **kwargs):
+        count = feed.reshuffle()
+        # Cached seeded pages follow the old keys
+        catalog_cache.bump('products')
+        self.stdout.write(
+            self.style.SUCCESS(f'Reshuffled {count} product(s)')
+        )
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:32
+
+import shop.models
+from django.conf import settings
+from django.db import migrations, models
+
+from shop import feed
+
+
+def draw_random_keys(apps, schema_editor):
+    # AddField evaluates the default once, give existing rows their own keys
+    feed.reshuffle(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='random_key',
+            field=models.FloatField(default=shop.models.random_feed_key, editable=False),
+        ),
+        migrations.RunPython(draw_random_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'random_key', 'id'], name='shop_produc_is_acti_868712_idx'),
+        ),
+    ]
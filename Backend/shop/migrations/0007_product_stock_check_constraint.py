@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def clamp_negative_stock(apps, schema_editor):
+    # Rows oversold before the constraint existed would make AddConstraint fail
+    Product = apps.get_model('shop', 'Product')
+    Product.objects.filter(stock_quantity__lt=0).update(stock_quantity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0006_product_updated_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clamp_negative_stock, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(condition=models.Q(('stock_quantity__gte', 0)), name='product_stock_quantity_non_negative'),
+        ),
+    ]
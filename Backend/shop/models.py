@@ -1,8 +1,18 @@
-from django.db import models
+import random
+
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from django.utils.text import slugify
 from accounts.models import User
 
 
+def random_feed_key():
+    """Initial position of a product in the random feed"""
+    return random.random()
+
+
 class Category(models.Model):
     """Product Category - NO IMAGE FIELD"""
     name = models.CharField(max_length=255, unique=True)
@@ -76,6 +86,13 @@ class Product(models.Model):
     views_count = models.IntegerField(default=0)
     sales_count = models.IntegerField(default=0)
     
+    # Position in the random feed (redrawn by reshuffle_random_feed, see shop/feed.py)
+    random_key = models.FloatField(default=random_feed_key, editable=False)
+    
+    # Rating aggregates (maintained by shop.signals on review changes)
+    rating_sum = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -84,6 +101,25 @@ class Product(models.Model):
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination: (ordering field, id) for each allowed ordering
+            models.Index(fields=['is_active', 'created_at', 'id']),
+            models.Index(fields=['is_active', 'price', 'id']),
+            models.Index(fields=['is_active', 'sales_count', 'id']),
+            models.Index(fields=['is_active', 'views_count', 'id']),
+            models.Index(fields=['seller', 'created_at', 'id']),
+            # Random feed walks (random_key, id)
+            models.Index(fields=['is_active', 'random_key', 'id']),
+            # Catalog ETags read MAX(updated_at)
+            models.Index(fields=['updated_at']),
+        ]
+        constraints = [
+            # Last line of defence against overselling, see reduce_stock
+            models.CheckConstraint(
+                condition=models.Q(stock_quantity__gte=0),
+                name='product_stock_quantity_non_negative'
+            ),
+        ]
     
     def __str__(self):
         return self.name
@@ -109,26 +145,72 @@ class Product(models.Model):
     
     @property
     def average_rating(self):
-        """Calculate average rating from reviews"""
-        reviews = self.reviews.all()
-        if reviews.exists():
-            total = sum(review.rating for review in reviews)
-            return round(total / reviews.count(), 1)
+        """Average rating from the stored aggregates (no queries)"""
+        if self.review_count:
+            return round(self.rating_sum / self.review_count, 1)
         return 0
     
     def reduce_stock(self, quantity):
-        """Reduce stock when order is completed"""
-        if self.stock_quantity >= quantity:
-            self.stock_quantity -= quantity
-            self.sales_count += quantity
-            self.save()
+        """
+        Reserve stock with one conditional UPDATE (stock_quantity >= quantity),
+        so concurrent checkouts can never oversell. Returns False when there is
+        not enough stock left; the local stock/sales values are left untouched
+        in that case.
+        """
+        updated = Product.objects.filter(pk=self.pk, stock_quantity__gte=quantity).update(
+            stock_quantity=F('stock_quantity') - quantity,
+            sales_count=F('sales_count') + quantity,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            return False
+        self.stock_quantity -= quantity
+        self.sales_count += quantity
+        return True
+    
+    @classmethod
+    def reserve_stock(cls, quantities):
+        """
+        Reduce stock for many products with one conditional UPDATE.
+        `quantities` maps product id to quantity. Every row must still have
+        enough stock; returns False (and changes nothing once the caller rolls
+        back) when any of them falls short.
+        """
+        if not quantities:
             return True
-        return False
+        per_product = models.Case(
+            *[models.When(pk=product_id, then=models.Value(quantity)) for product_id, quantity in quantities.items()],
+            output_field=models.IntegerField()
+        )
+        updated = cls.objects.filter(pk__in=list(quantities), stock_quantity__gte=per_product).update(
+            stock_quantity=F('stock_quantity') - per_product,
+            sales_count=F('sales_count') + per_product,
+            updated_at=timezone.now()
+        )
+        return updated == len(quantities)
+    
+    @classmethod
+    def release_stock(cls, quantities):
+        """
+        Give back stock reserved by orders that will never be picked up, one
+        UPDATE for many products. `quantities` maps product id to quantity.
+        """
+        if not quantities:
+            return 0
+        per_product = models.Case(
+            *[models.When(pk=product_id, then=models.Value(quantity)) for product_id, quantity in quantities.items()],
+            output_field=models.IntegerField()
+        )
+        return cls.objects.filter(pk__in=list(quantities)).update(
+            stock_quantity=F('stock_quantity') + per_product,
+            sales_count=Greatest(F('sales_count') - per_product, models.Value(0)),
+            updated_at=timezone.now()
+        )
     
     def increment_views(self):
-        """Increment view count"""
-        self.views_count += 1
-        self.save(update_fields=['views_count'])
+        """Buffer a view, shop.counters flushes it to views_count in bulk"""
+        from .counters import get_view_counter
+        get_view_counter().record(self.pk)
 
 
 class ProductReview(models.Model):
@@ -156,4 +238,9 @@ class ProductReview(models.Model):
         unique_together = ['product', 'buyer']
     
     def __str__(self):
-        return f"{self.buyer.email} - {self.product.name} - {self.rating}★"
\ No newline at end of file
+        return f"{self.buyer.email} - {self.product.name} - {self.rating}★"
+    
+    def save(self, *args, **kwargs):
+        # Product rating aggregates are updated by signals in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
\ No newline at end of file
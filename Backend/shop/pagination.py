@@ -0,0 +1,126 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in cursor (keyset) pagination keyed on (ordering field, id).
+
+    Enabled with ?pagination=cursor, or whenever a ?cursor= is sent. Each page is
+    WHERE (field, id) < (last field, last id) ORDER BY field, id LIMIT n, so page
+    500 costs the same as page 1 and no COUNT(*) is issued. Cursors are opaque
+    base64 tokens and stay stable when rows are inserted ahead of them.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering='-created_at', page_size=None):
+        self.ordering = ordering
+        if page_size is not None:
+            self.page_size = page_size
+
+    @classmethod
+    def requested(cls, request):
+        return (
+            request.query_params.get('pagination') == 'cursor' or
+            cls.cursor_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.field = self.ordering.lstrip('-')
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = cursor['r'] if cursor else False
+
+        # Walking backwards flips the ordering, the page is flipped back below
+        descending = self.ordering.startswith('-') != reverse
+        if descending:
+            queryset = queryset.order_by(f'-{self.field}', '-id')
+        else:
+            queryset = queryset.order_by(self.field, 'id')
+
+        if cursor:
+            model_field = queryset.model._meta.get_field(self.field)
+            try:
+                value = model_field.to_python(cursor['v'])
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': value}) |
+                Q(**{self.field: value, f'id__{lookup}': cursor['id']})
+            )
+
+        rows = list(queryset[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = rows
+        return rows
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return {'v': cursor['v'], 'id': int(cursor['id']), 'r': bool(cursor.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        position = {'v': getattr(row, self.field), 'id': row.pk, 'r': reverse}
+        token = json.dumps(position, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+
+    def get_link(self, row, reverse):
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, 'pagination', 'cursor')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(row, reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.get_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Ran past the end, step back to the first page
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.get_link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
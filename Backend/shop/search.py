@@ -0,0 +1,213 @@
+"""
+Full-text search index for products.
+
+SQLite uses an FTS5 virtual table, PostgreSQL a tsvector column with a GIN
+index. Both live in a side table keyed by product id so the Product model
+stays database agnostic. Other backends fall back to icontains filters.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+SQLITE_TABLE = 'shop_product_fts'
+POSTGRES_TABLE = 'shop_product_search'
+POSTGRES_CONFIG = 'simple'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+BATCH_SIZE = 500
+
+
+def is_supported(conn=None):
+    """Whether the active database has a native search index"""
+    conn = conn or connection
+    return conn.vendor in ('sqlite', 'postgresql')
+
+
+def create_index(conn):
+    """Create the search table for this database (used by migrations)"""
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5("
+                "name, description, category_name, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        elif conn.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} ("
+                "product_id bigint PRIMARY KEY "
+                "REFERENCES shop_product (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {POSTGRES_TABLE}_document_gin "
+                f"ON {POSTGRES_TABLE} USING GIN (document)"
+            )
+
+
+def drop_index(conn):
+    """Drop the search table (used by migrations)"""
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(f"DROP TABLE IF EXISTS {SQLITE_TABLE}")
+        elif conn.vendor == 'postgresql':
+            cursor.execute(f"DROP TABLE IF EXISTS {POSTGRES_TABLE}")
+
+
+def rebuild_index(conn=None):
+    """Re-populate the whole index from the product table in one statement"""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {SQLITE_TABLE} (rowid, name, description, category_name) "
+                "SELECT p.id, p.name, p.description, COALESCE(c.name, '') "
+                "FROM shop_product p LEFT JOIN shop_category c ON c.id = p.category_id"
+            )
+        elif conn.vendor == 'postgresql':
+            cursor.execute(f"TRUNCATE {POSTGRES_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {POSTGRES_TABLE} (product_id, document) "
+                f"SELECT p.id, {_pg_document('p.name', 'p.description', 'c.name')} "
+                "FROM shop_product p LEFT JOIN shop_category c ON c.id = p.category_id"
+            )
+        else:
+            return 0
+        cursor.execute("SELECT COUNT(*) FROM shop_product")
+        return cursor.fetchone()[0]
+
+
+def index_products(product_ids):
+    """Insert or refresh index rows for the given products"""
+    product_ids = [int(pk) for pk in product_ids]
+    if not is_supported():
+        return
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        _index_batch(product_ids[start:start + BATCH_SIZE])
+
+
+def _index_batch(product_ids):
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})",
+                product_ids
+            )
+            cursor.execute(
+                f"INSERT INTO {SQLITE_TABLE} (rowid, name, description, category_name) "
+                "SELECT p.id, p.name, p.description, COALESCE(c.name, '') "
+                "FROM shop_product p LEFT JOIN shop_category c ON c.id = p.category_id "
+                f"WHERE p.id IN ({placeholders})",
+                product_ids
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {POSTGRES_TABLE} (product_id, document) "
+                f"SELECT p.id, {_pg_document('p.name', 'p.description', 'c.name')} "
+                "FROM shop_product p LEFT JOIN shop_category c ON c.id = p.category_id "
+                f"WHERE p.id IN ({placeholders}) "
+                "ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                product_ids
+            )
+
+
+def unindex_products(product_ids):
+    """Remove index rows for deleted products"""
+    product_ids = [int(pk) for pk in product_ids]
+    if not is_supported():
+        return
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        _unindex_batch(product_ids[start:start + BATCH_SIZE])
+
+
+def _unindex_batch(product_ids):
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})",
+                product_ids
+            )
+        else:
+            cursor.execute(
+                f"DELETE FROM {POSTGRES_TABLE} WHERE product_id IN ({placeholders})",
+                product_ids
+            )
+
+
+def _pg_document(name, description, category_name):
+    """Weighted tsvector expression: name > category > description"""
+    return (
+        f"setweight(to_tsvector('{POSTGRES_CONFIG}', COALESCE({name}, '')), 'A') || "
+        f"setweight(to_tsvector('{POSTGRES_CONFIG}', COALESCE({category_name}, '')), 'B') || "
+        f"setweight(to_tsvector('{POSTGRES_CONFIG}', COALESCE({description}, '')), 'C')"
+    )
+
+
+def build_query(text):
+    """
+    Turn free text into a backend query string.
+    Every word must match, the last one as a prefix so results update per keystroke.
+    Returns None when the text has no searchable words.
+    """
+    tokens = TOKEN_RE.findall(text.lower())[:10]
+    if not tokens:
+        return None
+    if connection.vendor == 'postgresql':
+        return ' & '.join(f"{token}:*" for token in tokens)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_products(queryset, text, rank=False):
+    """
+    Restrict a Product queryset to rows matching `text`.
+    With rank=True the queryset is annotated with `search_rank` (higher is better).
+    """
+    if not is_supported():
+        queryset = queryset.filter(
+            Q(name__icontains=text) |
+            Q(description__icontains=text) |
+            Q(category__name__icontains=text)
+        )
+        if rank:
+            queryset = queryset.extra(select={'search_rank': '0'})
+        return queryset
+
+    query = build_query(text)
+    if query is None:
+        return queryset.none()
+
+    # Join the index table on the primary key so the engine drives the lookup
+    # from the index and ranks each match once
+    if connection.vendor == 'sqlite':
+        table = SQLITE_TABLE
+        where = [
+            f"{SQLITE_TABLE} MATCH %s",
+            f"{SQLITE_TABLE}.rowid = shop_product.id",
+        ]
+        # bm25() is lower-is-better, weights follow the column order
+        rank_sql = f"-bm25({SQLITE_TABLE}, 10.0, 1.0, 4.0)"
+        rank_params = []
+    else:
+        table = POSTGRES_TABLE
+        where = [
+            f"{POSTGRES_TABLE}.document @@ to_tsquery('{POSTGRES_CONFIG}', %s)",
+            f"{POSTGRES_TABLE}.product_id = shop_product.id",
+        ]
+        rank_sql = f"ts_rank_cd({POSTGRES_TABLE}.document, to_tsquery('{POSTGRES_CONFIG}', %s))"
+        rank_params = [query]
+
+    if rank:
+        return queryset.extra(
+            select={'search_rank': rank_sql},
+            select_params=rank_params,
+            tables=[table],
+            where=where,
+            params=[query],
+        )
+    return queryset.extra(tables=[table], where=where, params=[query])
@@ -34,9 +34,9 @@ class ProductListSerializer(serializers.ModelSerializer):
             'seller', 'seller_name', 'seller_email', 'price', 'formatted_price',
             'stock_quantity', 'is_in_stock', 'main_image',
             'weight', 'unit', 'is_featured', 'views_count',
-            'sales_count', 'average_rating', 'created_at'
+            'sales_count', 'average_rating', 'review_count', 'created_at'
         ]
-        read_only_fields = ['slug', 'seller', 'views_count', 'sales_count']
+        read_only_fields = ['slug', 'seller', 'views_count', 'sales_count', 'review_count']
 
 
 class ProductReviewSerializer(serializers.ModelSerializer):
@@ -73,9 +73,12 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'is_in_stock', 'main_image', 'additional_images',
             'weight', 'unit', 'is_active', 'is_featured',
             'views_count', 'sales_count', 'reviews', 'average_rating',
+            'review_count', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'slug', 'seller', 'views_count', 'sales_count', 'review_count',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['slug', 'seller', 'views_count', 'sales_count', 'created_at', 'updated_at']
 
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
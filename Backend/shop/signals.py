@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Category, Product, ProductReview
+from . import search
+from . import caching as catalog_cache
+
+# Fields that feed the search document
+SEARCH_FIELDS = {'name', 'description', 'category', 'category_id'}
+
+
+# Keep the full-text search index in sync with products
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields=None, **kwargs):
+    # Skip saves that can't change the document (e.g. view counter updates)
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    search.index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    search.unindex_products([instance.pk])
+
+
+# Category name is part of the document, so renames re-index its products
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    product_ids = list(instance.products.values_list('id', flat=True))
+    search.index_products(product_ids)
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_products(sender, instance, **kwargs):
+    instance._search_product_ids = list(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def reindex_orphaned_products(sender, instance, **kwargs):
+    search.index_products(getattr(instance, '_search_product_ids', []))
+
+
+# Keep Product.rating_sum / review_count in step with reviews. Queryset
+# updates skip auto_now, so updated_at is set here for the catalog ETags
+@receiver(pre_save, sender=ProductReview)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = ProductReview.objects.filter(
+            pk=instance.pk
+        ).values_list('rating', flat=True).first()
+
+
+@receiver(post_save, sender=ProductReview)
+def add_review_rating(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_rating', None)
+    if created or previous is None:
+        Product.objects.filter(pk=instance.product_id).update(
+            rating_sum=F('rating_sum') + instance.rating,
+            review_count=F('review_count') + 1,
+            updated_at=timezone.now()
+        )
+    elif previous != instance.rating:
+        Product.objects.filter(pk=instance.product_id).update(
+            rating_sum=F('rating_sum') + (instance.rating - previous),
+            updated_at=timezone.now()
+        )
+
+
+@receiver(post_delete, sender=ProductReview)
+def remove_review_rating(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.product_id).update(
+        rating_sum=F('rating_sum') - instance.rating,
+        review_count=F('review_count') - 1,
+        updated_at=timezone.now()
+    )
+
+
+# Invalidate cached catalog responses (one version bump per namespace)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    catalog_cache.bump('categories', 'products')
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, **kwargs):
+    # Categories embed product_count
+    catalog_cache.bump('products', 'categories')
+
+
+@receiver([post_save, post_delete], sender=ProductReview)
+def invalidate_review_cache(sender, **kwargs):
+    catalog_cache.bump('products')
+
+
+# Product details embed the seller and the reviewers' names
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_profile_cache(sender, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    catalog_cache.bump('products')
@@ -1,3 +1,556 @@
-from django.test import TestCase
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from orders.models import Cart, CartItem
+from . import caching as catalog_cache
+from . import search as product_search
+from .counters import CacheViewCounter, LocalViewCounter, get_view_counter
+from .importer import ProductImporter
+from .models import Category, Product, ProductReview
+
+
+def make_seller(name='seller'):
+    return User.objects.create_user(name, f'{name}@example.com', role='SELLER')
+
+
+def make_product(seller, name='Jollof Rice', category=None, price=100, stock=10, description='Test product'):
+    return Product.objects.create(
+        seller=seller,
+        category=category,
+        name=name,
+        description=description,
+        price=price,
+        stock_quantity=stock,
+        main_image='https://example.com/product.png',
+    )
+
+
+def names(response):
+    return [product['name'] for product in response.data['results']]
+
+
+class CatalogTestCase(TestCase):
+    def setUp(self):
+        # Catalog responses are cached, start every test from an empty cache
+        cache.clear()
+        # Product reads record views; buffer them without a flush timer, and
+        # drop them before the exit-time flush finds the test database gone
+        self.view_counter = LocalViewCounter(flush_interval=0)
+        patcher = patch('shop.counters._counter', self.view_counter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.view_counter.drain)
+        self.client = APIClient()
+        self.seller = make_seller()
+
+
+class SearchIndexTests(CatalogTestCase):
+    def search(self, text, **params):
+        return names(self.client.get('/api/shop/products/', {'search': text, **params}))
+
+    def test_matches_name_description_and_category_with_a_prefix_on_the_last_word(self):
+        grains = Category.objects.create(name='Grains')
+        make_product(self.seller, 'Ofada Rice', grains)
+        make_product(self.seller, 'Garri', description='Crunchy cassava flakes')
+        make_product(self.seller, 'Palm Oil')
+
+        self.assertEqual(self.search('grain'), ['Ofada Rice'])
+        self.assertEqual(self.search('cassava flak'), ['Garri'])
+        self.assertEqual(self.search('ofada ri'), ['Ofada Rice'])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_index_follows_product_and_category_changes(self):
+        grains = Category.objects.create(name='Grains')
+        rice = make_product(self.seller, 'Ofada Rice', grains)
+        oil = make_product(self.seller, 'Palm Oil')
+
+        rice.name = 'Basmati Rice'
+        rice.save()
+        self.assertEqual(self.search('ofada'), [])
+        self.assertEqual(self.search('basmati'), ['Basmati Rice'])
+
+        grains.name = 'Cereals'
+        grains.save()
+        self.assertEqual(self.search('cereal'), ['Basmati Rice'])
+
+        oil.delete()
+        self.assertEqual(self.search('palm'), [])
+
+    def test_relevance_ranks_name_matches_first(self):
+        make_product(self.seller, 'Yam Flour', description='Pounded yam')
+        make_product(self.seller, 'Beans', description='Goes with yam and plantain')
+
+        self.assertEqual(self.search('yam', ordering='relevance'), ['Yam Flour', 'Beans'])
+
+    def test_rebuild_restores_a_lost_index(self):
+        if not product_search.is_supported():
+            self.skipTest('No full-text index on this database')
+        make_product(self.seller, 'Ofada Rice')
+        table = product_search.SQLITE_TABLE if connection.vendor == 'sqlite' else product_search.POSTGRES_TABLE
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table}')
+        self.assertEqual(self.search('ofada'), [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('ofada'), ['Ofada Rice'])
+
+
+class RatingAggregateTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(self.seller)
+        self.buyers = [
+            User.objects.create_user(f'buyer{i}', f'buyer{i}@example.com', role='BUYER') for i in range(3)
+        ]
+
+    def review(self, buyer, rating):
+        return ProductReview.objects.create(product=self.product, buyer=buyer, rating=rating, comment='Tasty')
+
+    def aggregates(self):
+        self.product.refresh_from_db()
+        return self.product.rating_sum, self.product.review_count, self.product.average_rating
+
+    def test_reviews_keep_the_aggregates_in_step(self):
+        first = self.review(self.buyers[0], 5)
+        self.review(self.buyers[1], 2)
+        self.assertEqual(self.aggregates(), (7, 2, 3.5))
+
+        first.rating = 3
+        first.save()
+        self.assertEqual(self.aggregates(), (5, 2, 2.5))
+
+        first.delete()
+        self.assertEqual(self.aggregates(), (2, 1, 2))
+
+    def test_product_list_reads_ratings_without_per_row_queries(self):
+        for i, buyer in enumerate(self.buyers):
+            other = make_product(self.seller, f'Product {i}')
+            ProductReview.objects.create(product=other, buyer=buyer, rating=4, comment='Good')
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/shop/products/')
+        self.assertEqual(
+            sorted(product['average_rating'] for product in response.data['results']), [0, 4, 4, 4]
+        )
+
+    def test_rebuild_recomputes_the_aggregates_from_reviews(self):
+        self.review(self.buyers[0], 4)
+        self.review(self.buyers[1], 1)
+        Product.objects.filter(pk=self.product.pk).update(rating_sum=99, review_count=0)
+
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        self.assertEqual(self.aggregates(), (5, 2, 2.5))
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'views': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'views'},
+    'files': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/views'},
+    'redis': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379'},
+})
+class ViewCounterTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = [make_product(self.seller, f'Product {i}') for i in range(3)]
+
+    def views(self):
+        return list(Product.objects.order_by('id').values_list('views_count', flat=True))
+
+    def record(self, counter, *positions):
+        for position in positions:
+            counter.record(self.products[position].pk)
+
+    def test_local_counter_writes_the_buffer_in_one_flush(self):
+        counter = LocalViewCounter(flush_interval=0)
+        self.record(counter, 0, 0, 1, 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(counter.flush(), {'products': 3, 'views': 4})
+        # One UPDATE per distinct increment
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries), 2)
+        self.assertEqual(self.views(), [2, 1, 1])
+        self.assertEqual(counter.flush(), {'products': 0, 'views': 0})
+
+    def test_failed_flushes_keep_the_views(self):
+        for counter in (LocalViewCounter(flush_interval=0), CacheViewCounter(alias='views', shards=4)):
+            with self.subTest(counter=type(counter).__name__):
+                Product.objects.update(views_count=0)
+                self.record(counter, 0, 1, 1)
+                with patch('shop.counters.apply_view_counts', side_effect=DatabaseError('down')):
+                    with self.assertRaises(DatabaseError):
+                        counter.flush()
+
+                self.assertEqual(counter.flush(), {'products': 2, 'views': 3})
+                self.assertEqual(self.views(), [1, 2, 0])
+
+    def test_cache_counter_keeps_views_recorded_after_a_flush(self):
+        counter = CacheViewCounter(alias='views', shards=4)
+        self.record(counter, 0, 2)
+        counter.flush()
+        self.record(counter, 2, 2)
+
+        self.assertEqual(counter.pending(), {self.products[2].pk: 2})
+        counter.flush()
+        self.assertEqual(self.views(), [1, 0, 3])
+
+    def test_only_redis_and_memcached_are_shared(self):
+        self.assertTrue(CacheViewCounter(alias='redis').shared)
+        self.assertFalse(CacheViewCounter(alias='views').shared)
+        self.assertFalse(CacheViewCounter(alias='files').shared)
+
+        config = {'BACKEND': 'shop.counters.CacheViewCounter', 'OPTIONS': {'alias': 'files', 'flush_interval': 0}}
+        with override_settings(VIEW_COUNTER=config), patch('shop.counters._counter', None):
+            self.assertIsInstance(get_view_counter(), LocalViewCounter)
+            with self.assertRaises(CommandError):
+                call_command('flush_view_counts', stdout=StringIO())
+
+    def test_product_detail_records_a_buffered_view(self):
+        counter = LocalViewCounter(flush_interval=0)
+        with patch('shop.counters._counter', counter):
+            for _ in range(2):
+                response = self.client.get(f'/api/shop/products/{self.products[0].slug}/')
+                self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.views(), [0, 0, 0])
+        counter.flush()
+        self.assertEqual(self.views(), [2, 0, 0])
+
+
+class CursorPaginationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        # Ties on price are broken by id
+        self.products = [make_product(self.seller, f'Product {i}', price=100 + i % 3) for i in range(7)]
+
+    def walk(self, url):
+        """Names on every page, following the next links"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            pages.append(names(response))
+            url = response.data['next']
+        return pages
+
+    def test_pages_cover_every_product_once_in_order(self):
+        for ordering in ('price', '-price', '-created_at'):
+            with self.subTest(ordering=ordering):
+                pages = self.walk(f'/api/shop/products/?pagination=cursor&page_size=3&ordering={ordering}')
+                expected = list(
+                    Product.objects.order_by(ordering, 'id' if ordering == 'price' else '-id')
+                    .values_list('name', flat=True)
+                )
+                self.assertEqual([len(page) for page in pages], [3, 3, 1])
+                self.assertEqual(sum(pages, []), expected)
+
+    def test_pages_stay_put_when_products_are_added_ahead(self):
+        first = self.client.get('/api/shop/products/?pagination=cursor&page_size=3')
+        make_product(self.seller, 'Newest')
+
+        second = self.client.get(first.data['next'])
+        self.assertNotIn('Newest', names(second))
+        self.assertEqual(names(self.client.get(second.data['previous'])), names(first))
+
+    def test_page_queries_do_not_count_or_offset(self):
+        first = self.client.get('/api/shop/products/?pagination=cursor&page_size=3')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data['next'])
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/shop/products/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class RandomFeedTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = [make_product(self.seller, f'Product {i}') for i in range(20)]
+
+    def walk(self, seed, page_size=6):
+        pages, url = [], f'/api/shop/products/?ordering=random&seed={seed}&page_size={page_size}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.data['seed'], seed)
+            pages.append(names(response))
+            url = response.data['next']
+        return pages
+
+    def test_a_seeded_walk_visits_every_product_once_and_repeats_exactly(self):
+        pages = self.walk('abc')
+        self.assertEqual([len(page) for page in pages], [6, 6, 6, 2])
+        self.assertCountEqual(sum(pages, []), [product.name for product in self.products])
+        self.assertEqual(self.walk('abc'), pages)
+        self.assertNotEqual(self.walk('xyz'), pages)
+
+    def test_pages_are_index_walks_without_order_by_random(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/shop/products/?ordering=random')
+        self.assertNotIn('RANDOM()', ' '.join(query['sql'].upper() for query in queries))
+
+    def test_unseeded_feeds_draw_a_fresh_seed_every_time(self):
+        seeds = {self.client.get('/api/shop/products/?ordering=random').data['seed'] for _ in range(3)}
+        self.assertEqual(len(seeds), 3)
+
+    def test_reshuffle_changes_the_order_of_a_seed(self):
+        before = self.walk('abc', page_size=20)
+        call_command('reshuffle_random_feed', stdout=StringIO())
+        after = self.walk('abc', page_size=20)
+
+        self.assertCountEqual(after[0], before[0])
+        self.assertNotEqual(after, before)
+
+
+class CatalogCacheTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='Grains')
+        self.product = make_product(self.seller, 'Ofada Rice', self.category)
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        first = self.client.get('/api/shop/products/?category=grains&in_stock=true')
+        # Same parameters in another order, and a blank one, share the entry
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/shop/products/?in_stock=true&search=&category=grains')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(catalog_cache.stats()['hits'], 1)
+
+    def test_model_changes_bump_the_version(self):
+        self.client.get('/api/shop/products/')
+        self.client.get('/api/shop/categories/')
+
+        self.product.price = 250
+        self.product.save()
+        self.assertEqual(self.client.get('/api/shop/products/').data['results'][0]['price'], '250.00')
+
+        self.category.name = 'Cereals'
+        self.category.save()
+        self.assertEqual(self.client.get('/api/shop/categories/').data[0]['name'], 'Cereals')
+
+    def test_checkout_stock_updates_bump_on_commit(self):
+        self.client.get(f'/api/shop/products/{self.product.slug}/')
+        buyer = User.objects.create_user('buyer', 'buyer@example.com', role='BUYER')
+        CartItem.objects.create(cart=Cart.objects.get(user=buyer), product=self.product, quantity=4)
+
+        # Checkout reserves stock with UPDATE, which skips the model signals
+        self.client.force_authenticate(buyer)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/orders/checkout/').status_code, 201)
+        self.assertEqual(self.client.get(f'/api/shop/products/{self.product.slug}/').data['stock_quantity'], 6)
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.client.get('/api/shop/products/missing/').status_code, 404)
+        make_product(self.seller, 'Missing')
+        self.assertEqual(self.client.get('/api/shop/products/missing/').status_code, 200)
+
+
+class ConditionalGetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(self.seller, 'Ofada Rice', Category.objects.create(name='Grains'))
+        self.url = f'/api/shop/products/{self.product.slug}/'
+
+    def test_matching_etag_is_not_modified_and_still_counts_the_view(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        # The stamp query only, no serializers
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.view_counter.pending(), {self.product.pk: 2})
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale", W/' + etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_the_product_its_category_reviews_and_seller(self):
+        etags = [self.client.get(self.url)['ETag']]
+
+        self.product.price = 300
+        self.product.save()
+        etags.append(self.client.get(self.url)['ETag'])
+
+        self.product.category.description = 'Rice and more'
+        self.product.category.save()
+        etags.append(self.client.get(self.url)['ETag'])
+
+        buyer = User.objects.create_user('buyer', 'buyer@example.com', role='BUYER')
+        ProductReview.objects.create(product=self.product, buyer=buyer, rating=5, comment='Great')
+        etags.append(self.client.get(self.url)['ETag'])
+
+        self.seller.first_name = 'Ada'
+        self.seller.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etags[-1])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['seller']['first_name'], 'Ada')
+        etags.append(response['ETag'])
+
+        self.assertEqual(len(set(etags)), len(etags))
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT').status_code, 200
+        )
+
+    def test_category_list_revalidates_on_product_changes(self):
+        etag = self.client.get('/api/shop/categories/')['ETag']
+        self.assertEqual(self.client.get('/api/shop/categories/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        make_product(self.seller, 'Basmati Rice', self.product.category)
+        self.assertEqual(self.client.get('/api/shop/categories/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_missing_products_are_not_stamped(self):
+        response = self.client.get('/api/shop/products/missing/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class FacetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        grains = Category.objects.create(name='Grains')
+        oils = Category.objects.create(name='Oils')
+        make_product(self.seller, 'Ofada Rice', grains, price=900)
+        make_product(self.seller, 'Basmati Rice', grains, price=4000, stock=0)
+        make_product(self.seller, 'Rice Bran Oil', oils, price=25000)
+        make_product(self.seller, 'Palm Oil', oils, price=60000)
+        make_product(self.seller, 'Gift Hamper', price=60000)
+
+    def facets(self, query):
+        return self.client.get(f'/api/shop/products/?{query}').data['facets']
+
+    def test_counts_follow_the_filters(self):
+        facets = self.facets('facets=all')
+        self.assertEqual(
+            [(item['slug'], item['count']) for item in facets['category']], [('grains', 2), ('oils', 2)]
+        )
+        self.assertEqual([bucket['count'] for bucket in facets['price']], [1, 1, 0, 1, 2])
+        self.assertEqual(facets['in_stock'], {'in_stock': 4, 'out_of_stock': 1})
+
+        facets = self.facets('facets=category,in_stock&search=rice')
+        self.assertEqual(
+            [(item['slug'], item['count']) for item in facets['category']], [('grains', 2), ('oils', 1)]
+        )
+        self.assertEqual(facets['in_stock'], {'in_stock': 2, 'out_of_stock': 1})
+        self.assertNotIn('price', facets)
+
+    def test_all_facets_come_from_one_query_cached_per_filter_set(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/shop/products/?facets=all&in_stock=true')
+        self.assertEqual(sum('GROUP BY' in query['sql'] for query in queries), 1)
+
+        # Another page of the same filters reads the facets from the cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/shop/products/?facets=all&in_stock=true&page_size=2')
+        self.assertFalse(any('GROUP BY' in query['sql'] for query in queries))
+        self.assertEqual(response.data['facets']['in_stock'], {'in_stock': 4, 'out_of_stock': 0})
+
+    def test_without_facets_the_response_has_none(self):
+        self.assertNotIn('facets', self.client.get('/api/shop/products/').data)
+
+
+class ProductImportTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        Category.objects.create(name='Grains')
+        self.client.force_authenticate(self.seller)
+
+    def upload(self, name, content, **data):
+        return self.client.post(
+            '/api/shop/products/import/',
+            {'file': SimpleUploadedFile(name, content.encode('utf-8')), **data},
+            format='multipart'
+        )
+
+    def test_valid_rows_are_created_and_invalid_rows_reported(self):
+        response = self.upload('products.csv', (
+            'name,description,price,stock_quantity,main_image,category\n'
+            'Ofada Rice,Local rice,1200,5,https://example.com/rice.png,grains\n'
+            'Beans,Brown beans,-3,5,https://example.com/beans.png,\n'
+            'Garri,Cassava flakes,300,5,https://example.com/garri.png,Tubers\n'
+            'Palm Oil,Red oil,2500,5,https://example.com/oil.png,Grains\n'
+        ))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 2))
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertIn('price', response.data['errors'][0]['errors'])
+        self.assertIn('category', response.data['errors'][1]['errors'])
+        self.assertEqual(
+            set(Product.objects.filter(seller=self.seller).values_list('category__slug', flat=True)), {'grains'}
+        )
+        # Imported products are searchable straight away
+        self.assertEqual(names(self.client.get('/api/shop/products/', {'search': 'ofada'})), ['Ofada Rice'])
+
+    def test_jsonl_rows_that_do_not_parse_are_reported(self):
+        response = self.upload('products.jsonl', (
+            '{"name": "Yam", "description": "Tuber", "price": "800", "main_image": "https://example.com/yam.png"}\n'
+            '{"name": "Broken"\n'
+            '\n'
+            '["not", "an", "object"]\n'
+        ))
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 2))
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+
+    def test_slugs_follow_the_existing_ones(self):
+        make_product(self.seller, 'Jollof Rice')
+        make_product(self.seller, 'Jollof Rice')
+        make_product(self.seller, 'Jollof')
+
+        importer = ProductImporter(self.seller)
+        importer.run(enumerate([
+            {'name': name, 'description': 'Rice', 'price': '1000', 'main_image': 'https://example.com/j.png'}
+            for name in ('Jollof Rice', 'Jollof Rice', 'Jollof')
+        ], start=1))
+
+        self.assertEqual(
+            sorted(Product.objects.values_list('slug', flat=True)),
+            ['jollof', 'jollof-1', 'jollof-rice', 'jollof-rice-1', 'jollof-rice-2', 'jollof-rice-3']
+        )
+
+    def test_batch_is_retried_when_a_slug_is_taken_concurrently(self):
+        resolve = ProductImporter.resolve_slugs
+        calls = []
+
+        def racing_resolve(names):
+            slugs = resolve(names)
+            if not calls:
+                # Another writer creates the product between the read and the insert
+                make_product(self.seller, 'Egusi')
+            calls.append(slugs)
+            return slugs
+
+        with patch.object(ProductImporter, 'resolve_slugs', staticmethod(racing_resolve)):
+            report = ProductImporter(self.seller).run([
+                (1, {'name': 'Egusi', 'description': 'Melon seeds', 'price': '900', 'main_image': 'https://example.com/e.png'})
+            ])
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(calls, [['egusi'], ['egusi-1']])
+
+    def test_admins_import_for_an_existing_seller(self):
+        self.client.force_authenticate(User.objects.create_user('admin', 'admin@example.com', role='ADMIN'))
+        row = 'name,description,price,main_image\nYam,Tuber,800,https://example.com/yam.png\n'
+
+        self.assertEqual(self.upload('products.csv', row).status_code, 400)
+        response = self.upload('products.csv', row, seller_id=self.seller.pk)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Product.objects.get(name='Yam').seller, self.seller)
+
+    def test_unsupported_formats_are_rejected(self):
+        self.assertEqual(self.upload('products.xlsx', 'name\nYam\n').status_code, 400)
@@ -14,6 +14,7 @@ urlpatterns = [
     # Products
     path('products/', views.product_list, name='product_list'),
     path('products/create/', views.product_create, name='product_create'),
+    path('products/import/', views.product_import, name='product_import'),
     path('products/<slug:slug>/', views.product_detail, name='product_detail'),
     path('products/<int:pk>/update/', views.product_update, name='product_update'),
     path('products/<int:pk>/delete/', views.product_delete, name='product_delete'),
@@ -21,6 +22,10 @@ urlpatterns = [
     # My Products (for sellers - permissions check in view)
     path('inventory/', views.my_products, name='my_products'),  # Changed from "my-products"
     
+    # View counter buffer and response cache (admin)
+    path('view-counter/', views.view_counter_stats, name='view_counter_stats'),
+    path('cache-stats/', views.catalog_cache_stats, name='catalog_cache_stats'),
+    
     # Product Reviews
     path('products/<int:product_id>/reviews/', views.product_reviews, name='product_reviews'),
     path('products/<int:product_id>/reviews/create/', views.create_review, name='create_review'),
@@ -1,9 +1,14 @@
+import csv
+import io
+import os
+
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q, Prefetch
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch, Count, Max
 from .models import Category, Product, ProductReview
 from .serializers import (
     CategorySerializer,
@@ -14,6 +19,14 @@ from .serializers import (
     ProductReviewCreateUpdateSerializer
 )
 from accounts.permissions import IsAdmin, IsSeller, IsBuyer
+from . import search as product_search
+from .counters import get_view_counter
+from .pagination import KeysetPagination
+from .feed import RandomFeedPagination
+from . import caching as catalog_cache
+from .conditional import conditional
+from . import facets as product_facets
+from .importer import FORMATS as IMPORT_FORMATS, ProductImporter, iter_rows
 
 
 # ============================================================================
@@ -31,8 +44,27 @@ class ProductPagination(PageNumberPagination):
 # CATEGORY VIEWS (unchanged)
 # ============================================================================
 
+def category_list_stamp(request):
+    """
+    ETag inputs for the category list (product_count depends on products too).
+    The aggregates run once per catalog cache generation, conditional GETs in
+    between only read the cache.
+    """
+    def compute():
+        categories = Category.objects.aggregate(count=Count('id'), last=Max('updated_at'))
+        products = Product.objects.aggregate(count=Count('id'), last=Max('updated_at'))
+        modified = [stamp for stamp in (categories['last'], products['last']) if stamp]
+        return {
+            'parts': [categories['count'], categories['last'], products['count'], products['last']],
+            'last_modified': max(modified) if modified else None,
+        }
+    return catalog_cache.get_or_set('category_list_stamp', ('categories', 'products'), (), compute)
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional(category_list_stamp, cache_control='public, no-cache')
+@catalog_cache.cache_response('categories')
 def category_list(request):
     """List all active categories"""
     categories = Category.objects.filter(is_active=True)
@@ -42,6 +74,7 @@ def category_list(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@catalog_cache.cache_response('categories')
 def category_detail(request, slug):
     """Get single category"""
     try:
@@ -120,8 +153,14 @@ def category_delete(request, pk):
 # OPTIMIZED PRODUCT VIEWS
 # ============================================================================
 
+def unseeded_random_feed(request):
+    """A random feed without ?seed= draws a fresh seed, a cached copy would hand every visitor the same one"""
+    return request.query_params.get('ordering') == 'random' and not request.query_params.get('seed')
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@catalog_cache.cache_response('products', skip=unseeded_random_feed)
 def product_list(request):
     """
     List products with filters and pagination
@@ -130,18 +169,26 @@ def product_list(request):
     - select_related: Reduces queries for category and seller (from N+1 to 1)
     - only(): Fetches only needed fields (faster queries)
     - Pagination: Returns 30 products per page by default
-    - Random ordering: Use ?ordering=random for homepage
+    - Random ordering: Use ?ordering=random (&seed=...) for homepage, served from the random_key index
+    - average_rating: Read from stored rating_sum/review_count, no per-row review queries
+    - Full-text search: FTS5 (SQLite) / tsvector + GIN (PostgreSQL) index instead of icontains scans
+    - Response cache: keyed by normalized query params, invalidated by model signals
+    - Cursor pagination: ?pagination=cursor walks (ordering field, id) indexes, no COUNT/OFFSET
+    - Facets: one grouped conditional-aggregate query, cached per filter set
     
     Query params:
     - page: Page number (default: 1)
+    - pagination: 'cursor' for keyset pagination (follow the returned next/previous links)
+    - facets: Comma list of category, price, in_stock (or 'all') - adds a 'facets' object
+    - seed: Random feed seed, keeps ordering=random stable across pages (echoed in the response)
     - page_size: Items per page (default: 30, max: 100)
     - category: Filter by category slug
-    - search: Search in name, description, category
+    - search: Full-text search in name, description, category (prefix match on the last word)
     - min_price: Minimum price filter
     - max_price: Maximum price filter
     - in_stock: true/false
     - is_featured: true/false
-    - ordering: Sort field (price, -price, name, -name, created_at, -created_at, views_count, -views_count, sales_count, -sales_count, random)
+    - ordering: Sort field (price, -price, name, -name, created_at, -created_at, views_count, -views_count, sales_count, -sales_count, random, relevance)
     """
     
     # OPTIMIZATION: Use select_related and only() to reduce queries and fetch only needed fields
@@ -152,6 +199,7 @@ def product_list(request):
         # Product fields
         'id', 'name', 'slug', 'price', 'stock_quantity', 'main_image',
         'weight', 'unit', 'is_featured', 'views_count', 'sales_count', 'created_at',
+        'rating_sum', 'review_count', 'random_key',
         # Related fields
         'category__id', 'category__name',
         'seller__id', 'seller__first_name', 'seller__last_name', 'seller__email'
@@ -170,10 +218,9 @@ def product_list(request):
         products = products.filter(category__slug=category)
     
     if search:
-        products = products.filter(
-            Q(name__icontains=search) |
-            Q(description__icontains=search) |
-            Q(category__name__icontains=search)
+        # OPTIMIZATION: Match against the full-text index, rank only when sorting by relevance
+        products = product_search.search_products(
+            products, search, rank=(ordering == 'relevance')
         )
     
     if min_price:
@@ -194,40 +241,86 @@ def product_list(request):
     if is_featured == 'true':
         products = products.filter(is_featured=True)
     
+    # Facet counts for the current filter set (before ordering/pagination)
+    facet_names = product_facets.requested_facets(request)
+    facets = product_facets.get_facets(request, products, facet_names) if facet_names else None
+    
     # Ordering - NEW: Support for random ordering
     allowed_ordering = [
         'price', '-price', 'name', '-name', 'created_at', '-created_at',
-        'views_count', '-views_count', 'sales_count', '-sales_count', 'random'
+        'views_count', '-views_count', 'sales_count', '-sales_count', 'random', 'relevance'
     ]
     
-    if ordering == 'random':
-        # OPTIMIZATION: Use order_by('?') for random - efficient in SQLite/PostgreSQL
-        products = products.order_by('?')
-    elif ordering in allowed_ordering:
+    if ordering == 'relevance' and search:
+        products = products.order_by('-search_rank', '-created_at')
+    elif ordering == 'random':
+        # OPTIMIZATION: Seeded walk over the random_key index instead of ORDER BY RANDOM()
+        products = products.order_by('random_key', 'id')
+    elif ordering in allowed_ordering and ordering != 'relevance':
         products = products.order_by(ordering)
     else:
-        products = products.order_by('-created_at')
+        ordering = '-created_at'
+        products = products.order_by(ordering)
     
-    # PAGINATION: Use custom pagination class
-    paginator = ProductPagination()
+    # PAGINATION: Random feed cursors, opt-in keyset cursors, page numbers otherwise
+    if ordering == 'random':
+        paginator = RandomFeedPagination()
+    elif KeysetPagination.requested(request) and ordering != 'relevance':
+        paginator = KeysetPagination(ordering=ordering)
+    else:
+        paginator = ProductPagination()
     page = paginator.paginate_queryset(products, request)
     
     if page is not None:
         serializer = ProductListSerializer(page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        response = paginator.get_paginated_response(serializer.data)
+        if facets is not None:
+            response.data['facets'] = facets
+        return response
     
     # Fallback if pagination fails
     serializer = ProductListSerializer(products, many=True)
-    return Response({
+    data = {
         'count': products.count(),
         'results': serializer.data
-    }, status=status.HTTP_200_OK)
+    }
+    if facets is not None:
+        data['facets'] = facets
+    return Response(data, status=status.HTTP_200_OK)
+
+
+def record_cached_view(data):
+    """Cache hits and 304s skip the view body, so record the product view here"""
+    get_view_counter().record(data['id'])
+
+
+def product_detail_stamp(request, slug):
+    """ETag inputs: product, its category, its seller and its reviews with their buyers"""
+    stamp = Product.objects.filter(slug=slug).values(
+        'id', 'updated_at', 'views_count', 'review_count', 'rating_sum', 'category__updated_at',
+        'seller__updated_at'
+    ).annotate(
+        last_review=Max('reviews__updated_at'), last_reviewer=Max('reviews__buyer__updated_at')
+    ).first()
+    if stamp is None:
+        return None
+    modified = [
+        stamp['updated_at'], stamp['category__updated_at'], stamp['seller__updated_at'],
+        stamp['last_review'], stamp['last_reviewer']
+    ]
+    return {
+        'id': stamp['id'],
+        'parts': list(stamp.values()),
+        'last_modified': max(modified_at for modified_at in modified if modified_at),
+    }
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional(product_detail_stamp, cache_control='public, no-cache', on_not_modified=record_cached_view)
+@catalog_cache.cache_response('products', on_hit=record_cached_view)
 def product_detail(request, slug):
-    """Get single product and increment views"""
+    """Get single product and record a view (buffered, no write on the GET path)"""
     try:
         # OPTIMIZATION: Prefetch related reviews with buyer data
         product = Product.objects.select_related(
@@ -240,7 +333,7 @@ def product_detail(request, slug):
             )
         ).get(slug=slug)
         
-        # Increment view count
+        # Record view in the write-behind counter (flushed in bulk later)
         product.increment_views()
         
         serializer = ProductDetailSerializer(product)
@@ -269,6 +362,53 @@ def product_create(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsSeller | IsAdmin])
+def product_import(request):
+    """
+    Seller (or admin on behalf of a seller) bulk-imports products from a CSV or
+    JSONL upload. Rows follow the product create rules; `category` may be an id,
+    slug or name. Invalid rows are skipped and reported by row number.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response(
+            {'error': 'Upload a CSV or JSONL file in the "file" field'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    file_format = request.data.get('format') or os.path.splitext(upload.name)[1].lstrip('.').lower()
+    if file_format == 'json':
+        file_format = 'jsonl'
+    if file_format not in IMPORT_FORMATS:
+        return Response(
+            {'error': f"Unsupported format, use one of: {', '.join(IMPORT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    seller = request.user
+    if request.user.is_admin_user:
+        try:
+            seller = get_user_model().objects.get(pk=request.data.get('seller_id'), role='SELLER')
+        except (get_user_model().DoesNotExist, ValueError, TypeError):
+            return Response(
+                {'error': 'Admins must pass the seller_id of an existing seller'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    # OPTIMIZATION: The upload is read row by row and written in batches
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        report = ProductImporter(seller).run(iter_rows(stream, file_format))
+    except (UnicodeDecodeError, csv.Error) as e:
+        return Response({'error': f'Could not read file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+    finally:
+        stream.detach()
+
+    response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+    return Response(report, status=response_status)
+
+
 @api_view(['PUT', 'PATCH'])
 @permission_classes([IsSeller])
 def product_update(request, pk):
@@ -324,12 +464,15 @@ def my_products(request):
     ).only(
         'id', 'name', 'slug', 'price', 'stock_quantity', 'main_image',
         'weight', 'unit', 'is_active', 'is_featured', 'views_count', 
-        'sales_count', 'created_at',
+        'sales_count', 'created_at', 'rating_sum', 'review_count',
         'category__id', 'category__name'
     ).order_by('-created_at')
     
-    # Apply pagination
-    paginator = ProductPagination()
+    # Apply pagination (?pagination=cursor for keyset cursors)
+    if KeysetPagination.requested(request):
+        paginator = KeysetPagination(ordering='-created_at')
+    else:
+        paginator = ProductPagination()
     page = paginator.paginate_queryset(products, request)
     
     if page is not None:
@@ -343,6 +486,20 @@ def my_products(request):
     }, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def view_counter_stats(request):
+    """Admin checks the buffered view counter (pending views and flush lag)"""
+    return Response(get_view_counter().stats(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def catalog_cache_stats(request):
+    """Admin checks catalog response cache hit/miss counters"""
+    return Response(catalog_cache.stats(), status=status.HTTP_200_OK)
+
+
 # ============================================================================
 # PRODUCT REVIEW VIEWS (unchanged)
 # ============================================================================
@@ -356,7 +513,7 @@ def product_reviews(request, product_id):
         reviews = product.reviews.select_related('buyer').order_by('-created_at')
         serializer = ProductReviewSerializer(reviews, many=True)
         return Response({
-            'count': reviews.count(),
+            'count': product.review_count,
             'average_rating': product.average_rating,
             'results': serializer.data
         }, status=status.HTTP_200_OK)
@@ -46,16 +46,10 @@ export default function CheckoutPage() {
     setError('');
     setProcessing(true);
 
+    let order;
     try {
       const response = await orderAPI.checkout();
-      const { order, qr_code_base64 } = response.data;
-
-      // Store order and QR code data for the success page
-      sessionStorage.setItem('checkout_order', JSON.stringify(order));
-      sessionStorage.setItem('checkout_qr', qr_code_base64);
-
-      // Redirect to success page
-      router.push(`/checkout/success?order=${order.order_number}`);
+      order = response.data.order;
     } catch (error) {
       console.error('Checkout error:', error);
       setError(
@@ -63,7 +57,14 @@ export default function CheckoutPage() {
         'Checkout failed. Please try again.'
       );
       setProcessing(false);
+      return;
     }
+
+    // The order exists and the credit is taken, so always go to the success
+    // page; it loads the QR code itself and can retry that on its own
+    sessionStorage.setItem('checkout_order', JSON.stringify(order));
+    sessionStorage.removeItem('checkout_qr');
+    router.push(`/checkout/success?order=${order.order_number}`);
   };
 
   if (!isAuthenticated || !isBuyer) {
@@ -5,31 +5,55 @@ import { useRouter, useSearchParams } from 'next/navigation';
 import Link from 'next/link';
 import { CheckCircle, Download, Home } from 'lucide-react';
 import Button from '@/components/common/Button';
+import { orderAPI } from '@/lib/api';
 
 export default function CheckoutSuccessPage() {
   const router = useRouter();
   const searchParams = useSearchParams();
   const [order, setOrder] = useState(null);
   const [qrCode, setQrCode] = useState('');
+  const [qrError, setQrError] = useState('');
 
   useEffect(() => {
     // Get order data from sessionStorage
     const orderData = sessionStorage.getItem('checkout_order');
-    const qrCodeData = sessionStorage.getItem('checkout_qr');
 
-    if (orderData && qrCodeData) {
-      setOrder(JSON.parse(orderData));
-      setQrCode(qrCodeData);
-      
-      // Clear sessionStorage after loading
-      // sessionStorage.removeItem('checkout_order');
-      // sessionStorage.removeItem('checkout_qr');
+    if (orderData) {
+      const savedOrder = JSON.parse(orderData);
+      setOrder(savedOrder);
+
+      const qrCodeData = sessionStorage.getItem('checkout_qr');
+      if (qrCodeData) {
+        setQrCode(qrCodeData);
+      } else {
+        fetchQRCode(savedOrder);
+      }
     } else {
       // If no data, redirect to orders page
       router.push('/orders');
     }
   }, []);
 
+  const fetchQRCode = async (currentOrder) => {
+    setQrError('');
+    try {
+      // QR image is rendered by its own endpoint, keep it as a data URL for downloads
+      const qrResponse = await orderAPI.getQRCode(currentOrder.id);
+      const qrCodeDataUrl = await new Promise((resolve, reject) => {
+        const reader = new FileReader();
+        reader.onloadend = () => resolve(reader.result);
+        reader.onerror = reject;
+        reader.readAsDataURL(qrResponse.data);
+      });
+      sessionStorage.setItem('checkout_qr', qrCodeDataUrl);
+      setQrCode(qrCodeDataUrl);
+    } catch (error) {
+      // The order is placed either way, only the image failed to load
+      console.error('Error fetching QR code:', error);
+      setQrError('Your order was placed, but its QR code could not be loaded.');
+    }
+  };
+
   const handleDownloadQR = () => {
     if (!qrCode) return;
 
@@ -42,7 +66,7 @@ export default function CheckoutSuccessPage() {
     document.body.removeChild(link);
   };
 
-  if (!order || !qrCode) {
+  if (!order) {
     return (
       <div className="min-h-screen flex items-center justify-center">
         <p className="text-gray-600">Loading...</p>
@@ -102,20 +126,39 @@ export default function CheckoutSuccessPage() {
               Your Order QR Code
             </h2>
             <div className="bg-white p-6 rounded-lg border-2 border-dashed border-gray-300 mb-6">
-              <img
-                src={qrCode}
-                alt="Order QR Code"
-                className="w-full max-w-xs mx-auto"
-              />
+              {qrCode ? (
+                <img
+                  src={qrCode}
+                  alt="Order QR Code"
+                  className="w-full max-w-xs mx-auto"
+                />
+              ) : qrError ? (
+                <p className="text-sm text-red-700 text-center">
+                  {qrError} You can also find it under My Orders.
+                </p>
+              ) : (
+                <p className="text-gray-600 text-center">Loading QR code...</p>
+              )}
             </div>
-            <Button
-              onClick={handleDownloadQR}
-              variant="primary"
-              className="w-full mb-3"
-            >
-              <Download className="w-5 h-5 inline mr-2" />
-              Download QR Code
-            </Button>
+            {qrError ? (
+              <Button
+                onClick={() => fetchQRCode(order)}
+                variant="primary"
+                className="w-full mb-3"
+              >
+                Try Loading the QR Code Again
+              </Button>
+            ) : (
+              <Button
+                onClick={handleDownloadQR}
+                variant="primary"
+                className="w-full mb-3"
+                disabled={!qrCode}
+              >
+                <Download className="w-5 h-5 inline mr-2" />
+                Download QR Code
+              </Button>
+            )}
             <p className="text-sm text-gray-600 text-center">
               Save or screenshot this QR code to show to the seller
             </p>
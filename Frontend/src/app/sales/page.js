@@ -44,6 +44,13 @@ export default function SalesPage() {
     }
   }, [isAuthenticated, isSeller]);
 
+  // Refresh when an order is placed, confirmed, completed or cancelled
+  useEffect(() => {
+    if (!isAuthenticated || !isSeller) return;
+    const source = orderAPI.subscribeToEvents(() => fetchOrders());
+    return () => source.close();
+  }, [isAuthenticated, isSeller]);
+
   const fetchOrders = async () => {
     try {
       setLoading(true);
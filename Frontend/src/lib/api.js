@@ -133,11 +133,24 @@ export const orderAPI = {
   getMyOrders: (params) => api.get('/orders/', { params }),
   getOrderDetail: (orderId) => api.get(`/orders/${orderId}/`),
   saveQRCode: (orderId, data) => api.patch(`/orders/${orderId}/qr-code/`, data),
+  getQRCode: (orderId) => api.get(`/orders/${orderId}/qr-code.png`, { responseType: 'blob' }),
   
   // Order Actions (no "seller/" prefix - permissions checked in backend)
   verifyQRCode: (data) => api.post('/orders/verify-qr/', data),
   confirmOrder: (orderId) => api.post(`/orders/${orderId}/confirm/`),
   completeOrder: (orderId) => api.post(`/orders/${orderId}/complete/`),
+  
+  // Live order events for sellers (Server-Sent Events). EventSource cannot send
+  // headers, so the access token goes in the query string. Returns the
+  // EventSource; call .close() to unsubscribe.
+  subscribeToEvents: (onEvent) => {
+    const token = Cookies.get('access_token');
+    const source = new EventSource(`${api.defaults.baseURL}/orders/events/?token=${encodeURIComponent(token || '')}`);
+    ['order.created', 'order.confirmed', 'order.completed', 'order.cancelled', 'resync'].forEach((type) => {
+      source.addEventListener(type, (event) => onEvent(type, event.data ? JSON.parse(event.data) : {}));
+    });
+    return source;
+  },
 };
 
 // ============================================================================